@@ -288,14 +288,17 @@ class PasteCommand(BaseCommand, SaveStateMixin):
     def canDo(self):
         return bool(self.__itemsToPaste)
         
+    @patterns.eventBatch
     def do_command(self):
         self.setParentOfPastedItems()
         self.__sourceOfItemsToPaste.extend(self.__itemsToPaste)
 
+    @patterns.eventBatch
     def undo_command(self):
         self.__sourceOfItemsToPaste.removeItems(self.__itemsToPaste)
         self.undoStates()
         
+    @patterns.eventBatch
     def redo_command(self):
         self.redoStates()
         self.__sourceOfItemsToPaste.extend(self.__itemsToPaste)
@@ -591,7 +591,8 @@ defaults = {
     'password': '',
     'service': '',
     'synccompleted': 'True',
-    'showlog': 'False' 
+    'showlog': 'False',
+    'syncwindow': '64'  # Objects in flight during a full sync from the desktop
     },
 'printer': {
     'margin_left': '0',
@@ -21,7 +21,6 @@ import urlparse
 from taskcoachlib import patterns, mailer
 from taskcoachlib.domain import base
 from taskcoachlib.tools import openfile
-from taskcoachlib.thirdparty.pubsub import pub
 from taskcoachlib.domain.note.noteowner import NoteOwner
 
 
@@ -89,8 +88,8 @@ class Attachment(base.Object, NoteOwner):
         if location != self.__location:
             self.__location = location
             self.markDirty()
-            pub.sendMessage(self.locationChangedEventType(), newValue=location,
-                            sender=self)
+            patterns.sendMessage(self.locationChangedEventType(), newValue=location,
+                                 sender=self)
 
     @classmethod        
     def locationChangedEventType(class_):
@@ -55,6 +55,43 @@ class Filter(patterns.SetDecorator):
                 filteredItems.update(set(item.ancestors()))
         self.removeItemsFromSelf([item for item in self if item not in filteredItems], event=event)
         self.extendSelf([item for item in filteredItems if item not in self], event=event)
+
+    @patterns.eventSource
+    def refilterItems(self, items, event=None):
+        ''' Re-evaluate the filter for the given items only. Use reset() when
+            the filter criteria themselves change, and this method when only 
+            some items were added, removed or changed. In tree mode the 
+            ancestors of the items are re-evaluated too, since whether they 
+            are shown depends on their descendants. '''
+        if self.isFrozen():
+            return
+
+        observable = self.observable()
+        candidates = set(items)
+        if self.treeMode():
+            for item in items:
+                candidates.update(item.ancestors())
+        presentCandidates = [item for item in candidates if item in observable]
+        passedItems = set(self.filterItems(presentCandidates)) & candidates
+        if self.treeMode():
+            # Candidates that were removed from the observable are not shown,
+            # even though they may not have been removed from self yet:
+            included = dict((item, False) for item in candidates \
+                            if item not in observable)
+            # Visit descendants before their ancestors so that the new status
+            # of the children is known when deciding about their parents:
+            for item in sorted(presentCandidates, 
+                               key=lambda item: len(item.ancestors()), 
+                               reverse=True):
+                included[item] = item in passedItems or \
+                    any(included.get(child, child in self) \
+                        for child in item.children())
+        else:
+            included = dict((item, True) for item in passedItems)
+        self.removeItemsFromSelf([item for item in candidates \
+            if item in self and not included.get(item, False)], event=event)
+        self.extendSelf([item for item in candidates \
+            if included.get(item, False) and item not in self], event=event)
             
     def filterItems(self, items):
         ''' filter returns the items that pass the filter. '''
@@ -64,10 +101,10 @@ class Filter(patterns.SetDecorator):
         return [item for item in self if item.parent() is None]
     
     def onAddItem(self, event):
-        self.reset()
+        self.refilterItems(event.values())
         
     def onRemoveItem(self, event):
-        self.reset()
+        self.refilterItems(event.values())
 
 
 class SelectedItemsFilter(Filter):
@@ -185,8 +222,8 @@ class DeletedFilter(Filter):
         patterns.Publisher().removeObserver(self.onObjectMarkedDeletedOrNot)
         super(DeletedFilter, self).detach()
 
-    def onObjectMarkedDeletedOrNot(self, event):  # pylint: disable=W0613
-        self.reset()
+    def onObjectMarkedDeletedOrNot(self, event):
+        self.refilterItems(event.sources())
 
     def filterItems(self, items):
         return [item for item in items if not item.isDeleted()]
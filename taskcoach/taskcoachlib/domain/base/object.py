@@ -21,7 +21,6 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from taskcoachlib import patterns
 from taskcoachlib.domain.attribute import icon
 from taskcoachlib.domain.date import DateTime, Now
-from taskcoachlib.thirdparty.pubsub import pub
 from . import attribute
 import functools
 import sys
@@ -30,6 +29,10 @@ import re
 
 
 class SynchronizedObject(object):
+    # Slots keep the memory use of classes that define slots for all their 
+    # attributes, like Effort, low. Other subclasses still get a __dict__.
+    __slots__ = ('__status',)
+    
     STATUS_NONE    = 0
     STATUS_NEW     = 1
     STATUS_CHANGED = 2
@@ -133,6 +136,10 @@ class SynchronizedObject(object):
 
         
 class Object(SynchronizedObject):
+    __slots__ = ('__creationDateTime', '__modificationDateTime', '__subject', 
+                 '__description', '__fgColor', '__bgColor', '__font', '__icon',
+                 '__selectedIcon', '__ordering', '__id', '__weakref__')
+    
     rx_attributes = re.compile(r'\[(\w+):(.+)\]')
 
     if sys.version_info.major == 2:
@@ -478,8 +485,8 @@ class CompositeObject(Object, patterns.ObservableComposite):
         else:
             self.__expandedContexts.discard(context)
         if notify:
-            pub.sendMessage(self.expansionChangedEventType(), newValue=expand,
-                            sender=self)
+            patterns.sendMessage(self.expansionChangedEventType(), newValue=expand,
+                                 sender=self)
 
     @classmethod
     def expansionChangedEventType(cls):
@@ -18,14 +18,66 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from taskcoachlib import patterns
 from taskcoachlib.thirdparty.pubsub import pub
+import bisect
+
+
+class ReversedSortKey(object):
+    ''' Wrap a sort key so that it sorts in reverse order. This allows for 
+        combining ascending and descending sort keys in one tuple. '''
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value):
+        self.value = value
+        
+    def __repr__(self):
+        return 'ReversedSortKey(%r)' % (self.value,)  # pragma: no cover
+        
+    def __eq__(self, other):
+        return self.value == other.value
+    
+    def __ne__(self, other):
+        return self.value != other.value
+    
+    def __lt__(self, other):
+        return other.value < self.value
+    
+    def __le__(self, other):
+        return other.value <= self.value
+    
+    def __gt__(self, other):
+        return other.value > self.value
+    
+    def __ge__(self, other):
+        return other.value >= self.value
+    
+    
+class SortKeys(object):
+    ''' Read-only sequence of the cached sort keys of the items of a sorted
+        list, so that the bisect module can search the list by key. '''
+    
+    def __init__(self, items, sortKeyCache):
+        self.__items = items
+        self.__sortKeyCache = sortKeyCache
+        
+    def __len__(self):
+        return len(self.__items)
+    
+    def __getitem__(self, index):
+        return self.__sortKeyCache[self.__items[index]]
 
 
 class Sorter(patterns.ListDecorator):
-    ''' This class decorates a list and sorts its contents. '''
+    ''' This class decorates a list and sorts its contents. The sort key of 
+        each item is computed once and cached. When an attribute of an item 
+        changes, only the items affected by the change are moved to their new 
+        position instead of resorting the whole list. '''
     
     def __init__(self, *args, **kwargs):
         self._sortKeys = kwargs.pop('sortBy', ['subject'])
         self._sortCaseSensitive = kwargs.pop('sortCaseSensitive', True)
+        self.__sortKeyFunction = None
+        self.__sortKeyCache = dict()  # {item: sort key}
         super(Sorter, self).__init__(*args, **kwargs)
         for sortKey in self._sortKeys:
             self._registerObserverForAttribute(sortKey.lstrip('-'))
@@ -48,7 +100,16 @@ class Sorter(patterns.ListDecorator):
     @patterns.eventSource
     def extendSelf(self, items, event=None):
         super(Sorter, self).extendSelf(items, event)
-        self.reset()
+        if self.__sortKeyFunction is None:
+            self.reset()
+        elif not self.isFrozen():
+            self.__resort(items)
+
+    @patterns.eventSource
+    def removeItemsFromSelf(self, items, event=None):
+        super(Sorter, self).removeItemsFromSelf(items, event=event)
+        for item in items:
+            self.__sortKeyCache.pop(item, None)
 
     def isAscending(self):
         if self._sortKeys:
@@ -58,9 +119,8 @@ class Sorter(patterns.ListDecorator):
     def sortKeys(self):
         return self._sortKeys
 
-    # We don't implement removeItemsFromSelf() because there is no need 
-    # to resort when items are removed since after removing items the 
-    # remaining items are still in the right order.
+    # There is no need to resort when items are removed since after removing
+    # items the remaining items are still in the right order.
 
     def sortBy(self, sortKey):
         if self._sortKeys and self._sortKeys[0] == sortKey:
@@ -97,13 +157,78 @@ class Sorter(patterns.ListDecorator):
         if self.isFrozen():
             return
 
+        self.__sortKeyFunction = self.createCompositeSortKeyFunction()
+        self.__sortKeyCache.clear()
+        self.__resort(self, forceEvent=forceEvent)
+        
+    def __resort(self, itemsToRecompute, forceEvent=False):
+        ''' Recompute the sort keys of the items and sort the list using the 
+            cached sort keys for the other items. '''
+        sortKeyFunction = self.__sortKeyFunction
+        sortKeyCache = self.__sortKeyCache
+        for item in itemsToRecompute:
+            sortKeyCache[item] = sortKeyFunction(item)
         oldSelf = self[:]
-        # XXXTODO: create only one function with all keys ? Reversing may
-        # be problematic.
-        for sortKey in reversed(self._sortKeys):
-            self.sort(key=self.createSortKeyFunction(sortKey.lstrip('-')), reverse=sortKey.startswith('-'))
+        self.sort(key=sortKeyCache.__getitem__)
         if forceEvent or self != oldSelf:
-            pub.sendMessage(self.sortEventType(), sender=self)
+            patterns.sendMessage(self.sortEventType(), sender=self)
+            
+    def resortItems(self, changedItems):
+        ''' Move the changed items, and the items whose sort key depends on 
+            the changed items, to their new position. If a changed item is not
+            in this list, we don't know which items are affected so we resort 
+            the whole list. '''
+        if self.isFrozen() or self.__sortKeyFunction is None:
+            return
+        sortKeyCache = self.__sortKeyCache
+        if any(item not in sortKeyCache for item in changedItems):
+            self.reset()
+            return
+        affectedItems = set()
+        for item in changedItems:
+            affectedItems.update(self._itemsAffectedByChangeOf(item))
+        affectedItems = [item for item in affectedItems if item in sortKeyCache]
+        if 10 * len(affectedItems) > len(self):
+            # When many items change, sorting is cheaper than moving items
+            self.__resort(affectedItems)
+        else:
+            moved = False
+            for item in affectedItems:
+                moved |= self.__moveItem(item)
+            if moved:
+                patterns.sendMessage(self.sortEventType(), sender=self)
+                
+    def __moveItem(self, item):
+        ''' Move the item to the position that matches its new sort key. 
+            Among items with an equal sort key, the item keeps its relative 
+            position, just like a stable sort would do. Returns whether the
+            item was moved. '''
+        newSortKey = self.__sortKeyFunction(item)
+        if newSortKey == self.__sortKeyCache[item]:
+            return False
+        oldIndex = self.index(item)
+        del self[oldIndex]
+        self.__sortKeyCache[item] = newSortKey
+        sortKeys = SortKeys(self, self.__sortKeyCache)
+        lowIndex = bisect.bisect_left(sortKeys, newSortKey)
+        highIndex = bisect.bisect_right(sortKeys, newSortKey, lowIndex)
+        newIndex = min(max(oldIndex, lowIndex), highIndex)
+        self.insert(newIndex, item)
+        return newIndex != oldIndex
+
+    def createCompositeSortKeyFunction(self):
+        ''' Return a function that returns a tuple with the sort keys of an 
+            item, so we need to sort only once, no matter how many sort keys 
+            there are. Descending sort keys are wrapped in a ReversedSortKey 
+            instance. '''
+        sortKeyFunctions = [(self.createSortKeyFunction(sortKey.lstrip('-')), 
+                             sortKey.startswith('-')) \
+                            for sortKey in self._sortKeys]
+        def compositeSortKeyFunction(item):
+            return tuple([ReversedSortKey(sortKeyFunction(item)) if reverse \
+                          else sortKeyFunction(item) \
+                          for sortKeyFunction, reverse in sortKeyFunctions])
+        return compositeSortKeyFunction
 
     def createSortKeyFunction(self, sortKey):
         ''' createSortKeyFunction returns a function that is passed to the 
@@ -137,10 +262,15 @@ class Sorter(patterns.ListDecorator):
                                                     eventType=eventType)
      
     def onAttributeChanged(self, newValue, sender):  # pylint: disable=W0613
-        self.reset()
+        self.resortItems([sender])
            
-    def onAttributeChanged_Deprecated(self, event):  # pylint: disable=W0613
-        self.reset()
+    def onAttributeChanged_Deprecated(self, event):
+        self.resortItems(event.sources())
+        
+    def _itemsAffectedByChangeOf(self, item):
+        ''' Return the items whose sort key may change when the item
+            changes. '''
+        return set([item])
 
     def _getSortEventTypes(self, attribute):
         try:
@@ -170,6 +300,21 @@ class TreeSorter(Sorter):
         self.__invalidateRootItemCache()
         return super(TreeSorter, self).reset(*args, **kwargs)
 
+    def resortItems(self, *args, **kwargs):
+        self.__invalidateRootItemCache()
+        return super(TreeSorter, self).resortItems(*args, **kwargs)
+    
+    def _itemsAffectedByChangeOf(self, item):
+        ''' In tree mode, sort keys are computed recursively so a change of an
+            item may also change the sort keys of its ancestors and its 
+            descendants. Moving these items keeps each of the affected sibling
+            groups sorted without resorting the other items. '''
+        affectedItems = super(TreeSorter, self)._itemsAffectedByChangeOf(item)
+        if self.treeMode():
+            affectedItems.update(item.ancestors())
+            affectedItems.update(item.children(recursive=True))
+        return affectedItems
+
     @patterns.eventSource
     def extendSelf(self, items, event=None):
         self.__invalidateRootItemCache()
@@ -27,31 +27,40 @@ class CategoryFilter(base.Filter):
         self.__categories = kwargs.pop('categories')
         self.__filterOnlyWhenAllCategoriesMatch = \
             kwargs.pop('filterOnlyWhenAllCategoriesMatch', False)
+        # Index of the categorizables belonging to each category, including
+        # the categorizables of subcategories and the children of the
+        # categorizables. Entries are created when a category is used for 
+        # filtering and are kept up to date while categorizables are added or
+        # removed: {category: set(categorizables)}
+        self.__categorizablesPerCategory = dict()
         for eventType in (self.__categories.addItemEventType(),
                           self.__categories.removeItemEventType()):
-            patterns.Publisher().registerObserver(self.onCategoryChanged,
+            patterns.Publisher().registerObserver(self.onCategoriesChanged,
                                                   eventType=eventType, 
                                                   eventSource=self.__categories)
-        eventTypes = (Category.categorizableAddedEventType(),
-                      Category.categorizableRemovedEventType(),
-                      Category.filterChangedEventType())
-        for eventType in eventTypes:
-            patterns.Publisher().registerObserver(self.onCategoryChanged,
-                                                  eventType=eventType)
+        patterns.Publisher().registerObserver(self.onCategorizableAdded,
+            eventType=Category.categorizableAddedEventType())
+        patterns.Publisher().registerObserver(self.onCategorizableRemoved,
+            eventType=Category.categorizableRemovedEventType())
+        patterns.Publisher().registerObserver(self.onCategoryChanged,
+            eventType=Category.filterChangedEventType())
         pub.subscribe(self.onFilterMatchingChanged, 'settings.view.categoryfiltermatchall')
         super(CategoryFilter, self).__init__(*args, **kwargs)
 
     def detach(self):
         super(CategoryFilter, self).detach()
-        self.removeObserver(self.onCategoryChanged)
+        for observer in (self.onCategoriesChanged, self.onCategorizableAdded,
+                         self.onCategorizableRemoved, self.onCategoryChanged):
+            self.removeObserver(observer)
 
     def filterItems(self, categorizables):
         filteredCategories = self.__categories.filteredCategories()
         if not filteredCategories:
             return categorizables
         
+        categorizables = set(categorizables)
         if self.__filterOnlyWhenAllCategoriesMatch:
-            filteredCategorizables = set(categorizables)
+            filteredCategorizables = categorizables.copy()
             for category in filteredCategories:
                 filteredCategorizables &= self.__categorizablesBelongingToCategory(category)
         else:
@@ -59,19 +68,82 @@ class CategoryFilter(base.Filter):
             for category in filteredCategories: 
                 filteredCategorizables |= self.__categorizablesBelongingToCategory(category)
 
-        filteredCategorizables &= self.observable()
+        filteredCategorizables &= categorizables
         return filteredCategorizables
 
+    def __categorizablesBelongingToCategory(self, category):
+        try:
+            return self.__categorizablesPerCategory[category]
+        except KeyError:
+            categorizables = self.__categorizablesPerCategory[category] = \
+                self.__withChildren(category.categorizables(recursive=True))
+            return categorizables
+        
     @staticmethod
-    def __categorizablesBelongingToCategory(category):
-        categorizables = category.categorizables(recursive=True)
-        for categorizable in categorizables.copy():
-            categorizables |= set(categorizable.children(recursive=True))           
-        return categorizables
+    def __withChildren(categorizables):
+        result = set(categorizables)
+        for categorizable in categorizables:
+            result.update(categorizable.children(recursive=True))
+        return result
+        
+    @staticmethod
+    def __belongsToCategory(categorizable, category):
+        for eachCategory in categorizable.categories(recursive=True, 
+                                                     upwards=True):
+            if eachCategory == category or category in eachCategory.ancestors():
+                return True
+        return False
+    
+    def onAddItem(self, event):
+        # Added categorizables may be children of categorizables that belong
+        # to a category, or may have been removed and added again with a 
+        # different parent, so check each of them:
+        for category, categorizables in self.__categorizablesPerCategory.items():
+            categorizables.update(categorizable for categorizable in event.values() \
+                                  if self.__belongsToCategory(categorizable, category))
+        super(CategoryFilter, self).onAddItem(event)
+        
+    def onRemoveItem(self, event):
+        removedCategorizables = set(event.values())
+        for categorizables in self.__categorizablesPerCategory.values():
+            categorizables -= removedCategorizables
+        super(CategoryFilter, self).onRemoveItem(event)
         
     def onFilterMatchingChanged(self, value):
         self.__filterOnlyWhenAllCategoriesMatch = value
         self.reset()
 
+    def onCategoriesChanged(self, event): # pylint: disable=W0613
+        self.__categorizablesPerCategory.clear()
+        self.reset()
+        
+    def onCategorizableAdded(self, event):
+        changedCategorizables = set()
+        for category, categorizables in event.sourcesAndValuesByType().get(
+                Category.categorizableAddedEventType(), {}).items():
+            addedCategorizables = self.__withChildren(categorizables)
+            for eachCategory in [category] + category.ancestors():
+                if eachCategory in self.__categorizablesPerCategory:
+                    self.__categorizablesPerCategory[eachCategory] |= addedCategorizables
+            changedCategorizables |= addedCategorizables
+        self.refilterItems(changedCategorizables)
+        
+    def onCategorizableRemoved(self, event):
+        changedCategorizables = set()
+        for category, categorizables in event.sourcesAndValuesByType().get(
+                Category.categorizableRemovedEventType(), {}).items():
+            removedCategorizables = self.__withChildren(categorizables)
+            for eachCategory in [category] + category.ancestors():
+                if eachCategory in self.__categorizablesPerCategory:
+                    # A removed categorizable may still belong to the category
+                    # via another subcategory or its parent:
+                    remaining = set(eachCategory.categorizables(recursive=True))
+                    self.__categorizablesPerCategory[eachCategory] -= \
+                        set(categorizable for categorizable in removedCategorizables \
+                            if categorizable not in remaining and \
+                            remaining.isdisjoint(categorizable.ancestors()))
+            changedCategorizables |= removedCategorizables
+        self.refilterItems(changedCategorizables)
+
     def onCategoryChanged(self, event): # pylint: disable=W0613
         self.reset()
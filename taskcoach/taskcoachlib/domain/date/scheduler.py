@@ -20,23 +20,31 @@ from taskcoachlib import patterns
 from . import dateandtime, timedelta
 import logging
 import weakref
-import bisect
+import heapq
+import itertools
 
 
 class ScheduledMethod(object):
     def __init__(self, method):
         self.__func = method.__func__
         self.__self = weakref.ref(method.__self__)
+        self.__selfId = id(method.__self__)
         self.__id = None
 
     def setId(self, id_):
+        # Note that the id is not part of the hash, because it may be set 
+        # after the job has been scheduled.
         self.__id = id_
 
     def __eq__(self, other):
-        return self.__func is other.__func and self.__self() is other.__self() and self.__id == other.__id
+        return self.__func is other.__func and self.__selfId == other.__selfId and \
+            self.__self() is other.__self() and self.__id == other.__id
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash((self.__dict__['_ScheduledMethod__func'], self.__id))
+        return hash((self.__func, self.__selfId))
 
     def __call__(self, *args, **kwargs):
         obj = self.__self()
@@ -50,19 +58,31 @@ class TwistedScheduler(object):
     """
     A class to schedule jobs at specified date/time. Unlike apscheduler, this
     uses Twisted instead of threading, in order to avoid busy waits.
+
+    Jobs are kept in a heap of [dateTime, sequence number, job, interval]
+    entries. The sequence number keeps jobs scheduled at the same time in 
+    the order they were scheduled. Unscheduled entries are marked by 
+    setting their job to None and are skipped when they reach the top
+    of the heap.
     """
     def __init__(self):
         super(TwistedScheduler, self).__init__()
         self.__jobs = []
+        self.__entries = dict()  # Job -> list of heap entries for that job
+        self.__sequenceNumbers = itertools.count()
+        self.__nrRemovedEntries = 0
         self.__nextCall = None
         self.__firing = False
 
     def __schedule(self, job, dateTime, interval):
-        if self.__nextCall is not None:
-            self.__nextCall.cancel()
-            self.__nextCall = None
-        bisect.insort_right(self.__jobs, (dateTime, job, interval))
-        if not self.__firing:
+        entry = [dateTime, next(self.__sequenceNumbers), job, interval]
+        heapq.heappush(self.__jobs, entry)
+        self.__entries.setdefault(job, []).append(entry)
+        # The next call only needs to change when the new job is the first 
+        # one due, so scheduling lots of jobs, e.g. while loading a task file,
+        # doesn't restart the timer for each job:
+        if not self.__firing and (self.__nextCall is None or self.__jobs[0] is entry):
+            self.__cancelNextCall()
             self.__fire()
 
     def scheduleDate(self, job, dateTime):
@@ -76,31 +96,56 @@ class TwistedScheduler(object):
         self.__schedule(job, startDateTime or dateandtime.Now() + interval, interval)
 
     def unschedule(self, theJob):
-        for idx, (ts, job, interval) in enumerate(self.__jobs):
-            if job == theJob:
-                del self.__jobs[idx]
-                break
+        entries = self.__entries.get(theJob)
+        if entries:
+            self.__removeEntry(min(entries))
 
     def isScheduled(self, theJob):
-        for ts, job, interval in self.__jobs:
-            if job == theJob:
-                return True
-        return False
+        return theJob in self.__entries
 
     def shutdown(self):
-        if self.__nextCall is not None:
-            self.__nextCall.cancel()
-            self.__nextCall = None
+        self.__cancelNextCall()
         self.__jobs = []
+        self.__entries = dict()
+        self.__nrRemovedEntries = 0
 
     def jobs(self):
-        return [job for ts, job, interval in self.__jobs]
+        return [job for ts, seq, job, interval in sorted(self.__jobs) if job is not None]
+
+    def __forgetEntry(self, entry):
+        job = entry[2]
+        entries = self.__entries[job]
+        entries.remove(entry)
+        if not entries:
+            del self.__entries[job]
+
+    def __removeEntry(self, entry):
+        self.__forgetEntry(entry)
+        entry[2] = None
+        self.__nrRemovedEntries += 1
+        if self.__nrRemovedEntries > len(self.__jobs) / 2:
+            self.__jobs = [eachEntry for eachEntry in self.__jobs if eachEntry[2] is not None]
+            heapq.heapify(self.__jobs)
+            self.__nrRemovedEntries = 0
+
+    def __cancelNextCall(self):
+        if self.__nextCall is not None:
+            self.__nextCall.cancel()
+            self.__nextCall = None
 
     def __fire(self):
         self.__firing = True
         try:
-            while self.__jobs and self.__jobs[0][0] <= dateandtime.Now():
-                ts, job, interval = self.__jobs.pop(0)
+            while self.__jobs:
+                if self.__jobs[0][2] is None:
+                    heapq.heappop(self.__jobs)
+                    self.__nrRemovedEntries -= 1
+                    continue
+                if self.__jobs[0][0] > dateandtime.Now():
+                    break
+                entry = heapq.heappop(self.__jobs)
+                self.__forgetEntry(entry)
+                ts, seq, job, interval = entry
                 try:
                     job()
                 except:
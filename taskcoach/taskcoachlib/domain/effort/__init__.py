@@ -21,4 +21,5 @@ from .composite import CompositeEffort, CompositeEffortPerPeriod, BaseCompositeE
 from .effortlist import EffortList, EffortListTracker
 from .sorter import EffortSorter
 from .reducer import EffortAggregator
+from .index import EffortIndex
 
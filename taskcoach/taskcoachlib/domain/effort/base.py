@@ -17,11 +17,15 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
-from taskcoachlib.thirdparty.pubsub import pub
+from taskcoachlib import patterns
 import weakref
 
 
 class BaseEffort(object):
+    # The attributes are stored in slots of Effort. Composite efforts have a
+    # __dict__ because their base classes don't define slots.
+    __slots__ = ()
+    
     def __init__(self, task, start, stop, *args, **kwargs):
         self._task = None if task is None else weakref.ref(task)
         self._start = start
@@ -72,16 +76,16 @@ class BaseEffort(object):
         return 'pubsub.effort.track'
 
     def sendDurationChangedMessage(self):
-        pub.sendMessage(self.durationChangedEventType(), 
-                        newValue=self.duration(), sender=self)
+        patterns.sendMessage(self.durationChangedEventType(), 
+                             newValue=self.duration(), sender=self)
         
     @classmethod
     def durationChangedEventType(class_):
         return 'pubsub.effort.duration'
     
     def sendRevenueChangedMessage(self):
-        pub.sendMessage(self.revenueChangedEventType(), 
-                        newValue=self.revenue(), sender=self)
+        patterns.sendMessage(self.revenueChangedEventType(), 
+                             newValue=self.revenue(), sender=self)
 
     @classmethod
     def revenueChangedEventType(class_):
@@ -17,10 +17,9 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
-from taskcoachlib import render
+from taskcoachlib import patterns, render
 from taskcoachlib.domain import date
 from taskcoachlib.i18n import _
-from taskcoachlib.thirdparty.pubsub import pub
 from . import base
 
 
@@ -88,7 +87,7 @@ class BaseCompositeEffort(base.BaseEffort):  # pylint: disable=W0223
         if self._getEfforts():
             self.sendDurationChangedMessage()
         else:
-            pub.sendMessage(self.compositeEmptyEventType(), sender=self)
+            patterns.sendMessage(self.compositeEmptyEventType(), sender=self)
         
     @classmethod
     def compositeEmptyEventType(class_):
@@ -125,11 +124,13 @@ class CompositeEffort(BaseCompositeEffort):
         (and its children) and within a certain time period. The task, start 
         of time period and end of time period need to be provided when
         initializing the CompositeEffort and cannot be changed
-        afterwards. '''
+        afterwards. If an effort index is provided, the efforts are looked up
+        in the index instead of in the efforts of the task. '''
     
-    def __init__(self, task, start, stop):  # pylint: disable=W0621
+    def __init__(self, task, start, stop, effortIndex=None):  # pylint: disable=W0621
         super(CompositeEffort, self).__init__(task, start, stop)
         self.__hash_value = hash((task, start))
+        self.__effort_index = effortIndex
         # Effort cache: {True: [efforts recursively], False: [efforts]}
         self.__effort_cache = dict()  
         '''
@@ -164,12 +165,22 @@ class CompositeEffort(BaseCompositeEffort):
         cache_changed = False
         for recursive in recursive_values:
             cache = self.__effort_cache[recursive] = \
-                set([effort for effort in \
-                     self.task().efforts(recursive=recursive) if \
-                     self._inPeriod(effort)])
+                set(self.__efforts_in_period(recursive))
             if cache != previous_cache.get(recursive, set()):
                 cache_changed = True
         return cache_changed
+    
+    def __efforts_in_period(self, recursive):
+        task = self.task()  # pylint: disable=W0621
+        if self.__effort_index is None:
+            return [effort for effort in task.efforts(recursive=recursive) \
+                    if self._inPeriod(effort)]
+        efforts = self.__effort_index.effortsStartingBetween(self.getStart(), 
+                                                             self.getStop())
+        if recursive:
+            return [effort for effort in efforts if effort.task() == task or \
+                    task in effort.task().ancestors()]
+        return [effort for effort in efforts if effort.task() == task]
                 
     def _getEfforts(self, recursive=True):  # pylint: disable=W0221
         if recursive not in self.__effort_cache:
@@ -212,8 +223,10 @@ class CompositeEffortPerPeriod(BaseCompositeEffort):
         
     total = Total()
         
-    def __init__(self, start, stop, taskList, initialEffort=None):
+    def __init__(self, start, stop, taskList, initialEffort=None, 
+                 effortIndex=None):
         self.taskList = taskList
+        self.__effort_index = effortIndex
         super(CompositeEffortPerPeriod, self).__init__(None, start, stop)
         if initialEffort:
             assert self._inPeriod(initialEffort)
@@ -264,9 +277,15 @@ class CompositeEffortPerPeriod(BaseCompositeEffort):
 
     def _refreshCache(self):
         previous_cache = [] if self.__effort_cache is None else self.__effort_cache[:]
-        self.__effort_cache = []
-        self.__add_task_effort_to_cache(self.taskList)
-        return previous_cache != self.__effort_cache
+        if self.__effort_index is None:
+            self.__effort_cache = []
+            self.__add_task_effort_to_cache(self.taskList)
+        else:
+            self.__effort_cache = self.__effort_index.effortsStartingBetween(\
+                self.getStart(), self.getStop())
+        # The order of the efforts depends on how the cache was filled, so
+        # ignore the order when checking whether the cache changed:
+        return set(previous_cache) != set(self.__effort_cache)
 
     def __add_task_effort_to_cache(self, tasks):
         ''' Add the effort of the tasks to the cache. '''
@@ -19,12 +19,15 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from taskcoachlib import patterns
 from taskcoachlib.domain import date, base, task
-from taskcoachlib.thirdparty.pubsub import pub
 from . import base as baseeffort
 import weakref
 
 
 class Effort(baseeffort.BaseEffort, base.Object):
+    # Task files can contain many efforts, so don't give each effort a 
+    # __dict__:
+    __slots__ = ('_task', '_start', '_stop', '__cachedDuration')
+    
     def __init__(self, task=None, start=None, stop=None, *args, **kwargs):
         super(Effort, self).__init__(task, start or date.DateTime.now(), stop, 
             *args, **kwargs)
@@ -46,7 +49,7 @@ class Effort(baseeffort.BaseEffort, base.Object):
         self._task = weakref.ref(task)
         self._task().addEffort(self)
         event.send()
-        pub.sendMessage(self.taskChangedEventType(), newValue=task, sender=self)
+        patterns.sendMessage(self.taskChangedEventType(), newValue=task, sender=self)
         
     setParent = setTask  # FIXME: should we create a common superclass for Effort and Task?
 
@@ -91,8 +94,8 @@ class Effort(baseeffort.BaseEffort, base.Object):
             return
         self._start = startDateTime
         self.__updateDurationCache()
-        pub.sendMessage(self.startChangedEventType(), newValue=startDateTime,
-                        sender=self)
+        patterns.sendMessage(self.startChangedEventType(), newValue=startDateTime,
+                             sender=self)
         self.task().sendTimeSpentChangedMessage()
         self.sendDurationChangedMessage()
         if self.task().hourlyFee():
@@ -113,15 +116,15 @@ class Effort(baseeffort.BaseEffort, base.Object):
         self._stop = newStop
         self.__updateDurationCache()
         if newStop == None:
-            pub.sendMessage(self.trackingChangedEventType(), newValue=True, 
-                            sender=self)
+            patterns.sendMessage(self.trackingChangedEventType(), newValue=True, 
+                                 sender=self)
             self.task().sendTrackingChangedMessage(tracking=True)
         elif previousStop == None:
-            pub.sendMessage(self.trackingChangedEventType(), newValue=False,
-                            sender=self)
+            patterns.sendMessage(self.trackingChangedEventType(), newValue=False,
+                                 sender=self)
             self.task().sendTrackingChangedMessage(tracking=False)
         self.task().sendTimeSpentChangedMessage()
-        pub.sendMessage(self.stopChangedEventType(), newValue=self._stop,
+        patterns.sendMessage(self.stopChangedEventType(), newValue=self._stop,
                            sender=self)
         self.sendDurationChangedMessage()
         if self.task().hourlyFee():
@@ -58,7 +58,7 @@ class EffortList(patterns.SetDecorator, MaxDateTimeMixin,
         super(EffortList, self).extendSelf(effortsToAdd, event)
         for effort in effortsToAdd:
             if effort.getStop() is None:
-                pub.sendMessage(effort.trackingChangedEventType(), newValue=True, sender=effort)
+                patterns.sendMessage(effort.trackingChangedEventType(), newValue=True, sender=effort)
         
     def removeItemsFromSelf(self, tasks, event=None):
         ''' This method is called when a task is removed from the observed 
@@ -72,7 +72,7 @@ class EffortList(patterns.SetDecorator, MaxDateTimeMixin,
             effortsToRemove.extend(task.efforts())
         for effort in effortsToRemove:
             if effort.getStop() is None:
-                pub.sendMessage(effort.trackingChangedEventType(), newValue=False, sender=effort)
+                patterns.sendMessage(effort.trackingChangedEventType(), newValue=False, sender=effort)
         super(EffortList, self).removeItemsFromSelf(effortsToRemove, event)
 
     def onAddEffortToOrRemoveEffortFromTask(self, newValue, sender):
@@ -85,9 +85,9 @@ class EffortList(patterns.SetDecorator, MaxDateTimeMixin,
         super(EffortList, self).removeItemsFromSelf(effortsToRemove)
         for effort in effortsToAdd + effortsToRemove:
             if effort.getStop() is None:
-                pub.sendMessage(effort.trackingChangedEventType(),
-                                newValue=effort in effortsToAdd,
-                                sender=effort)
+                patterns.sendMessage(effort.trackingChangedEventType(),
+                                     newValue=effort in effortsToAdd,
+                                     sender=effort)
 
     def originalLength(self):
         ''' Do not delegate originalLength to the underlying TaskList because
@@ -0,0 +1,98 @@
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import bisect
+
+
+class EffortIndex(object):
+    ''' EffortIndex keeps efforts sorted by their start date time so that
+        the efforts starting in a period can be found by bisecting instead
+        of by checking all efforts. The index doesn't observe the efforts
+        itself; its owner needs to add and remove efforts and call
+        updateStart() when the start of an effort changes. '''
+
+    def __init__(self, efforts=None):
+        self.__starts = []  # Sorted start date times
+        self.__efforts = []  # The efforts, in the same order as self.__starts
+        self.__indexedStarts = dict()  # {effort: start date time in index}
+        if efforts:
+            self.add(*efforts)
+
+    def __len__(self):
+        return len(self.__efforts)
+
+    def __contains__(self, effort):
+        return effort in self.__indexedStarts
+
+    def add(self, *efforts):
+        efforts = [effort for effort in efforts \
+                   if effort not in self.__indexedStarts]
+        if len(efforts) == 1:
+            effort = efforts[0]
+            start = self.__indexedStarts[effort] = effort.getStart()
+            position = bisect.bisect_right(self.__starts, start)
+            self.__starts.insert(position, start)
+            self.__efforts.insert(position, effort)
+        elif efforts:
+            for effort in efforts:
+                self.__indexedStarts[effort] = effort.getStart()
+            # Sorting is cheap since the efforts already in the index are
+            # sorted, so add all efforts in one go:
+            self.__rebuild(self.__efforts + efforts)
+
+    def remove(self, *efforts):
+        efforts = [effort for effort in efforts \
+                   if effort in self.__indexedStarts]
+        if len(efforts) == 1:
+            effort = efforts[0]
+            position = self.__position(effort)
+            del self.__starts[position]
+            del self.__efforts[position]
+            del self.__indexedStarts[effort]
+        elif efforts:
+            for effort in efforts:
+                del self.__indexedStarts[effort]
+            self.__rebuild([effort for effort in self.__efforts \
+                            if effort in self.__indexedStarts])
+
+    def updateStart(self, effort):
+        ''' Move the effort to its new position after its start date time
+            changed. '''
+        if effort in self.__indexedStarts:
+            self.remove(effort)
+            self.add(effort)
+
+    def effortsStartingBetween(self, start, stop):
+        ''' Return the efforts that start in the period from start up to and
+            including stop, ordered by start date time. '''
+        low = bisect.bisect_left(self.__starts, start)
+        high = bisect.bisect_right(self.__starts, stop, low)
+        return self.__efforts[low:high]
+
+    def __position(self, effort):
+        start = self.__indexedStarts[effort]
+        position = bisect.bisect_left(self.__starts, start)
+        while self.__efforts[position] is not effort:
+            position += 1
+        return position
+
+    def __rebuild(self, efforts):
+        indexedStarts = self.__indexedStarts
+        efforts.sort(key=lambda effort: indexedStarts[effort])
+        self.__efforts = efforts
+        self.__starts = [indexedStarts[effort] for effort in efforts]
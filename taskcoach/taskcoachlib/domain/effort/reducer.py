@@ -22,6 +22,7 @@ from taskcoachlib.thirdparty.pubsub import pub
 from . import composite
 from . import effortlist
 from . import effort
+from . import index
 
 
 class EffortAggregator(patterns.SetDecorator, 
@@ -35,6 +36,9 @@ class EffortAggregator(patterns.SetDecorator,
     def __init__(self, *args, **kwargs):
         self.__composites = {}
         self.__trackedComposites = set()
+        # Efforts of the tasks in the observed list, used by the composites
+        # to find the efforts in their period:
+        self.__effort_index = index.EffortIndex()
         aggregation = kwargs.pop('aggregation')
         assert aggregation in ('day', 'week', 'month')
         aggregation = aggregation.capitalize()
@@ -78,6 +82,8 @@ class EffortAggregator(patterns.SetDecorator,
             to the observing list (i.e. this list) unchanged. We override 
             the default behavior to first get the efforts from the task
             and then group the efforts by time period. '''
+        for task in tasks:  # pylint: disable=W0621
+            self.__effort_index.add(*task.efforts())
         new_composites = []
         for task in tasks:  # pylint: disable=W0621
             new_composites.extend(self.__create_composites(task, task.efforts()))
@@ -90,8 +96,8 @@ class EffortAggregator(patterns.SetDecorator,
         for new_composite in new_composites:
             if new_composite.isBeingTracked():
                 self.__trackedComposites.add(new_composite)
-                pub.sendMessage(effort.Effort.trackingChangedEventType(),
-                                newValue=True, sender=new_composite)
+                patterns.sendMessage(effort.Effort.trackingChangedEventType(),
+                                     newValue=True, sender=new_composite)
 
     @patterns.eventSource
     def removeItemsFromSelf(self, tasks, event=None):
@@ -100,6 +106,7 @@ class EffortAggregator(patterns.SetDecorator,
             remove the item from the observing list (i.e. this list)
             unchanged. We override the default behavior to remove the 
             tasks' efforts from the CompositeEfforts they are part of. '''
+        self.__remove_efforts_from_index(tasks)
         composites_to_remove = []
         for task in tasks:  # pylint: disable=W0621
             composites_to_remove.extend(self.__composites_to_remove(task))
@@ -115,6 +122,7 @@ class EffortAggregator(patterns.SetDecorator,
     def onTaskRemoved(self, event):
         ''' Whenever tasks are removed, find the composites that 
             (did) contain effort of those tasks and update them. '''
+        self.__remove_efforts_from_index(event.values())
         affected_composites = self.__get_composites_for_tasks(event.values())
         for affected_composite in affected_composites:
             affected_composite._invalidateCache()
@@ -127,6 +135,11 @@ class EffortAggregator(patterns.SetDecorator,
         newValue, oldValue = newValue
         efforts_added = [effort for effort in newValue if effort not in oldValue]
         efforts_removed = [effort for effort in oldValue if effort not in newValue]
+        self.__effort_index.add(*efforts_added)
+        # An effort that moved to another task in the observed list may have
+        # been added to the index for that task already:
+        self.__effort_index.remove(*[effort for effort in efforts_removed \
+            if effort.task() == sender or effort.task() not in self.observable()])
         new_composites.extend(self.__create_composites(sender, efforts_added))
         self.__extend_self_with_composites(new_composites)
         for affected_composite in self.__get_composites_for_efforts(efforts_added + efforts_removed):
@@ -143,6 +156,7 @@ class EffortAggregator(patterns.SetDecorator,
         for task in event.sources():  # pylint: disable=W0621
             if task in self.observable():
                 child = event.value(task)
+                self.__effort_index.add(*child.efforts(recursive=True))
                 new_composites.extend(self.__create_composites(task,
                     child.efforts(recursive=True)))
         self.__extend_self_with_composites(new_composites)
@@ -165,6 +179,7 @@ class EffortAggregator(patterns.SetDecorator,
         self.__remove_composites_from_self([sender])
         
     def onEffortStartChanged(self, newValue, sender):  # pylint: disable=W0613
+        self.__effort_index.updateStart(sender)
         new_composites = []
         key = self.__key_for_effort(sender)
         task = sender.task()  # pylint: disable=W0621
@@ -210,7 +225,8 @@ class EffortAggregator(patterns.SetDecorator,
             if key in self.__composites:
                 self.__composites[key].addEffort(an_effort)
                 continue
-            new_composite = composite.CompositeEffort(*key)  # pylint: disable=W0142
+            new_composite = composite.CompositeEffort(*key,  # pylint: disable=W0142
+                effortIndex=self.__effort_index)
             new_composite.addEffort(an_effort)
             self.__composites[key] = new_composite
             new_composites.append(new_composite)
@@ -222,10 +238,17 @@ class EffortAggregator(patterns.SetDecorator,
             self.__composites[key].addEffort(an_effort)
             return []
         new_composite_per_period = composite.CompositeEffortPerPeriod(key[0], 
-                                          key[1], self.observable(), an_effort)
+                                          key[1], self.observable(), an_effort,
+                                          effortIndex=self.__effort_index)
         self.__composites[key] = new_composite_per_period
         return [new_composite_per_period]
 
+    def __remove_efforts_from_index(self, tasks):
+        efforts = []
+        for task in tasks:  # pylint: disable=W0621
+            efforts.extend(task.efforts())
+        self.__effort_index.remove(*efforts)
+
     def __composites_to_remove(self, task):  # pylint: disable=W0621
         efforts = task.efforts()
         task_and_ancestors = [task] + task.ancestors()
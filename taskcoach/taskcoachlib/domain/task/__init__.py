@@ -18,6 +18,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from .task import Task
 from .tasklist import TaskList
+from .statusscheduler import StatusScheduler
 from .status import *
 from . import filter  # pylint: disable=W0622
 from . import sorter
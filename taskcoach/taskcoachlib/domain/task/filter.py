@@ -17,7 +17,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
 from taskcoachlib import patterns
-from taskcoachlib.domain import base, date
+from taskcoachlib.domain import base
 from taskcoachlib.thirdparty.pubsub import pub
 from . import task
 from . import tasklist
@@ -37,6 +37,7 @@ class ViewFilter(tasklist.TaskListQueryMixin, base.Filter):
                           task.Task.actualStartDateTimeChangedEventType(),
                           task.Task.completionDateTimeChangedEventType(),
                           task.Task.prerequisitesChangedEventType(),
+                          task.Task.statusChangedEventType(),
                           task.Task.appearanceChangedEventType(),  # Proxy for status changes
                           task.Task.addChildEventType(),
                           task.Task.removeChildEventType()):
@@ -45,22 +46,39 @@ class ViewFilter(tasklist.TaskListQueryMixin, base.Filter):
             else:
                 registerObserver(self.onTaskStatusChange_Deprecated, 
                                  eventType=eventType)
-        date.Scheduler().schedule_interval(self.atMidnight, days=1)
 
     def detach(self):
         super(ViewFilter, self).detach()
         patterns.Publisher().removeObserver(self.onTaskStatusChange_Deprecated)
 
-    def atMidnight(self):
-        ''' Whether tasks are included in the filter or not may change at
-            midnight. '''
-        self.reset()
+    def extendSelf(self, tasks, event=None):  # pylint: disable=W0621
+        super(ViewFilter, self).extendSelf(tasks, event=event)
+        self._updateStatusCounts(tasks)
+        
+    def removeItemsFromSelf(self, tasks, event=None):  # pylint: disable=W0621
+        super(ViewFilter, self).removeItemsFromSelf(tasks, event=event)
+        self._updateStatusCounts(tasks)
 
     def onTaskStatusChange(self, newValue, sender):  # pylint: disable=W0613
-        self.reset()
+        self.refilterItems(self.__tasksAffectedByStatusChangeOf(sender))
         
-    def onTaskStatusChange_Deprecated(self, event=None):  # pylint: disable=W0613
-        self.reset()
+    def onTaskStatusChange_Deprecated(self, event=None):
+        affectedTasks = set()
+        for eachTask in event.sources():
+            affectedTasks.update(self.__tasksAffectedByStatusChangeOf(eachTask))
+        self.refilterItems(affectedTasks)
+
+    @staticmethod
+    def __tasksAffectedByStatusChangeOf(changedTask):
+        ''' The status of a task depends on the prerequisites of its ancestors
+            so a change of a task may also change the status of its 
+            descendants and of the tasks that depend on it. '''
+        affectedTasks = set([changedTask])
+        affectedTasks.update(changedTask.children(recursive=True))
+        for dependency in changedTask.dependencies():
+            affectedTasks.add(dependency)
+            affectedTasks.update(dependency.children(recursive=True))
+        return affectedTasks
         
     def hideTaskStatus(self, status, hide=True):
         if hide:
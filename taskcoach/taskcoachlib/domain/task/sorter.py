@@ -69,6 +69,16 @@ class Sorter(base.TreeSorter):
         else:
             return lambda task: []
 
+    def _itemsAffectedByChangeOf(self, changedTask):
+        # The status of tasks depends on the completion of their prerequisites,
+        # so when sorting by status the dependencies are affected too:
+        affectedTasks = super(Sorter, self)._itemsAffectedByChangeOf(changedTask)
+        if self.__sortByTaskStatusFirst:
+            for dependency in changedTask.dependencies():
+                affectedTasks.add(dependency)
+                affectedTasks.update(dependency.children(recursive=True))
+        return affectedTasks
+
     def _registerObserverForAttribute(self, attribute):
         # Sorter is always observing task dates and prerequisites because 
         # sorting by status depends on those attributes. Hence we don't need
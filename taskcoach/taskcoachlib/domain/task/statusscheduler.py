@@ -0,0 +1,130 @@
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+from taskcoachlib import patterns
+from taskcoachlib.domain import date
+import heapq
+import itertools
+import weakref
+
+
+class StatusScheduler(object):
+    ''' StatusScheduler keeps track of the date and time at which the status
+        of each task changes just because time passes, e.g. when a task
+        becomes due soon or over due. Rather than each task scheduling its
+        own jobs, the tasks are kept in one heap ordered by the date and
+        time of their next status change. A single job, scheduled for the
+        first of those, recomputes the status of all tasks whose status
+        change has passed in one go. '''
+
+    __metaclass__ = patterns.Singleton
+
+    def __init__(self):
+        super(StatusScheduler, self).__init__()
+        self.__heap = []  # [dateTime, sequence number, weak reference to task]
+        self.__entries = weakref.WeakKeyDictionary()  # {task: heap entry}
+        self.__sequenceNumbers = itertools.count()
+        self.__nrCancelledEntries = 0
+        self.__nextDateTime = None  # Date and time the job is scheduled for
+
+    def schedule(self, task):
+        ''' (Re)schedule the task for its next status change, if any. '''
+        wasScheduled = self.__cancel(task)
+        dateTime = task.nextStatusChangeDateTime()
+        if dateTime is not None:
+            entry = [dateTime, next(self.__sequenceNumbers), weakref.ref(task)]
+            heapq.heappush(self.__heap, entry)
+            self.__entries[task] = entry
+        if wasScheduled or dateTime is not None:
+            self.__scheduleJob()
+
+    def unschedule(self, task):
+        if self.__cancel(task):
+            self.__scheduleJob()
+
+    def isScheduled(self, task):
+        return task in self.__entries
+
+    def scheduledDateTime(self, task):
+        ''' Return the date and time of the next status change of the task
+            or None if the task isn't scheduled. '''
+        entry = self.__entries.get(task)
+        return entry[0] if entry else None
+
+    def __cancel(self, task):
+        # Removing an entry from the middle of the heap is expensive, so
+        # mark the entry as cancelled and skip it when it reaches the top:
+        entry = self.__entries.pop(task, None)
+        if not entry:
+            return False
+        entry[2] = None
+        self.__nrCancelledEntries += 1
+        if self.__nrCancelledEntries > len(self.__heap) / 2:
+            self.__heap = [each for each in self.__heap \
+                           if self.__task(each) is not None]
+            heapq.heapify(self.__heap)
+            self.__nrCancelledEntries = 0
+        return True
+
+    @staticmethod
+    def __task(entry):
+        reference = entry[2]
+        return None if reference is None else reference()
+
+    def __scheduleJob(self):
+        while self.__heap and self.__task(self.__heap[0]) is None:
+            if heapq.heappop(self.__heap)[2] is None:
+                self.__nrCancelledEntries -= 1
+        scheduler = date.Scheduler()
+        if not self.__heap:
+            if self.__nextDateTime is not None:
+                scheduler.unschedule(self.onStatusChangeDue)
+                self.__nextDateTime = None
+            return
+        nextDateTime = self.__heap[0][0]
+        # The scheduler may have been replaced since the job was scheduled,
+        # so check it still has the job:
+        if nextDateTime != self.__nextDateTime or \
+                not scheduler.is_scheduled(self.onStatusChangeDue):
+            scheduler.unschedule(self.onStatusChangeDue)
+            scheduler.schedule(self.onStatusChangeDue, nextDateTime)
+            self.__nextDateTime = nextDateTime
+
+    @patterns.eventBatch
+    def onStatusChangeDue(self):
+        ''' Recompute the status of all tasks whose status change has passed
+            and notify observers with one event. '''
+        self.__nextDateTime = None
+        now = date.Now()
+        tasks = []
+        while self.__heap and self.__heap[0][0] <= now:
+            entry = heapq.heappop(self.__heap)
+            task = self.__task(entry)
+            if task is None:
+                if entry[2] is None:
+                    self.__nrCancelledEntries -= 1
+                continue
+            del self.__entries[task]
+            tasks.append(task)
+        event = patterns.Event()
+        for task in tasks:
+            task.recomputeAppearance(event=event)
+        event.send()
+        for task in tasks:
+            self.schedule(task)
+        self.__scheduleJob()
@@ -25,6 +25,7 @@ from taskcoachlib.domain.attribute.icon import getImageOpen
 from taskcoachlib.thirdparty.pubsub import pub
 from taskcoachlib.thirdparty._weakrefset import WeakSet
 from . import status
+from .statusscheduler import StatusScheduler
 import weakref
 import wx
 
@@ -33,6 +34,12 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
            categorizable.CategorizableCompositeObject):
 
     maxDateTime = date.DateTime()
+    __tasks = WeakSet()  # All tasks, for passing on setting changes
+    # Parsed appearance settings, {(section, option): value}, for the settings
+    # in __paletteSettings. Colors and fonts are kept as tuples and native 
+    # info strings, because callers may change the wx objects they get:
+    __palette = dict()
+    __paletteSettings = None
     
     def __init__(self, subject='', description='', 
                  dueDateTime=None, plannedStartDateTime=None, 
@@ -48,6 +55,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         kwargs['categories'] = categories
         super(Task, self).__init__(*args, **kwargs)
         self.__status = None  # status cache
+        self.__notifiedStatus = None  # status last sent to observers
+        self.__recursiveAggregates = dict()  # cache of recursive values
         self.__dueSoonHours = self.settings.getint('behavior', 'duesoonhours')  # pylint: disable=E1101
         maxDateTime = self.maxDateTime    
         self.__dueDateTime = dueDateTime or maxDateTime
@@ -72,27 +81,106 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             shouldMarkCompletedWhenAllChildrenCompleted
         for effort in self._efforts:
             effort.setTask(self)
-        pub.subscribe(self.__computeRecursiveForegroundColor, 'settings.fgcolor')
-        pub.subscribe(self.__computeRecursiveBackgroundColor, 'settings.bgcolor')
-        pub.subscribe(self.__computeRecursiveIcon, 'settings.icon')
-        pub.subscribe(self.__computeRecursiveSelectedIcon, 'settings.icon')
-        pub.subscribe(self.onDueSoonHoursChanged, 'settings.behavior.duesoonhours')
-        pub.subscribe(self.onMarkParentCompletedWhenAllChildrenCompletedChanged,
-                      'settings.behavior.markparentcompletedwhenallchildrencompleted')
+        self.__registerForSettingChanges(self)
+        StatusScheduler().schedule(self)
+            
+    @staticmethod
+    def __registerForSettingChanges(task):
+        ''' Subscribing each task to the settings that influence all tasks
+            makes creating tasks and changing settings slow when there are 
+            many tasks. So Task subscribes to these settings only once and 
+            passes changes on to the registered tasks itself. '''
+        Task.__subscribeToSettingChanges()
+        Task.__tasks.add(task)
 
-        now = date.Now()
-        if now < self.__dueDateTime < maxDateTime:
-            date.Scheduler().schedule(self.onOverDue, self.__dueDateTime + date.ONE_SECOND)
-            if self.__dueSoonHours:
-                dueSoonDateTime = self.__dueDateTime + date.ONE_SECOND - date.TimeDelta(hours=self.__dueSoonHours)
-                if dueSoonDateTime > date.Now():
-                    date.Scheduler().schedule(self.onDueSoon, dueSoonDateTime)
-        if now < self.__plannedStartDateTime < maxDateTime:
-            date.Scheduler().schedule(self.onTimeToStart, self.__plannedStartDateTime + date.ONE_SECOND)
+    @staticmethod
+    def __subscribeToSettingChanges():
+        if not pub.isSubscribed(Task.__onIconSettingChanged, 'settings.icon'):
+            # Tasks registered before the subscriptions were removed, e.g. by
+            # pub.unsubAll(), shouldn't receive setting changes anymore and 
+            # the palette may be outdated:
+            Task.__tasks = WeakSet()
+            Task.__palette = dict()
+            pub.subscribe(Task.__onForegroundColorSettingChanged, 
+                          'settings.fgcolor')
+            pub.subscribe(Task.__onBackgroundColorSettingChanged, 
+                          'settings.bgcolor')
+            pub.subscribe(Task.__onFontSettingChanged, 'settings.font')
+            pub.subscribe(Task.__onIconSettingChanged, 'settings.icon')
+            pub.subscribe(Task.__onDueSoonHoursSettingChanged, 
+                          'settings.behavior.duesoonhours')
+            pub.subscribe(Task.__onMarkParentCompletedSettingChanged,
+                          'settings.behavior.markparentcompletedwhenallchildrencompleted')
+        
+    @classmethod
+    def __registeredTasks(class_):
+        return list(Task.__tasks)
+
+    @classmethod
+    @patterns.eventBatch
+    def __onForegroundColorSettingChanged(class_, value):  # pylint: disable=W0613
+        class_.__clearPalette('fgcolor')
+        for task in class_.__registeredTasks():
+            task.__computeRecursiveForegroundColor()
+
+    @classmethod
+    @patterns.eventBatch
+    def __onBackgroundColorSettingChanged(class_, value):  # pylint: disable=W0613
+        class_.__clearPalette('bgcolor')
+        for task in class_.__registeredTasks():
+            task.__computeRecursiveBackgroundColor()
+
+    @classmethod
+    def __onFontSettingChanged(class_, value):  # pylint: disable=W0613
+        class_.__clearPalette('font')
+
+    @classmethod
+    @patterns.eventBatch
+    def __onIconSettingChanged(class_, value):  # pylint: disable=W0613
+        class_.__clearPalette('icon')
+        for task in class_.__registeredTasks():
+            task.__computeRecursiveIcon()
+            task.__computeRecursiveSelectedIcon()
+
+    @classmethod
+    @patterns.eventBatch
+    def __onDueSoonHoursSettingChanged(class_, value):
+        for task in class_.__registeredTasks():
+            task.onDueSoonHoursChanged(value)
+
+    @classmethod
+    @patterns.eventBatch
+    def __onMarkParentCompletedSettingChanged(class_, value):
+        for task in class_.__registeredTasks():
+            task.onMarkParentCompletedWhenAllChildrenCompletedChanged(value)
             
+    @classmethod
+    def __clearPalette(class_, section):
+        for key in Task.__palette.keys():
+            if key[0] == section:
+                del Task.__palette[key]
+
+    @classmethod
+    def __paletteEntry(class_, section, taskStatus, parse):
+        ''' Return the parsed appearance setting for the task status. The 
+            appearance of each task is looked up whenever a viewer draws it,
+            so the parsed settings are kept until they change. '''
+        if class_.settings is not Task.__paletteSettings:  # pylint: disable=E1101
+            Task.__palette = dict()
+            Task.__paletteSettings = class_.settings  # pylint: disable=E1101
+        key = (section, '%stasks' % taskStatus)
+        try:
+            return Task.__palette[key]
+        except KeyError:
+            # Make sure changes to the setting clear the palette:
+            Task.__subscribeToSettingChanges()
+            value = Task.__palette[key] = parse(class_.settings.get(*key))  # pylint: disable=E1101
+            return value
+
     @patterns.eventSource
     def __setstate__(self, state, event=None):
         super(Task, self).__setstate__(state, event=event)
+        self.__invalidateRecursiveAggregates()
         self.setPlannedStartDateTime(state['plannedStartDateTime'])
         self.setActualStartDateTime(state['actualStartDateTime'])
         self.setDueDateTime(state['dueDateTime'])
@@ -166,6 +254,21 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if super(Task, self).setCategories(*categories, **kwargs):
             self.recomputeAppearance(True, event=kwargs.pop('event'))
                 
+    def __invalidateRecursiveAggregates(self, *aggregates, **kwargs):
+        ''' Forget the cached recursive values (all of them if no aggregates
+            are specified) of this task and, unless upwards is False, of its 
+            ancestors since their recursive values include ours. '''
+        tasks = [self]
+        if kwargs.get('upwards', True):
+            tasks.extend(self.ancestors())
+        for eachTask in tasks:
+            cache = eachTask.__recursiveAggregates
+            if aggregates:
+                for aggregate in aggregates:
+                    cache.pop(aggregate, None)
+            else:
+                cache.clear()
+                
     def allChildrenCompleted(self):
         ''' Return whether all children (non-recursively) are completed. '''
         children = self.children()
@@ -178,6 +281,7 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             return
         wasTracking = self.isBeingTracked(recursive=True)
         super(Task, self).addChild(child, event=event)
+        self.__invalidateRecursiveAggregates()
         self.childChangeEvent(child, wasTracking, event)
         if self.shouldBeMarkedCompleted():
             self.setCompletionDateTime(child.completionDateTime())
@@ -192,6 +296,7 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             return
         wasTracking = self.isBeingTracked(recursive=True)
         super(Task, self).removeChild(child, event=event)
+        self.__invalidateRecursiveAggregates()
         self.childChangeEvent(child, wasTracking, event)    
         if self.shouldBeMarkedCompleted(): 
             # The removed child was the last uncompleted child
@@ -228,14 +333,14 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         super(Task, self).setSubject(subject, event=event)
         # The subject of a dependency of our prerequisites has changed, notify:
         for prerequisite in self.prerequisites():   
-            pub.sendMessage(prerequisite.dependenciesChangedEventType(), 
-                            newValue=prerequisite.dependencies(), 
-                            sender=prerequisite)
+            patterns.sendMessage(prerequisite.dependenciesChangedEventType(), 
+                                 newValue=prerequisite.dependencies(), 
+                                 sender=prerequisite)
         # The subject of a prerequisite of our dependencies has changed, notify:
         for dependency in self.dependencies():
-            pub.sendMessage(dependency.prerequisitesChangedEventType(), 
-                            newValue=dependency.prerequisites(), 
-                            sender=dependency)
+            patterns.sendMessage(dependency.prerequisitesChangedEventType(), 
+                                 newValue=dependency.prerequisites(), 
+                                 sender=dependency)
     # Due date
             
     def dueDateTime(self, recursive=False):
@@ -250,34 +355,19 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if dueDateTime == self.__dueDateTime:
             return
         self.__dueDateTime = dueDateTime
-        date.Scheduler().unschedule(self.onOverDue)
-        date.Scheduler().unschedule(self.onDueSoon)
-        if date.Now() <= dueDateTime < self.maxDateTime:
-            date.Scheduler().schedule(self.onOverDue, 
-                                      dueDateTime + date.ONE_SECOND)
-            if self.__dueSoonHours > 0:
-                dueSoonDateTime = dueDateTime + date.ONE_SECOND - \
-                    date.TimeDelta(hours=self.__dueSoonHours)
-                if dueSoonDateTime > date.Now():
-                    date.Scheduler().schedule(self.onDueSoon, dueSoonDateTime)
+        StatusScheduler().schedule(self)
         self.markDirty()
         self.recomputeAppearance()
-        pub.sendMessage(self.dueDateTimeChangedEventType(), 
-                        newValue=dueDateTime, sender=self)
+        patterns.sendMessage(self.dueDateTimeChangedEventType(), 
+                             newValue=dueDateTime, sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.dueDateTimeChangedEventType(),
-                            newValue=dueDateTime, sender=ancestor)
+            patterns.sendMessage(ancestor.dueDateTimeChangedEventType(),
+                                 newValue=dueDateTime, sender=ancestor)
 
     @classmethod
     def dueDateTimeChangedEventType(class_):
         return 'pubsub.task.dueDateTime'
 
-    def onOverDue(self):
-        self.recomputeAppearance()
-        
-    def onDueSoon(self):
-        self.recomputeAppearance()
-        
     @staticmethod
     def dueDateTimeSortFunction(**kwargs):
         recursive = kwargs.get('treeMode', False)
@@ -302,25 +392,19 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if plannedStartDateTime == self.__plannedStartDateTime:
             return
         self.__plannedStartDateTime = plannedStartDateTime
-        date.Scheduler().unschedule(self.onTimeToStart)
+        StatusScheduler().schedule(self)
         self.markDirty()
         self.recomputeAppearance()
-        if plannedStartDateTime < self.maxDateTime:
-            date.Scheduler().schedule(self.onTimeToStart, 
-                                      plannedStartDateTime + date.ONE_SECOND)
-        pub.sendMessage(self.plannedStartDateTimeChangedEventType(), 
-                        newValue=plannedStartDateTime, sender=self)
+        patterns.sendMessage(self.plannedStartDateTimeChangedEventType(), 
+                             newValue=plannedStartDateTime, sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.plannedStartDateTimeChangedEventType(),
-                            newValue=plannedStartDateTime, sender=ancestor)
+            patterns.sendMessage(ancestor.plannedStartDateTimeChangedEventType(),
+                                 newValue=plannedStartDateTime, sender=ancestor)
 
     @classmethod
     def plannedStartDateTimeChangedEventType(class_):
         return 'pubsub.task.plannedStartDateTime'
     
-    def onTimeToStart(self):
-        self.recomputeAppearance()
-
     @staticmethod
     def plannedStartDateTimeSortFunction(**kwargs):
         recursive = kwargs.get('treeMode', False)
@@ -338,7 +422,10 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     @staticmethod
     def timeLeftSortFunction(**kwargs):
         recursive = kwargs.get('treeMode', False)
-        return lambda task: task.timeLeft(recursive=recursive)
+        # Sorting on due date time gives the same order as sorting on time
+        # left, but the sort keys don't change as time passes, so the sorter
+        # can keep comparing cached sort keys with new ones:
+        return lambda task: task.dueDateTime(recursive=recursive)
     
     @classmethod
     def timeLeftSortEventTypes(class_):
@@ -359,16 +446,17 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if actualStartDateTime == self.__actualStartDateTime:
             return
         self.__actualStartDateTime = actualStartDateTime
+        StatusScheduler().schedule(self)
         if recursive:
             for child in self.children(recursive=True):
                 child.setActualStartDateTime(actualStartDateTime)
         self.markDirty()
         self.recomputeAppearance()
-        pub.sendMessage(self.actualStartDateTimeChangedEventType(), 
-                        newValue=actualStartDateTime, sender=self)
+        patterns.sendMessage(self.actualStartDateTimeChangedEventType(), 
+                             newValue=actualStartDateTime, sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.actualStartDateTimeChangedEventType(),
-                            newValue=actualStartDateTime, sender=ancestor)
+            patterns.sendMessage(ancestor.actualStartDateTimeChangedEventType(),
+                                 newValue=actualStartDateTime, sender=ancestor)
 
     @classmethod
     def actualStartDateTimeChangedEventType(class_):
@@ -406,6 +494,9 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
                 oldParentPriority = parent.priority(recursive=True)
             self.__status = None
             self.__completionDateTime = completionDateTime
+            StatusScheduler().schedule(self)
+            # The recursive priority of ancestors ignores completed children:
+            self.__invalidateRecursiveAggregates('priority')
             if parent and parent.priority(recursive=True) != oldParentPriority:
                 parent.sendPriorityChangedMessage()           
             if completionDateTime != self.maxDateTime:
@@ -430,11 +521,11 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             self.recomputeAppearance()
             for dependency in self.dependencies():
                 dependency.recomputeAppearance(recursive=True)
-            pub.sendMessage(self.completionDateTimeChangedEventType(), 
+            patterns.sendMessage(self.completionDateTimeChangedEventType(), 
                         newValue=completionDateTime, sender=self)
             for ancestor in self.ancestors():
-                pub.sendMessage(ancestor.completionDateTimeChangedEventType(),
-                                newValue=completionDateTime, sender=ancestor)
+                patterns.sendMessage(ancestor.completionDateTimeChangedEventType(),
+                                     newValue=completionDateTime, sender=ancestor)
             
     @classmethod
     def completionDateTimeChangedEventType(class_):
@@ -468,10 +559,13 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     def onMarkParentCompletedWhenAllChildrenCompletedChanged(self, value):
         ''' When the global setting changes, send a percentage completed 
             changed if necessary. '''
+        for eachTask in self.family():
+            eachTask.__invalidateRecursiveAggregates('percentageComplete', 
+                                                     upwards=False)
         if self.shouldMarkCompletedWhenAllChildrenCompleted() is None and \
             any([child.percentageComplete(True) for child in self.children()]):
-            pub.sendMessage(self.percentageCompleteChangedEventType(),
-                            newValue=self.percentageComplete(), sender=self)
+            patterns.sendMessage(self.percentageCompleteChangedEventType(),
+                                 newValue=self.percentageComplete(), sender=self)
 
     # Task state
     
@@ -513,6 +607,10 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     def possibleStatuses(class_):
         return (status.inactive, status.late, status.active,
                 status.duesoon, status.overdue, status.completed)
+    
+    @classmethod
+    def statusChangedEventType(class_):
+        return 'pubsub.task.status'
 
     def status(self):
         if self.__status:
@@ -540,29 +638,50 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         return self.__status
     
     def onDueSoonHoursChanged(self, value):
-        date.Scheduler().unschedule(self.onDueSoon)
         self.__dueSoonHours = value
-        dueDateTime = self.dueDateTime()
-        if dueDateTime < self.maxDateTime:
-            newDueSoonDateTime = dueDateTime + date.ONE_SECOND - date.TimeDelta(hours=self.__dueSoonHours)
-            date.Scheduler().schedule(self.onDueSoon, newDueSoonDateTime)
+        StatusScheduler().schedule(self)
         self.recomputeAppearance()
+
+    def nextStatusChangeDateTime(self):
+        ''' Return the first date and time in the future at which the status 
+            of the task changes just because time passes, or None if the 
+            status won't change by itself. Used by the StatusScheduler. '''
+        if self.__completionDateTime != self.maxDateTime:
+            return None
+        dateTimes = [self.__plannedStartDateTime, self.__actualStartDateTime]
+        if self.__dueDateTime != self.maxDateTime:
+            dateTimes.append(self.__dueDateTime)
+            if self.__dueSoonHours > 0:
+                dateTimes.append(self.__dueDateTime - \
+                                 date.TimeDelta(hours=self.__dueSoonHours))
+        now = date.Now()
+        futureDateTimes = [dateTime for dateTime in dateTimes \
+                           if now <= dateTime < self.maxDateTime]
+        # Statuses change one second after the date and time has passed:
+        return min(futureDateTimes) + date.ONE_SECOND if futureDateTimes \
+            else None
             
     # effort related methods:
 
     def efforts(self, recursive=False):
-        childEfforts = []
-        if recursive:
+        if not recursive:
+            return self._efforts[:]
+        try:
+            return list(self.__recursiveAggregates['efforts'])
+        except KeyError:
+            efforts = self._efforts[:]
             for child in self.children():
-                childEfforts.extend(child.efforts(recursive=True))
-        return self._efforts + childEfforts
+                efforts.extend(child.efforts(recursive=True))
+            self.__recursiveAggregates['efforts'] = tuple(efforts)
+            return efforts
 
     def isBeingTracked(self, recursive=False):
         return self.activeEfforts(recursive)
 
     def activeEfforts(self, recursive=False):
-        return [effort for effort in self.efforts(recursive) \
-            if effort.isBeingTracked()]
+        if recursive:
+            return list(self.__recursiveTimeSpent()[1])
+        return [effort for effort in self._efforts if effort.isBeingTracked()]
     
     def addEffort(self, effort):
         if effort in self._efforts:
@@ -570,10 +689,11 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         wasTracking = self.isBeingTracked()
         oldValue = self._efforts[:]
         self._efforts.append(effort)
+        self.__invalidateRecursiveAggregates('efforts', 'timeSpent')
         if effort.getStart() < self.actualStartDateTime():
             self.setActualStartDateTime(effort.getStart())
-        pub.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
-                        oldValue), sender=self)
+        patterns.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
+                             oldValue), sender=self)
         if effort.isBeingTracked() and not wasTracking:
             self.sendTrackingChangedMessage(tracking=True)
         self.sendTimeSpentChangedMessage()
@@ -583,20 +703,22 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         return 'pubsub.task.efforts'
           
     def sendTrackingChangedMessage(self, tracking):
+        self.__invalidateRecursiveAggregates('timeSpent')
         self.recomputeAppearance()  
-        pub.sendMessage(self.trackingChangedEventType(), newValue=tracking,
-                        sender=self)  
+        patterns.sendMessage(self.trackingChangedEventType(), newValue=tracking,
+                             sender=self)  
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.trackingChangedEventType(), 
-                            newValue=tracking, sender=ancestor)
+            patterns.sendMessage(ancestor.trackingChangedEventType(), 
+                                 newValue=tracking, sender=ancestor)
 
     def removeEffort(self, effort):
         if effort not in self._efforts:
             return
         oldValue = self._efforts[:]
         self._efforts.remove(effort)
-        pub.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
-                        oldValue), sender=self)
+        self.__invalidateRecursiveAggregates('efforts', 'timeSpent')
+        patterns.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
+                             oldValue), sender=self)
         if effort.isBeingTracked() and not self.isBeingTracked():
             self.sendTrackingChangedMessage(tracking=False)
         self.sendTimeSpentChangedMessage()
@@ -610,8 +732,9 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             return
         oldValue = self._efforts[:]
         self._efforts = efforts
-        pub.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
-                        oldValue), sender=self)
+        self.__invalidateRecursiveAggregates('efforts', 'timeSpent')
+        patterns.sendMessage(self.effortsChangedEventType(), newValue=(self._efforts,
+                             oldValue), sender=self)
         self.sendTimeSpentChangedMessage()
         
     @classmethod
@@ -621,16 +744,43 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     # Time spent
     
     def timeSpent(self, recursive=False):
-        return sum((effort.duration() for effort in self.efforts(recursive)), 
+        if recursive:
+            timeSpentByStoppedEfforts, trackedEfforts = self.__recursiveTimeSpent()
+            return sum((effort.duration() for effort in trackedEfforts), 
+                       timeSpentByStoppedEfforts)
+        return sum((effort.duration() for effort in self._efforts), 
                    date.TimeDelta())
+    
+    def __recursiveTimeSpent(self):
+        ''' Return the time spent on stopped efforts and the list of tracked
+            efforts of this task and its children. The duration of tracked
+            efforts changes all the time so it can't be cached. '''
+        try:
+            return self.__recursiveAggregates['timeSpent']
+        except KeyError:
+            timeSpent = date.TimeDelta()
+            trackedEfforts = []
+            for effort in self._efforts:
+                if effort.isBeingTracked():
+                    trackedEfforts.append(effort)
+                else:
+                    timeSpent += effort.duration()
+            for child in self.children():
+                childTimeSpent, childTrackedEfforts = child.__recursiveTimeSpent()
+                timeSpent += childTimeSpent
+                trackedEfforts.extend(childTrackedEfforts)
+            result = self.__recursiveAggregates['timeSpent'] = \
+                (timeSpent, tuple(trackedEfforts))
+            return result
         
     def sendTimeSpentChangedMessage(self):
-        pub.sendMessage(self.timeSpentChangedEventType(), 
-                        newValue=self.timeSpent(), sender=self)
+        self.__invalidateRecursiveAggregates('timeSpent')
+        patterns.sendMessage(self.timeSpentChangedEventType(), 
+                             newValue=self.timeSpent(), sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.timeSpentChangedEventType(), 
-                            newValue=ancestor.timeSpent(),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.timeSpentChangedEventType(), 
+                                 newValue=ancestor.timeSpent(),
+                                 sender=ancestor)
         if self.budget(recursive=True):
             self.sendBudgetLeftChangedMessage()
         if self.hourlyFee() > 0:
@@ -653,26 +803,32 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     # Budget
     
     def budget(self, recursive=False):
-        result = self.__budget
-        if recursive:
+        if not recursive:
+            return self.__budget
+        try:
+            return self.__recursiveAggregates['budget']
+        except KeyError:
+            result = self.__budget
             for task in self.children():
                 result += task.budget(recursive)
-        return result
+            self.__recursiveAggregates['budget'] = result
+            return result
     
     def setBudget(self, budget):
         if budget == self.__budget:
             return
         self.__budget = budget
+        self.__invalidateRecursiveAggregates('budget')
         self.sendBudgetChangedMessage()
         self.sendBudgetLeftChangedMessage()
         
     def sendBudgetChangedMessage(self):
-        pub.sendMessage(self.budgetChangedEventType(), newValue=self.budget(),
-                        sender=self)
+        patterns.sendMessage(self.budgetChangedEventType(), newValue=self.budget(),
+                             sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.budgetChangedEventType(), 
-                            newValue=ancestor.budget(recursive=True),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.budgetChangedEventType(), 
+                                 newValue=ancestor.budget(recursive=True),
+                                 sender=ancestor)
             
     @classmethod
     def budgetChangedEventType(class_):
@@ -695,12 +851,12 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         return budget - self.timeSpent(recursive) if budget else budget
     
     def sendBudgetLeftChangedMessage(self):
-        pub.sendMessage(self.budgetLeftChangedEventType(), 
-                        newValue=self.budgetLeft(), sender=self)
+        patterns.sendMessage(self.budgetLeftChangedEventType(), 
+                             newValue=self.budgetLeft(), sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.budgetLeftChangedEventType(),
-                            newValue=ancestor.budgetLeft(recursive=True),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.budgetLeftChangedEventType(),
+                                 newValue=ancestor.budgetLeft(recursive=True),
+                                 sender=ancestor)
             
     @classmethod
     def budgetLeftChangedEventType(class_):
@@ -750,7 +906,7 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     
     @classmethod
     def fgColorForStatus(class_, taskStatus):
-        return wx.Colour(*eval(class_.settings.get('fgcolor', '%stasks' % taskStatus)))  # pylint: disable=E1101
+        return wx.Colour(*class_.__paletteEntry('fgcolor', taskStatus, eval))
 
     def appearanceChangedEvent(self, event):
         self.__computeRecursiveForegroundColor()
@@ -802,7 +958,7 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     
     @classmethod
     def bgColorForStatus(class_, taskStatus):
-        return wx.Colour(*eval(class_.settings.get('bgcolor', '%stasks' % taskStatus)))  # pylint: disable=E1101
+        return wx.Colour(*class_.__paletteEntry('bgcolor', taskStatus, eval))
     
     # Font
 
@@ -824,8 +980,10 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
 
     @classmethod
     def fontForStatus(class_, taskStatus):
-        nativeInfoString = class_.settings.get('font', '%stasks' % taskStatus)  # pylint: disable=E1101
-        return wx.FontFromNativeInfoString(nativeInfoString) if nativeInfoString else None
+        nativeInfoString = class_.__paletteEntry('font', taskStatus, 
+                                                 lambda value: value)
+        return wx.FontFromNativeInfoString(nativeInfoString) \
+            if nativeInfoString else None
                 
     # Icon
     
@@ -866,7 +1024,7 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         return self.iconForStatus(self.status(), selected)            
 
     def iconForStatus(self, taskStatus, selected=False):
-        iconName = self.settings.get('icon', '%stasks' % taskStatus)  # pylint: disable=E1101
+        iconName = self.__paletteEntry('icon', taskStatus, lambda value: value)
         iconName = self.pluralOrSingularIcon(iconName)
         if selected and iconName.startswith('folder'):
             iconName = getImageOpen(iconName)
@@ -891,6 +1049,14 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         self.__computeRecursiveBackgroundColor()
         self.__computeRecursiveIcon()
         self.__computeRecursiveSelectedIcon()
+        # The status cache is also reset elsewhere, e.g. by 
+        # setCompletionDateTime, so compare with the status last sent to 
+        # observers to tell whether the status changed:
+        newStatus = self.status()
+        if newStatus != self.__notifiedStatus:
+            self.__notifiedStatus = newStatus
+            patterns.sendMessage(self.statusChangedEventType(), newValue=newStatus,
+                                 sender=self)
         if self.__recursiveForegroundColor != previousForegroundColor or \
            self.__recursiveBackgroundColor != previousBackgroundColor or \
            self.__recursiveIcon != previousRecursiveIcon or \
@@ -903,7 +1069,11 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     # percentage Complete
     
     def percentageComplete(self, recursive=False):
-        if recursive:
+        if not recursive:
+            return self.__percentageComplete
+        try:
+            return self.__recursiveAggregates['percentageComplete']
+        except KeyError:
             if self.shouldMarkCompletedWhenAllChildrenCompleted() is None:
                 # pylint: disable=E1101    
                 ignore_me = self.settings.getboolean('behavior', 
@@ -914,27 +1084,28 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             if self.__percentageComplete > 0 or not ignore_me:
                 percentages.append(self.__percentageComplete)
             percentages.extend([child.percentageComplete(recursive) for child in self.children()])
-            return sum(percentages) / len(percentages) if percentages else 0
-        else:
-            return self.__percentageComplete
+            result = sum(percentages) / len(percentages) if percentages else 0
+            self.__recursiveAggregates['percentageComplete'] = result
+            return result
     
     def setPercentageComplete(self, percentage):
         if percentage == self.__percentageComplete:
             return
         oldPercentage = self.__percentageComplete
         self.__percentageComplete = percentage
+        self.__invalidateRecursiveAggregates('percentageComplete')
         if percentage == 100 and oldPercentage != 100 and self.completionDateTime() == self.maxDateTime:
             self.setCompletionDateTime(date.Now())
         elif oldPercentage == 100 and percentage != 100 and self.completionDateTime() != self.maxDateTime:
             self.setCompletionDateTime(self.maxDateTime)
         if 0 < percentage < 100 and self.actualStartDateTime() == date.DateTime():
             self.setActualStartDateTime(date.Now())
-        pub.sendMessage(self.percentageCompleteChangedEventType(),
-                        newValue=percentage, sender=self)
+        patterns.sendMessage(self.percentageCompleteChangedEventType(),
+                             newValue=percentage, sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.percentageCompleteChangedEventType(),
-                            newValue=ancestor.percentageComplete(recursive=True),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.percentageCompleteChangedEventType(),
+                                 newValue=ancestor.percentageComplete(recursive=True),
+                                 sender=ancestor)
     
     @staticmethod
     def percentageCompleteSortFunction(**kwargs):
@@ -953,27 +1124,32 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
     # priority
     
     def priority(self, recursive=False):
-        if recursive:
+        if not recursive:
+            return self.__priority
+        try:
+            return self.__recursiveAggregates['priority']
+        except KeyError:
             childPriorities = [child.priority(recursive=True) \
                                for child in self.children() \
                                if not child.completed()]
-            return max(childPriorities + [self.__priority])
-        else:
-            return self.__priority
+            result = self.__recursiveAggregates['priority'] = \
+                max(childPriorities + [self.__priority])
+            return result
         
     def setPriority(self, priority):
         if priority == self.__priority:
             return
         self.__priority = priority
+        self.__invalidateRecursiveAggregates('priority')
         self.sendPriorityChangedMessage()
     
     def sendPriorityChangedMessage(self):
-        pub.sendMessage(self.priorityChangedEventType(), 
-                        newValue=self.priority(), sender=self)
+        patterns.sendMessage(self.priorityChangedEventType(), 
+                             newValue=self.priority(), sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.priorityChangedEventType(), 
-                            newValue=ancestor.priority(),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.priorityChangedEventType(), 
+                                 newValue=ancestor.priority(),
+                                 sender=ancestor)
 
     @classmethod
     def priorityChangedEventType(class_):
@@ -998,8 +1174,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if hourlyFee == self.__hourlyFee:
             return
         self.__hourlyFee = hourlyFee
-        pub.sendMessage(self.hourlyFeeChangedEventType(), newValue=hourlyFee, 
-                        sender=self)
+        patterns.sendMessage(self.hourlyFeeChangedEventType(), newValue=hourlyFee, 
+                             sender=self)
         if self.timeSpent() > date.TimeDelta():
             self.sendRevenueChangedMessage()
             for effort in self.efforts():
@@ -1029,12 +1205,12 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if fixedFee == self.__fixedFee:
             return
         self.__fixedFee = fixedFee
-        pub.sendMessage(self.fixedFeeChangedEventType(), newValue=fixedFee,
-                        sender=self)
+        patterns.sendMessage(self.fixedFeeChangedEventType(), newValue=fixedFee,
+                             sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.fixedFeeChangedEventType(), 
-                            newValue=ancestor.fixedFee(recursive=True),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.fixedFeeChangedEventType(), 
+                                 newValue=ancestor.fixedFee(recursive=True),
+                                 sender=ancestor)
         self.sendRevenueChangedMessage()
         
     @classmethod
@@ -1060,12 +1236,12 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
                childRevenues
 
     def sendRevenueChangedMessage(self):
-        pub.sendMessage(self.revenueChangedEventType(), 
-                        newValue=self.revenue(), sender=self)
+        patterns.sendMessage(self.revenueChangedEventType(), 
+                             newValue=self.revenue(), sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.revenueChangedEventType(),
-                            newValue=ancestor.revenue(recursive=True),
-                            sender=ancestor)
+            patterns.sendMessage(ancestor.revenueChangedEventType(),
+                                 newValue=ancestor.revenue(recursive=True),
+                                 sender=ancestor)
 
     @classmethod
     def revenueChangedEventType(class_):
@@ -1099,22 +1275,22 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             return
         self.__reminder = reminderDateTime
         self.__reminderBeforeSnooze = reminderDateTime
-        pub.sendMessage(self.reminderChangedEventType(), 
-                        newValue=reminderDateTime, sender=self)
+        patterns.sendMessage(self.reminderChangedEventType(), 
+                             newValue=reminderDateTime, sender=self)
         for ancestor in self.ancestors():
-            pub.sendMessage(ancestor.reminderChangedEventType(),
-                            newValue=reminderDateTime, sender=ancestor)
+            patterns.sendMessage(ancestor.reminderChangedEventType(),
+                                 newValue=reminderDateTime, sender=ancestor)
         
     def snoozeReminder(self, timeDelta, now=date.Now):
         if timeDelta:
             self.__reminder = now() + timeDelta
-            pub.sendMessage(self.reminderChangedEventType(), 
-                            newValue=self.__reminder, sender=self)
+            patterns.sendMessage(self.reminderChangedEventType(), 
+                                 newValue=self.__reminder, sender=self)
         else:
             if self.recurrence():
                 self.__reminder = None
-                pub.sendMessage(self.reminderChangedEventType(), 
-                                newValue=self.__reminder, sender=self)
+                patterns.sendMessage(self.reminderChangedEventType(), 
+                                     newValue=self.__reminder, sender=self)
             else:
                 self.setReminder()
 
@@ -1151,8 +1327,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if recurrence == self.__recurrence:
             return
         self.__recurrence = recurrence
-        pub.sendMessage(self.recurrenceChangedEventType(), newValue=recurrence,
-                        sender=self)
+        patterns.sendMessage(self.recurrenceChangedEventType(), newValue=recurrence,
+                             sender=self)
         
     @classmethod
     def recurrenceChangedEventType(class_):
@@ -1226,8 +1402,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         self.__prerequisites = WeakSet(prerequisites)
         self.setActualStartDateTime(self.maxDateTime, recursive=True)
         self.recomputeAppearance(recursive=True)
-        pub.sendMessage(self.prerequisitesChangedEventType(), 
-                        newValue=self.prerequisites(), sender=self)
+        patterns.sendMessage(self.prerequisitesChangedEventType(), 
+                             newValue=self.prerequisites(), sender=self)
   
     def addPrerequisites(self, prerequisites):
         prerequisites = set(prerequisites)
@@ -1236,8 +1412,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         self.__prerequisites = WeakSet(prerequisites | self.prerequisites())
         self.setActualStartDateTime(self.maxDateTime, recursive=True)
         self.recomputeAppearance(recursive=True)
-        pub.sendMessage(self.prerequisitesChangedEventType(), 
-                        newValue=self.prerequisites(), sender=self)
+        patterns.sendMessage(self.prerequisitesChangedEventType(), 
+                             newValue=self.prerequisites(), sender=self)
         
     def removePrerequisites(self, prerequisites):
         prerequisites = set(prerequisites)
@@ -1245,8 +1421,8 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
             return
         self.__prerequisites = WeakSet(self.prerequisites() - prerequisites)
         self.recomputeAppearance(recursive=True)
-        pub.sendMessage(self.prerequisitesChangedEventType(), 
-                        newValue=self.prerequisites(), sender=self)
+        patterns.sendMessage(self.prerequisitesChangedEventType(), 
+                             newValue=self.prerequisites(), sender=self)
         
     def addTaskAsDependencyOf(self, prerequisites):
         for prerequisite in prerequisites:
@@ -1301,24 +1477,24 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if dependencies == self.dependencies():
             return
         self.__dependencies = WeakSet(dependencies)
-        pub.sendMessage(self.dependenciesChangedEventType(),
-                        newValue=self.dependencies(), sender=self)
+        patterns.sendMessage(self.dependenciesChangedEventType(),
+                             newValue=self.dependencies(), sender=self)
     
     def addDependencies(self, dependencies):
         dependencies = set(dependencies)
         if dependencies <= self.dependencies():
             return
         self.__dependencies = WeakSet(self.dependencies() | dependencies)
-        pub.sendMessage(self.dependenciesChangedEventType(),
-                        newValue=self.dependencies(), sender=self)
+        patterns.sendMessage(self.dependenciesChangedEventType(),
+                             newValue=self.dependencies(), sender=self)
 
     def removeDependencies(self, dependencies):
         dependencies = set(dependencies)
         if self.dependencies().isdisjoint(dependencies):
             return
         self.__dependencies = WeakSet(self.dependencies() - dependencies)
-        pub.sendMessage(self.dependenciesChangedEventType(),
-                        newValue=self.dependencies(), sender=self)
+        patterns.sendMessage(self.dependenciesChangedEventType(),
+                             newValue=self.dependencies(), sender=self)
         
     def addTaskAsPrerequisiteOf(self, dependencies):
         for dependency in dependencies:
@@ -1363,10 +1539,11 @@ class Task(note.NoteOwner, attachment.AttachmentOwner,
         if newValue == self.__shouldMarkCompletedWhenAllChildrenCompleted:
             return
         self.__shouldMarkCompletedWhenAllChildrenCompleted = newValue
-        pub.sendMessage(self.shouldMarkCompletedWhenAllChildrenCompletedChangedEventType(),
-                        newValue=newValue, sender=self)
-        pub.sendMessage(self.percentageCompleteChangedEventType(), 
-                        newValue=self.percentageComplete(), sender=self)
+        self.__invalidateRecursiveAggregates('percentageComplete')
+        patterns.sendMessage(self.shouldMarkCompletedWhenAllChildrenCompletedChangedEventType(),
+                             newValue=newValue, sender=self)
+        patterns.sendMessage(self.percentageCompleteChangedEventType(), 
+                             newValue=self.percentageComplete(), sender=self)
     
     @classmethod
     def shouldMarkCompletedWhenAllChildrenCompletedChangedEventType(class_):
@@ -21,17 +21,47 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from taskcoachlib.i18n import _
 from taskcoachlib.domain import categorizable
-from taskcoachlib import help, operating_system  # pylint: disable=W0622
+from taskcoachlib import help, operating_system, patterns  # pylint: disable=W0622
+from taskcoachlib.thirdparty.pubsub import pub
 from . import task
 
 
 class TaskListQueryMixin(object):
+    ''' Keep count of the number of tasks per status. Classes using this mixin
+        need to call _updateStatusCounts() with the tasks added to or removed 
+        from the collection. '''
+    
+    def __init__(self, *args, **kwargs):
+        self.__countedStatuses = dict()  # {task: status the task is counted as}
+        self.__statusCounts = dict((status, 0) for status in \
+                                   task.Task.possibleStatuses())
+        super(TaskListQueryMixin, self).__init__(*args, **kwargs)
+        pub.subscribe(self.onStatusOfTaskChanged, 
+                      task.Task.statusChangedEventType())
+        for eventType in (task.Task.markDeletedEventType(), 
+                          task.Task.markNotDeletedEventType()):
+            patterns.Publisher().registerObserver(self.onDeletionOfTaskChanged,
+                                                  eventType=eventType)
+        
     def nrOfTasksPerStatus(self):
-        statuses = [eachTask.status() for eachTask in self if not eachTask.isDeleted()]
-        count = dict()
-        for status in task.Task.possibleStatuses():
-            count[status] = statuses.count(status)
-        return count
+        return self.__statusCounts.copy()
+    
+    def onStatusOfTaskChanged(self, newValue, sender):  # pylint: disable=W0613
+        if sender in self.__countedStatuses or sender in self:
+            self._updateStatusCounts([sender])
+            
+    def onDeletionOfTaskChanged(self, event):
+        self._updateStatusCounts([eachTask for eachTask in event.sources() \
+            if eachTask in self.__countedStatuses or eachTask in self])
+    
+    def _updateStatusCounts(self, tasks):  # pylint: disable=W0621
+        for eachTask in tasks:
+            previousStatus = self.__countedStatuses.pop(eachTask, None)
+            if previousStatus is not None:
+                self.__statusCounts[previousStatus] -= 1
+            if eachTask in self and not eachTask.isDeleted():
+                currentStatus = self.__countedStatuses[eachTask] = eachTask.status()
+                self.__statusCounts[currentStatus] += 1
     
     
 class TaskList(TaskListQueryMixin, categorizable.CategorizableContainer):
@@ -39,12 +69,56 @@ class TaskList(TaskListQueryMixin, categorizable.CategorizableContainer):
 
     newItemMenuText = _('&New task...') + ('\tINSERT' if not operating_system.isMac() else '\tCtrl+N')
     newItemHelpText = help.taskNew
+    
+    def __init__(self, *args, **kwargs):
+        # Keep track of the tasks being tracked so we don't need to check all
+        # tasks each time the number of tracked tasks is needed:
+        self.__tasksBeingTracked = set()
+        super(TaskList, self).__init__(*args, **kwargs)
+        pub.subscribe(self.onTrackingChanged, 
+                      task.Task.trackingChangedEventType())
+        pub.subscribe(self.onEffortsChanged, 
+                      task.Task.effortsChangedEventType())
+        
+    @patterns.eventSource
+    def extend(self, tasks, event=None):  # pylint: disable=W0621
+        super(TaskList, self).extend(tasks, event=event)
+        tasks = self._compositesAndAllChildren(tasks)
+        for eachTask in tasks:
+            self.__updateTracking(eachTask)
+        self._updateStatusCounts(tasks)
+            
+    @patterns.eventSource
+    def removeItems(self, tasks, event=None):  # pylint: disable=W0621
+        super(TaskList, self).removeItems(tasks, event=event)
+        tasks = self._compositesAndAllChildren(tasks)
+        self.__tasksBeingTracked.difference_update(tasks)
+        self._updateStatusCounts(tasks)
+        
+    @patterns.eventSource
+    def clear(self, event=None):
+        tasks = list(self)  # pylint: disable=W0621
+        super(TaskList, self).clear(event=event)
+        self.__tasksBeingTracked.clear()
+        self._updateStatusCounts(tasks)
        
     def nrBeingTracked(self):
-        return len(self.tasksBeingTracked())
+        return len(self.__tasksBeingTracked)
     
     def tasksBeingTracked(self):
-        return [eachTask for eachTask in self if eachTask.isBeingTracked()]    
+        return list(self.__tasksBeingTracked)
+    
+    def onTrackingChanged(self, newValue, sender):  # pylint: disable=W0613
+        self.__updateTracking(sender)
+        
+    def onEffortsChanged(self, newValue, sender):  # pylint: disable=W0613
+        self.__updateTracking(sender)
+        
+    def __updateTracking(self, eachTask):
+        if eachTask in self and eachTask.isBeingTracked():
+            self.__tasksBeingTracked.add(eachTask)
+        else:
+            self.__tasksBeingTracked.discard(eachTask)
 
     def efforts(self):
         result = []
@@ -21,6 +21,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from taskcoachlib import meta, persistence, patterns, operating_system
 from taskcoachlib.i18n import _
 from taskcoachlib.thirdparty import lockfile
+from taskcoachlib.thirdparty.pubsub import pub
 from taskcoachlib.widgets import GetPassword
 from taskcoachlib.workarounds import ExceptionAsUnicode
 from taskcoachlib.gui.dialog import BackupManagerDialog
@@ -72,6 +73,14 @@ class IOController(object):
             _('Todo.txt files (*.txt)|*.txt|All files (*.*)|*')}
         self.__errorMessageOptions = dict(caption=_('%s file error') % \
                                           meta.name, style=wx.ICON_ERROR)
+        pub.subscribe(self.onTaskFileSaveFailed, 'taskfile.saveFailed')
+
+    def onTaskFileSaveFailed(self, taskFile, reason):
+        ''' Saving in the background failed, so there's no caller to report
+            the error to. Tell the user instead. '''
+        errorMessage = _('Cannot save %s\n%s') % (taskFile.filename(), 
+                       ExceptionAsUnicode(reason))
+        wx.MessageBox(errorMessage, **self.__errorMessageOptions)
 
     def syncMLConfig(self):
         return self.__taskFile.syncMLConfig()
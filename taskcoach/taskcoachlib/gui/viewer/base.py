@@ -46,6 +46,7 @@ class Viewer(patterns.Observer, wx.Panel):
         self.settings = settings
         self.__settingsSection = kwargs.pop('settingsSection')
         self.__freezeCount = 0
+        self.__itemsToRefresh = set()  # Items changed while frozen
         # The how maniest of this viewer type are we? Used for settings
         self.__instanceNumber = kwargs.pop('instanceNumber')
         self.__use_separate_settings_section = kwargs.pop('use_separate_settings_section', 
@@ -100,6 +101,8 @@ class Viewer(patterns.Observer, wx.Panel):
         self.__presentation.thaw()
         if self.__freezeCount == 0:
             self.refresh()
+            itemsToRefresh, self.__itemsToRefresh = self.__itemsToRefresh, set()
+            self.refreshItems(*itemsToRefresh)  # pylint: disable=W0142
 
     def activate(self):
         pass
@@ -233,7 +236,13 @@ class Viewer(patterns.Observer, wx.Panel):
         def allItemsAreSelected():
             return set(self.__curselection).issubset(set(event.values()))
         
-        self.refresh()
+        def itemsOfType(eventType):
+            return event.sourcesAndValuesByType().get(eventType, 
+                dict()).get(self.presentation(), ())
+        
+        self.refreshItemsAddedAndRemoved(
+            itemsOfType(self.presentation().addItemEventType()),
+            itemsOfType(self.presentation().removeItemEventType()))
         if itemsRemoved() and allItemsAreSelected(): 
             self.selectNextItemsAfterRemoval(event.values())
         self.updateSelection(sendViewerStatusEvent=False)
@@ -270,8 +279,22 @@ class Viewer(patterns.Observer, wx.Panel):
         if self and not self.__freezeCount:
             self.widget.RefreshAllItems(len(self.presentation()))
     
+    def refreshItemsAddedAndRemoved(self, addedItems, removedItems):
+        ''' Only insert and delete the items that were added or removed if 
+            the widget supports that, otherwise refresh the whole widget. '''
+        if self and not self.__freezeCount:
+            if isinstance(self.widget, widgets.TreeListCtrl):
+                self.widget.RefreshItemsAddedAndRemoved(addedItems, 
+                                                        removedItems)
+            else:
+                self.refresh()
+
     def refreshItems(self, *items):
-        if not self.__freezeCount:
+        if self.__freezeCount:
+            # Refreshing the viewer when it is thawed doesn't refresh the 
+            # items that are already shown, so remember them:
+            self.__itemsToRefresh.update(items)
+        else:
             items = [item for item in items if item in self.presentation()]
             self.widget.RefreshItems(*items)  # pylint: disable=W0142
         
@@ -725,6 +748,11 @@ class ViewerWithColumns(Viewer):  # pylint: disable=W0223
     def refresh(self, *args, **kwargs):
         if self and self.__initDone:
             super(ViewerWithColumns, self).refresh(*args, **kwargs)
+
+    def refreshItemsAddedAndRemoved(self, *args, **kwargs):
+        if self and self.__initDone:
+            super(ViewerWithColumns, self).refreshItemsAddedAndRemoved(*args, 
+                                                                       **kwargs)
                     
     def initColumns(self):
         for column in self.columns():
@@ -29,25 +29,94 @@ from taskcoachlib.gui.newid import IdProvider
 import wx
 
 
-class MinuteRefresher(object):
-    ''' This class can be used by viewers to refresh themselves every minute
-        to refresh attributes like time left. The user of this class is
-        responsible for calling refresher.startClock() and stopClock(). '''
-
-    def __init__(self, viewer):
-        self.__viewer = viewer        
+class MinuteRefresher(patterns.Observer):
+    ''' This class can be used by viewers to refresh attributes like time 
+        left every minute. The user of this class is responsible for calling 
+        refresher.startClock() and stopClock(). Only items whose time left
+        is rendered as a value that changes every minute, i.e. items with a 
+        due date that are not completed, are refreshed. When there are no 
+        such items, the clock doesn't run. '''
+
+    def __init__(self, viewer, *changedEventTypes):
+        super(MinuteRefresher, self).__init__()
+        self.__viewer = viewer
+        self.__presentation = viewer.presentation()
+        self.__timeDependentItems = set()
+        self.__clockWanted = False
+        for eventType in changedEventTypes:
+            pub.subscribe(self.onItemChanged, eventType)
+        self.registerObserver(self.onItemAdded, 
+                              eventType=self.__presentation.addItemEventType(),
+                              eventSource=self.__presentation)
+        self.registerObserver(self.onItemRemoved, 
+                              eventType=self.__presentation.removeItemEventType(),
+                              eventSource=self.__presentation)
+        self.setTimeDependentItems(self.timeDependentItems(self.__presentation))
         
-    def startClock(self):
-        date.Scheduler().schedule_interval(self.onEveryMinute, minutes=1)
+    def onItemAdded(self, event):
+        # The time left of collapsed ancestors depends on their children:
+        items = set(event.values())
+        for item in event.values():
+            items.update(item.ancestors())
+        items = [item for item in items if item in self.__presentation]
+        self.addTimeDependentItems(self.timeDependentItems(items))
         
-    def stopClock(self):
-        date.Scheduler().unschedule(self.onEveryMinute)
+    def onItemRemoved(self, event):
+        self.removeTimeDependentItems(event.values())
+        
+    def onItemChanged(self, newValue, sender):  # pylint: disable=W0613
+        # The time left of ancestors depends on their children too:
+        items = [item for item in [sender] + sender.ancestors() \
+                 if item in self.__presentation]
+        timeDependentItems = self.timeDependentItems(items)
+        self.addTimeDependentItems(timeDependentItems)
+        self.removeTimeDependentItems([item for item in items \
+                                       if item not in timeDependentItems])
         
     def onEveryMinute(self):
         if self.__viewer:
-            self.__viewer.refresh()
+            self.__viewer.refreshItems(*self.__timeDependentItems)  # pylint: disable=W0142
         else:
             self.stopClock()
+            
+    def setTimeDependentItems(self, items):
+        self.__timeDependentItems = set(items)
+        self.startOrStopClock()
+            
+    def addTimeDependentItems(self, items):
+        if items:
+            self.__timeDependentItems.update(items)
+            self.startOrStopClock()
+            
+    def removeTimeDependentItems(self, items):
+        if items:
+            self.__timeDependentItems.difference_update(items)
+            self.startOrStopClock()
+            
+    def startClock(self):
+        self.__clockWanted = True
+        self.startOrStopClock()
+        
+    def stopClock(self):
+        self.__clockWanted = False
+        self.startOrStopClock()
+        
+    def startOrStopClock(self):
+        if self.__clockWanted and self.__timeDependentItems:
+            date.Scheduler().schedule_interval(self.onEveryMinute, minutes=1)
+        else:
+            date.Scheduler().unschedule(self.onEveryMinute)
+            
+    def isClockStarted(self): # Unit tests
+        return date.Scheduler().is_scheduled(self.onEveryMinute)
+            
+    def currentlyTimeDependentItems(self):
+        return list(self.__timeDependentItems)
+            
+    @staticmethod
+    def timeDependentItems(items):
+        return [item for item in items if not item.completed() and \
+                item.dueDateTime(recursive=True) != date.DateTime()]
 
 
 class SecondRefresher(patterns.Observer, wx.EvtHandler):
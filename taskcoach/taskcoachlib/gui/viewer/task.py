@@ -144,7 +144,9 @@ class BaseTaskTreeViewer(BaseTaskViewer):  # pylint: disable=W0223
         if kwargs.get('doRefresh', True):
             self.secondRefresher = refresher.SecondRefresher(self,
                                                              task.Task.trackingChangedEventType())
-            self.minuteRefresher = refresher.MinuteRefresher(self)
+            self.minuteRefresher = refresher.MinuteRefresher(self,
+                                                             task.Task.dueDateTimeChangedEventType(),
+                                                             task.Task.completionDateTimeChangedEventType())
         else:
             self.secondRefresher = self.minuteRefresher = None
         
@@ -156,6 +158,7 @@ class BaseTaskTreeViewer(BaseTaskViewer):  # pylint: disable=W0223
             del self.secondRefresher
         if hasattr(self, "minuteRefresher") and self.minuteRefresher:
             self.minuteRefresher.stopClock()
+            self.minuteRefresher.removeInstance()
             del self.minuteRefresher
         
     def newItemDialog(self, *args, **kwargs):
@@ -1264,6 +1267,8 @@ class TaskViewer(mixin.AttachmentDropTargetMixin,  # pylint: disable=W0223
 
     def onTreeListModeChanged(self, value):
         self.presentation().setTreeMode(value)
+        # Items are rendered differently in tree mode and list mode:
+        self.refreshItems(*self.presentation())  # pylint: disable=W0142
         
     # pylint: disable=W0621
     
@@ -25,12 +25,13 @@ from taskcoachlib.domain.task import Task
 from taskcoachlib.domain.effort import Effort
 
 from taskcoachlib.i18n import _
+from taskcoachlib import patterns
 
 from twisted.internet.protocol import Protocol, ServerFactory
 from twisted.internet.error import CannotListenError
 
 import wx, struct, \
-    random, time, hashlib, cStringIO, socket, os
+    random, time, hashlib, socket, os
 
 # Default port is 8001.
 #
@@ -404,7 +405,7 @@ class State(object):
         self.__format = format
         self.__count = count
 
-        self.__data = cStringIO.StringIO()
+        self.__data = []
 
         if format is None:
             self.__item = None
@@ -421,19 +422,19 @@ class State(object):
         self.init(*args, **kwargs)
 
     def data(self):
-        return self.__data.getvalue()
+        return ''.join(self.__data)
 
     def disp(self):
         return self.__disp
 
     def collect_incoming_data(self, data):
         if self.__format is not None:
-            self.__data.write(data)
+            self.__data.append(data)
 
     def found_terminator(self):
         if self.__format is not None:
-            self.__item.feed(self.__data.getvalue())
-            self.__data = cStringIO.StringIO()
+            self.__item.feed(self.data())
+            self.__data = []
 
             length = self.__item.expect()
             if length is None:
@@ -470,11 +471,22 @@ class State(object):
 
 _PROTOVERSION = 5
 
+# From this version on, the desktop doesn't wait for the response to an 
+# object before sending the next one during a full sync from the desktop. 
+# Up to ('iphone', 'syncwindow') objects are in flight. Bump _PROTOVERSION 
+# once the device supports it.
+_PIPELINEDPROTOVERSION = 6
+
 
 class IPhoneHandler(Protocol):
     def __init__(self):
         self.state = None
-        self.__buffer = ''
+        # Received data is appended to the buffer. The data before the
+        # offset has been handled already; it's removed once it makes up
+        # more than half of the buffer, so that neither receiving nor 
+        # handling data copies the whole buffer each time.
+        self.__buffer = bytearray()
+        self.__offset = 0
         self.__expecting = None
         random.seed(time.time())
 
@@ -487,12 +499,20 @@ class IPhoneHandler(Protocol):
         if self.state.ui is not None:
             self.state.ui.AddLogLine(msg % args)
 
+    @patterns.eventBatch
     def _flush(self):
-        while self.__expecting is not None and len(self.__buffer) >= self.__expecting:
-            data = self.__buffer[:self.__expecting]
-            self.__buffer = self.__buffer[self.__expecting:]
+        # Changes sent by the device are applied while handling the data, so
+        # notify observers once per chunk of data instead of once per change.
+        while self.__expecting is not None and \
+                len(self.__buffer) - self.__offset >= self.__expecting:
+            start = self.__offset
+            self.__offset += self.__expecting
+            data = memoryview(self.__buffer)[start:self.__offset].tobytes()
             self.state.collect_incoming_data(data)
             self.state.found_terminator()
+        if self.__offset > len(self.__buffer) // 2:
+            del self.__buffer[:self.__offset]
+            self.__offset = 0
 
     def set_terminator(self, terminator):
         self.__expecting = terminator
@@ -505,7 +525,7 @@ class IPhoneHandler(Protocol):
         reactor.callLater(0.5, self.transport.loseConnection)
 
     def dataReceived(self, data):
-        self.__buffer += data
+        self.__buffer.extend(data)
         self._flush()
 
     def connectionLost(self, reason):
@@ -560,8 +580,8 @@ class IPhoneAcceptor(ServerFactory):
 
 class BaseState(State): # pylint: disable=W0223
     def __init__(self, disp, *args, **kwargs):
-        self.oldTasks = disp.window.taskFile.tasks().copy()
-        self.oldCategories = disp.window.taskFile.categories().copy()
+        # Taken by windowForChanges() when the sync first changes the task file
+        self.oldTasks = self.oldCategories = None
 
         self.ui = None
 
@@ -601,12 +621,26 @@ class BaseState(State): # pylint: disable=W0223
 
         return False
 
+    def windowForChanges(self):
+        """Return the main window, to change the task file through
+        it. The first time, remember the tasks and categories to roll
+        back to if the sync doesn't complete. This snapshot is taken
+        once per sync, and only if the sync changes something, so a
+        full sync from the desktop doesn't copy the task file."""
+
+        window = self.disp().window
+        if self.oldTasks is None:
+            self.oldTasks = window.taskFile.tasks().copy()
+            self.oldCategories = window.taskFile.categories().copy()
+        return window
+
     def handleClose(self):
         if self.ui is not None:
             self.ui.Finished()
 
         # Rollback
-        self.disp().window.restoreTasks(self.oldCategories, self.oldTasks)
+        if self.oldTasks is not None:
+            self.disp().window.restoreTasks(self.oldCategories, self.oldTasks)
 
 
 class InitialState(BaseState):
@@ -767,96 +801,122 @@ class FullFromDesktopState(BaseState):
         self.setState(FullFromDesktopCategoryState)
 
 
-class FullFromDesktopCategoryState(BaseState):
+class FullFromDesktopObjectState(BaseState): # pylint: disable=W0223
+    """Base class for the states that send all objects of one kind
+    to the device. The device responds to each object with a
+    code. Before protocol version 6, the next object is sent when the
+    response to the previous one arrives. From version 6 on, up to
+    windowSize() objects are sent without waiting for their response,
+    so that a full sync doesn't cost a network round-trip per
+    object."""
+
     def init(self):
-        super(FullFromDesktopCategoryState, self).init('i', len(self.categories))
+        objects = self.objectsToSend()
 
-        self.disp().log(_('%d categories'), len(self.categories))
+        super(FullFromDesktopObjectState, self).init('i', len(objects))
+
+        if objects:
+            # If there are no objects, init() already moved on to the
+            # next state.
+            self.__objects = iter(objects)
+            for dummy in xrange(self.windowSize()):
+                if not self.sendNextObject():
+                    break
 
-        if self.categories:
-            self.sendObject()
+    def windowSize(self):
+        if self.version < _PIPELINEDPROTOVERSION:
+            return 1
+        return max(1, self.disp().settings.getint('iphone', 'syncwindow'))
 
-    def sendObject(self):
-        if self.categories:
-            category = self.categories.pop(0)
-            self.disp().log(_('Send category %s'), category.id())
-            self.pack('ssz', category.subject(), category.id(),
-                      None if category.parent() is None else category.parent().id())
+    def sendNextObject(self):
+        """Send the next object, if any. Return whether an object
+        was sent."""
+
+        obj = next(self.__objects, None)
+        if obj is None:
+            return False
+        self.sendObject(obj)
+        return True
 
     def handleNewObject(self, code):
         self.disp().log(_('Response: %d'), code)
         self.count += 1
         self.ui.SetProgress(self.count, self.total)
-        self.sendObject()
+        self.sendNextObject()
+
+    def objectsToSend(self):
+        raise NotImplementedError
+
+    def sendObject(self, obj):
+        raise NotImplementedError
+
+
+class FullFromDesktopCategoryState(FullFromDesktopObjectState):
+    def objectsToSend(self):
+        self.disp().log(_('%d categories'), len(self.categories))
+        return self.categories
+
+    def sendObject(self, category):
+        self.disp().log(_('Send category %s'), category.id())
+        self.pack('ssz', category.subject(), category.id(),
+                  None if category.parent() is None else category.parent().id())
 
     def finished(self):
         self.setState(FullFromDesktopTaskState)
 
 
-class FullFromDesktopTaskState(BaseState):
-    def init(self):
-        super(FullFromDesktopTaskState, self).init('i', len(self.tasks))
-
+class FullFromDesktopTaskState(FullFromDesktopObjectState):
+    def objectsToSend(self):
         self.disp().log(_('%d tasks'), len(self.tasks))
+        return self.tasks
 
-        if self.tasks:
-            self.sendObject()
-
-    def sendObject(self):
-        if self.tasks:
-            task = self.tasks.pop(0)
-            self.disp().log(_('Send task %s'), task.id())
-            if self.version < 4:
-                self.pack('sssddd[s]',
-                          task.subject(),
-                          task.id(),
-                          task.description(),
-                          task.plannedStartDateTime().date(),
-                          task.dueDateTime().date(),
-                          task.completionDateTime().date(),
-                          [category.id() for category in task.categories()])
-            elif self.version < 5:
-                self.pack('sssdddz[s]',
-                          task.subject(),
-                          task.id(),
-                          task.description(),
-                          task.plannedStartDateTime().date(),
-                          task.dueDateTime().date(),
-                          task.completionDateTime().date(),
-                          task.parent().id() if task.parent() is not None else None,
-                          [category.id() for category in task.categories()])
+    def sendObject(self, task):
+        self.disp().log(_('Send task %s'), task.id())
+        if self.version < 4:
+            self.pack('sssddd[s]',
+                      task.subject(),
+                      task.id(),
+                      task.description(),
+                      task.plannedStartDateTime().date(),
+                      task.dueDateTime().date(),
+                      task.completionDateTime().date(),
+                      [category.id() for category in task.categories()])
+        elif self.version < 5:
+            self.pack('sssdddz[s]',
+                      task.subject(),
+                      task.id(),
+                      task.description(),
+                      task.plannedStartDateTime().date(),
+                      task.dueDateTime().date(),
+                      task.completionDateTime().date(),
+                      task.parent().id() if task.parent() is not None else None,
+                      [category.id() for category in task.categories()])
+        else:
+            hasRecurrence = task.recurrence() is not None and task.recurrence().unit != ''
+            if hasRecurrence:
+                recPeriod = {'daily': 0, 'weekly': 1, 'monthly': 2, 'yearly': 3}[task.recurrence().unit]
+                recRepeat = task.recurrence().amount
+                recSameWeekday = task.recurrence().sameWeekday
             else:
-                hasRecurrence = task.recurrence() is not None and task.recurrence().unit != ''
-                if hasRecurrence:
-                    recPeriod = {'daily': 0, 'weekly': 1, 'monthly': 2, 'yearly': 3}[task.recurrence().unit]
-                    recRepeat = task.recurrence().amount
-                    recSameWeekday = task.recurrence().sameWeekday
-                else:
-                    recPeriod = 0
-                    recRepeat = 0
-                    recSameWeekday = 0
-
-                self.pack('sssffffziiiii[s]',
-                          task.subject(),
-                          task.id(),
-                          task.description(),
-                          task.plannedStartDateTime(),
-                          task.dueDateTime(),
-                          task.completionDateTime(),
-                          task.reminder(),
-                          task.parent().id() if task.parent() is not None else None,
-                          task.priority(),
-                          hasRecurrence,
-                          recPeriod,
-                          recRepeat,
-                          recSameWeekday,
-                          [category.id() for category in task.categories()])
-
-    def handleNewObject(self, code):
-        self.disp().log(_('Response: %d'), code)
-        self.count += 1
-        self.ui.SetProgress(self.count, self.total)
-        self.sendObject()
+                recPeriod = 0
+                recRepeat = 0
+                recSameWeekday = 0
+
+            self.pack('sssffffziiiii[s]',
+                      task.subject(),
+                      task.id(),
+                      task.description(),
+                      task.plannedStartDateTime(),
+                      task.dueDateTime(),
+                      task.completionDateTime(),
+                      task.reminder(),
+                      task.parent().id() if task.parent() is not None else None,
+                      task.priority(),
+                      hasRecurrence,
+                      recPeriod,
+                      recRepeat,
+                      recSameWeekday,
+                      [category.id() for category in task.categories()])
 
     def finished(self):
         if self.version >= 4:
@@ -865,30 +925,19 @@ class FullFromDesktopTaskState(BaseState):
             self.setState(SendGUIDState)
 
 
-class FullFromDesktopEffortState(BaseState):
-    def init(self):
-        super(FullFromDesktopEffortState, self).init('i', len(self.efforts))
-
+class FullFromDesktopEffortState(FullFromDesktopObjectState):
+    def objectsToSend(self):
         self.disp().log(_('%d efforts'), len(self.efforts))
+        return self.efforts
 
-        if self.efforts:
-            self.sendObject()
-
-    def sendObject(self):
-        if self.efforts:
-            effort = self.efforts.pop(0)
-            self.disp().log(_('Send effort %s'), effort.id())
-            self.pack('ssztt',
-                      effort.id(),
-                      effort.subject(),
-                      effort.task().id() if effort.task() is not None else None,
-                      effort.getStart(),
-                      effort.getStop())
-
-    def handleNewObject(self, code): # pylint: disable=W0613
-        self.count += 1
-        self.ui.SetProgress(self.count, self.total)
-        self.sendObject()
+    def sendObject(self, effort):
+        self.disp().log(_('Send effort %s'), effort.id())
+        self.pack('ssztt',
+                  effort.id(),
+                  effort.subject(),
+                  effort.task().id() if effort.task() is not None else None,
+                  effort.getStart(),
+                  effort.getStop())
 
     def finished(self):
         if self.version < 5:
@@ -905,7 +954,7 @@ class FullFromDesktopEffortState(BaseState):
 
 class FullFromDeviceState(BaseState):
     def init(self):
-        self.disp().window.clearTasks()
+        self.windowForChanges().clearTasks()
 
         super(FullFromDeviceState, self).init('ii', 1)
 
@@ -940,7 +989,7 @@ class FullFromDeviceCategoryState(BaseState):
         else:
             category = self.categoryMap[parentId].newChild(name)
 
-        self.disp().window.addIPhoneCategory(category)
+        self.windowForChanges().addIPhoneCategory(category)
 
         self.pack('s', category.id())
         self.categoryMap[category.id()] = category
@@ -962,7 +1011,7 @@ class FullFromDeviceTaskState(BaseState):
                     dueDateTime=DateTime(dueDate.year, dueDate.month, dueDate.day), 
                     completionDateTime=DateTime(completionDate.year, completionDate.month, completionDate.day))
 
-        self.disp().window.addIPhoneTask(task, [self.categoryMap[id_] for id_ in categories])
+        self.windowForChanges().addIPhoneTask(task, [self.categoryMap[id_] for id_ in categories])
 
         self.count += 1
         self.ui.SetProgress(self.count, self.total)
@@ -1040,7 +1089,7 @@ class TwoWayNewCategoriesState(BaseState):
         else:
             category = self.categoryMap[parentId].newChild(name)
 
-        self.disp().window.addIPhoneCategory(category)
+        self.windowForChanges().addIPhoneCategory(category)
 
         self.categoryMap[category.id()] = category
         self.pack('s', category.id())
@@ -1067,7 +1116,7 @@ class TwoWayDeletedCategoriesState(BaseState):
             self.disp().log(_('Delete category %s'), category.id())
             if self.version >= 5:
                 self.pack('s', category.id())
-            self.disp().window.removeIPhoneCategory(category)
+            self.windowForChanges().removeIPhoneCategory(category)
 
     def finished(self):
         self.setState(TwoWayModifiedCategoriesState)
@@ -1085,7 +1134,7 @@ class TwoWayModifiedCategoriesState(BaseState):
                 self.pack('s', '')
         else:
             self.disp().log(_('Modify category %s'), category.id())
-            self.disp().window.modifyIPhoneCategory(category, name)
+            self.windowForChanges().modifyIPhoneCategory(category, name)
 
             if self.version >= 5:
                 self.pack('s', category.id())
@@ -1109,7 +1158,7 @@ class TwoWayNewTasksState(BaseState):
                     dueDateTime=DateTime(dueDate.year, dueDate.month, dueDate.day), 
                     completionDateTime=DateTime(completionDate.year, completionDate.month, completionDate.day))
 
-        self.disp().window.addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
+        self.windowForChanges().addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
                                                     if self.categoryMap.has_key(catId)])
         self.disp().log(_('New task %s'), task.id())
 
@@ -1142,7 +1191,7 @@ class TwoWayNewTasksState4(BaseState):
                     completionDateTime=completionDateTime, 
                     parent=parent)
 
-        self.disp().window.addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
+        self.windowForChanges().addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
                                                     if self.categoryMap.has_key(catId)])
         self.disp().log(_('New task %s'), task.id())
 
@@ -1178,7 +1227,7 @@ class TwoWayNewTasksState5(BaseState):
         # Don't start a timer from this thread...
         wx.CallAfter(task.setReminder, reminderDateTime)
 
-        self.disp().window.addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
+        self.windowForChanges().addIPhoneTask(task, [self.categoryMap[catId] for catId in categories \
                                                     if self.categoryMap.has_key(catId)])
         self.disp().log(_('New task %s'), task.id())
 
@@ -1203,7 +1252,7 @@ class TwoWayDeletedTasksState(BaseState):
             self.disp().log(_('Delete task %s'), task.id())
             if self.version >= 5:
                 self.pack('s', task.id())
-            self.disp().window.removeIPhoneTask(task)
+            self.windowForChanges().removeIPhoneTask(task)
 
     def finished(self):
         self.setState(TwoWayModifiedTasks)
@@ -1257,7 +1306,7 @@ class TwoWayModifiedTasks(BaseState):
                 self.pack('s', '')
         else:
             self.disp().log(_('Modify task %s'), task.id())
-            self.disp().window.modifyIPhoneTask(task, subject, description, 
+            self.windowForChanges().modifyIPhoneTask(task, subject, description, 
                                                 plannedStartDateTime, dueDateTime, 
                                                 completionDateTime, reminderDateTime,
                                                 recurrence, priority, categories)
@@ -1286,7 +1335,7 @@ class TwoWayNewEffortsState(BaseState):
 
         effort = Effort(task, started, ended, subject=subject)
         self.disp().log(_('New effort %s'), effort.id())
-        self.disp().window.addIPhoneEffort(task, effort)
+        self.windowForChanges().addIPhoneEffort(task, effort)
 
         self.pack('s', effort.id())
 
@@ -1311,7 +1360,7 @@ class TwoWayModifiedEffortsState(BaseState):
                 self.pack('s', '')
         else:
             self.disp().log(_('Modify effort %s'), effort.id())
-            self.disp().window.modifyIPhoneEffort(effort, subject, started, ended)
+            self.windowForChanges().modifyIPhoneEffort(effort, subject, started, ended)
             if self.version >= 5:
                 self.pack('s', effort.id())
 
@@ -172,6 +172,27 @@ def eventSource(f):
     return decorator    
 
 
+def sendMessage(topic, **kwargs):
+    ''' Send a pubsub message via the Publisher, so that the message is 
+        deferred while the Publisher is batching notifications. Domain 
+        objects use this instead of pub.sendMessage. '''
+    Publisher().sendMessage(topic, **kwargs)
+
+
+def eventBatch(f):
+    ''' Decorate methods that make many changes at once, such as pasting 
+        many items, with code that defers notifications until the method 
+        returns. See Publisher.startBatch(). '''
+    @functools.wraps(f)
+    def decorator(*args, **kwargs):
+        Publisher().startBatch()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            Publisher().endBatch()
+    return decorator
+
+
 class MethodProxy(object):
     ''' Wrap methods in a class that allows for comparing methods. Comparison
         if instance methods was changed in python 2.5. In python 2.5, instance
@@ -244,12 +265,18 @@ class Publisher(object):
     
     def __init__(self, *args, **kwargs):
         super(Publisher, self).__init__(*args, **kwargs)
+        self.__batchDepth = 0
+        self.__deferred = [] # Events and (topic, kwargs) messages, in order
+        # deferredMessages = {(topic, id(sender)): index in self.__deferred}
+        self.__deferredMessages = {} 
         self.clear()
         
     def clear(self):
         ''' Clear the registry of observers. Mainly for testing purposes. '''
         # observers = {(eventType, eventSource): set(callbacks)}
         self.__observers = {} # pylint: disable=W0201
+        # keysByObserver = {callback: set((eventType, eventSource))}
+        self.__keysByObserver = {} # pylint: disable=W0201
     
     @wrapObserver
     def registerObserver(self, observer, eventType, eventSource=None):
@@ -259,8 +286,9 @@ class Publisher(object):
             passing a specific eventSource, the observer is only called when the
             event originates from the specified eventSource. '''
             
-        observers = self.__observers.setdefault((eventType, eventSource), set())
-        observers.add(observer)
+        key = (eventType, eventSource)
+        self.__observers.setdefault(key, set()).add(observer)
+        self.__keysByObserver.setdefault(observer, set()).add(key)
     
     @wrapObserver    
     def removeObserver(self, observer, eventType=None, eventSource=None):
@@ -288,17 +316,99 @@ class Publisher(object):
         else:
             def match(type, source): return True
 
-        # Next, remove observers that are registered for the event source and
-        # event type we're looking for, i.e. that match:    
-        matchingKeys = [key for key in self.__observers if match(*key)]
+        # Next, remove the observer for the keys it is registered for that 
+        # match. Only the keys of the observer itself need to be checked:
+        keys = self.__keysByObserver.get(observer)
+        if not keys:
+            return
+        matchingKeys = [key for key in keys if match(*key)]
         for key in matchingKeys:
-            self.__observers[key].discard(observer)
-            if not self.__observers[key]:
+            keys.discard(key)
+            observers = self.__observers[key]
+            observers.discard(observer)
+            if not observers:
                 del self.__observers[key]
+        if not keys:
+            del self.__keysByObserver[observer]
+                        
+    def startBatch(self):
+        ''' Defer notifications until the matching endBatch() call. Batches
+            can be nested; the notifications are sent when the outermost 
+            batch ends. While batching, consecutive events with the same 
+            types are merged into one event and pubsub messages with the same
+            topic and sender are merged into one message with the latest 
+            values, sent at the position of the first message. Pubsub 
+            messages whose new value is a tuple, such as the (new, old) pairs
+            sent when efforts change, are not merged since receivers need to
+            see each of them. Only pubsub messages sent via sendMessage() 
+            are deferred; messages sent with pub.sendMessage directly are 
+            sent right away. '''
+        self.__batchDepth += 1
+        
+    def endBatch(self):
+        ''' End a batch started with startBatch(). If this ends the outermost
+            batch, send the deferred notifications. '''
+        self.__batchDepth -= 1
+        if self.__batchDepth > 0:
+            return
+        deferred, self.__deferred = self.__deferred, []
+        self.__deferredMessages = {}
+        for eventOrMessage in deferred:
+            if isinstance(eventOrMessage, Event):
+                self.notifyObservers(eventOrMessage)
+            else:
+                topic, kwargs = eventOrMessage
+                pub.sendMessage(topic, **kwargs)
+                
+    def isBatching(self):
+        return self.__batchDepth > 0
+
+    def sendMessage(self, topic, **kwargs):
+        ''' Send a pubsub message, or defer it when batching. '''
+        if not self.__batchDepth:
+            pub.sendMessage(topic, **kwargs)
+            return
+        sender = kwargs.get('sender')
+        if sender is not None and not isinstance(kwargs.get('newValue'), tuple):
+            key = (topic, id(sender))
+            index = self.__deferredMessages.get(key)
+            if index is not None:
+                # Keep the position of the first message, so the order of 
+                # messages with different topics doesn't change, but send 
+                # the latest values:
+                self.__deferred[index] = (topic, kwargs)
+                return
+            self.__deferredMessages[key] = len(self.__deferred)
+        self.__deferred.append((topic, kwargs))
+        
+    def __deferEvent(self, event):
+        previous = self.__deferred[-1] if self.__deferred else None
+        if isinstance(previous, Event) and previous.types() == event.types():
+            for type, sourcesAndValues in event.sourcesAndValuesByType().items():
+                for source, values in sourcesAndValues.items():
+                    previous.addSource(source, *values, **dict(type=type))
+        else:
+            self.__deferred.append(event)
                         
     def notifyObservers(self, event):
         ''' Notify observers of the event. The event type and sources are 
             extracted from the event. '''
+        if self.__batchDepth:
+            self.__deferEvent(event)
+            return
+        sourcesAndValuesByType = event.sourcesAndValuesByType()
+        if len(sourcesAndValuesByType) == 1:
+            type, sourcesAndValues = sourcesAndValuesByType.items()[0]
+            if len(sourcesAndValues) == 1:
+                # Most events have one type and one source. Observers of such
+                # an event would receive a sub event that equals the event 
+                # itself, so pass them the event instead of creating copies:
+                source = sourcesAndValues.keys()[0]
+                observers = self.__observers.get((type, source), set()) | \
+                            self.__observers.get((type, None), set())
+                for observer in observers:
+                    observer(event)
+                return
         if not event.sources():
             return
         # Collect observers *and* the types and sources they are registered for
@@ -322,10 +432,7 @@ class Publisher(object):
         if eventType:
             return self.__observers.get((eventType, None), set())
         else:
-            result = set()
-            for observers in self.__observers.values():
-                result |= observers
-            return result
+            return self.__keysByObserver.keys()
     
 
 class Observer(object):
@@ -161,10 +161,15 @@ class AutoBackup(object):
 
     def onTaskFileAboutToSave(self, taskFile):
         ''' Just before a task file is about to be saved, and backups are on,
-            create a backup and remove extraneous backup files. '''
+            create a backup and remove extraneous backup files. When the 
+            task file is saved in the background, the backup is created in 
+            the background too. '''
         if taskFile.exists():
-            self.createBackup(taskFile)
-            self.removeExtraneousBackupFiles(taskFile)
+            taskFile.callBeforeWriting(self.__backup, taskFile)
+
+    def __backup(self, taskFile):
+        self.createBackup(taskFile)
+        self.removeExtraneousBackupFiles(taskFile)
 
     def createBackup(self, taskFile):
         filename = self.backupFilename(taskFile)
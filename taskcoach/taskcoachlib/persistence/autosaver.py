@@ -30,6 +30,7 @@ class AutoSaver(object):
         self.__task_files = set()
         self.__bound = False
         pub.subscribe(self.onTaskFileDirty, 'taskfile.dirty')
+        pub.subscribe(self.onTaskFileSaveFailed, 'taskfile.saveFailed')
 
     def onTaskFileDirty(self, taskFile):
         ''' When a task file gets dirty and auto save is on, note it so 
@@ -40,6 +41,11 @@ class AutoSaver(object):
             self.__bound = True
             wx.GetApp().Bind(wx.EVT_IDLE, self.on_idle)
 
+    def onTaskFileSaveFailed(self, taskFile, reason):  # pylint: disable=W0613
+        ''' When saving in the background fails, the task file gets dirty
+            again. Don't retry right away, the user has to save it. '''
+        self.__task_files.discard(taskFile)
+
     def _needSave(self, task_file):
         ''' Return whether the task file needs to be saved. '''
         return task_file.filename() and task_file.needSave() and \
@@ -50,11 +56,12 @@ class AutoSaver(object):
             self.__settings.getboolean('file', 'autoload')
 
     def on_idle(self, event):
-        ''' Actually save the dirty files during idle time. '''
+        ''' Actually save the dirty files during idle time. The files are 
+            written in the background so the GUI stays responsive. '''
         event.Skip()
         wx.GetApp().Unbind(wx.EVT_IDLE, handler=self.on_idle)
         self.__bound = False
         while self.__task_files:
             task_file = self.__task_files.pop()
             if self._needSave(task_file):
-                task_file.save()
+                task_file.saveInBackground()
@@ -16,6 +16,7 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+from taskcoachlib import patterns
 from taskcoachlib.domain.category import Category
 from taskcoachlib.domain.date import DateTime, TimeDelta
 from taskcoachlib.domain.task import Task
@@ -39,6 +40,7 @@ class CSVReader(object):
             reader.next()
         return reader
         
+    @patterns.eventBatch
     def read(self, **kwargs):
         fp = tempfile.TemporaryFile()
         fp.write(file(kwargs['filename'], 'rU').read().decode(kwargs['encoding']).encode('UTF-8'))
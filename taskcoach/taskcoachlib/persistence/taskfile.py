@@ -16,7 +16,7 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
-import os
+import os, threading, StringIO
 from . import xml
 from taskcoachlib import patterns, operating_system
 from taskcoachlib.domain import base, task, category, note, effort, attachment
@@ -110,6 +110,48 @@ class SafeWriteFile(object):
         return _isCloud(os.path.dirname(self.__filename))
 
 
+class TaskFileWriter(threading.Thread):
+    ''' TaskFileWriter writes the serialized contents of a task file in a 
+        worker thread so that the GUI doesn't block while the file is 
+        written and renamed into place. Callbacks registered with 
+        callBeforeWriting() are run in the worker thread too, before the
+        file is overwritten, so they must not touch domain objects. When
+        done, the writer passes itself to the onDone callback, still in the 
+        worker thread. '''
+
+    def __init__(self, openForWrite, onDone):
+        super(TaskFileWriter, self).__init__()
+        self.__openForWrite = openForWrite
+        self.__onDone = onDone
+        self.__callbacks = []
+        self.__contents = None
+        self.error = None
+
+    def callBeforeWriting(self, callback, *args):
+        self.__callbacks.append((callback, args))
+
+    def setContents(self, contents):
+        self.__contents = contents
+
+    def wrote(self):
+        ''' Return whether the writer (tried to) overwrite the task file. '''
+        return self.__contents is not None
+
+    def run(self):
+        try:
+            for callback, args in self.__callbacks:
+                callback(*args)
+            if self.__contents is not None:
+                fd = self.__openForWrite()
+                try:
+                    fd.write(self.__contents)
+                finally:
+                    fd.close()
+        except Exception, reason: # pylint: disable=W0703
+            self.error = reason
+        self.__onDone(self)
+
+
 class TaskFile(patterns.Observer):
     def __init__(self, *args, **kwargs):
         self.__filename = self.__lastFilename = ''
@@ -124,11 +166,16 @@ class TaskFile(patterns.Observer):
         self.__changes = dict()
         self.__changes[self.__monitor.guid()] = self.__monitor
         self.__changedOnDisk = False
+        self.__diskSignature = None
+        # Serialized top-level tasks, so saving doesn't need to serialize 
+        # the tasks that didn't change:
+        self.__fragmentCache = xml.TaskFragmentCache()
         if kwargs.pop('poll', True):
             self.__notifier = TaskCoachFilesystemPollerNotifier(self)
         else:
             self.__notifier = TaskCoachFilesystemNotifier(self)
         self.__saving = False
+        self.__preparedWriter = self.__writer = None
         for collection in [self.__tasks, self.__categories, self.__notes]:
             self.__monitor.monitorCollection(collection)
         for domainClass in [task.Task, category.Category, note.Note, effort.Effort,
@@ -145,7 +192,8 @@ class TaskFile(patterns.Observer):
             
         for eventType in (base.Object.markDeletedEventType(),
                           base.Object.markNotDeletedEventType()):
-            self.registerObserver(self.onDomainObjectAddedOrRemoved, eventType)
+            self.registerObserver(self.onDomainObjectMarkedDeletedOrNot, 
+                                  eventType)
             
         for eventType in task.Task.modificationEventTypes():
             if not eventType.startswith('pubsub'):
@@ -212,13 +260,19 @@ class TaskFile(patterns.Observer):
             return
         self.markDirty()
 
+    def onDomainObjectMarkedDeletedOrNot(self, event):
+        self.__fragmentCache.changed(*event.sources())
+        self.onDomainObjectAddedOrRemoved(event)
+
     def onTaskChanged(self, newValue, sender):
+        self.__fragmentCache.changed(sender)
         if self.__loading or self.__saving:
             return
         if sender in self.tasks():
             self.markDirty()
                     
     def onTaskChanged_Deprecated(self, event):
+        self.__fragmentCache.changed(*event.sources())
         if self.__loading:
             return
         changedTasks = [changedTask for changedTask in event.sources() \
@@ -229,6 +283,7 @@ class TaskFile(patterns.Observer):
                 changedTask.markDirty()
             
     def onEffortChanged(self, event):
+        self.__fragmentCache.changed(*event.sources())
         if self.__loading or self.__saving:
             return
         changedEfforts = [changedEffort for changedEffort in event.sources() if \
@@ -253,6 +308,7 @@ class TaskFile(patterns.Observer):
             # categorizable changes.
             for changedCategory in changedCategories:
                 for categorizable in changedCategory.categorizables():
+                    self.__fragmentCache.changed(categorizable)
                     categorizable.markDirty()
             
     def onCategoryChanged(self, newValue, sender):
@@ -270,9 +326,11 @@ class TaskFile(patterns.Observer):
             # categorizable changes.
             for changedCategory in changedCategories:
                 for categorizable in changedCategory.categorizables():
+                    self.__fragmentCache.changed(categorizable)
                     categorizable.markDirty()
             
     def onNoteChanged_Deprecated(self, event):
+        self.__fragmentCache.changed(*event.sources())
         if self.__loading:
             return
         # A note may be in self.notes() or it may be a note of another 
@@ -282,6 +340,7 @@ class TaskFile(patterns.Observer):
             changedNote.markDirty()
             
     def onNoteChanged(self, newValue, sender):
+        self.__fragmentCache.changed(sender)
         if self.__loading:
             return
         # A note may be in self.notes() or it may be a note of another 
@@ -290,6 +349,7 @@ class TaskFile(patterns.Observer):
         sender.markDirty()
             
     def onAttachmentChanged(self, newValue, sender):
+        self.__fragmentCache.changed(sender)
         if self.__loading or self.__saving:
             return
         # Attachments don't know their owner, so we can't check whether the
@@ -297,6 +357,7 @@ class TaskFile(patterns.Observer):
         self.markDirty()
             
     def onAttachmentChanged_Deprecated(self, event):
+        self.__fragmentCache.changed(*event.sources())
         if self.__loading:
             return
         # Attachments don't know their owner, so we can't check whether the
@@ -310,6 +371,7 @@ class TaskFile(patterns.Observer):
             return
         self.__lastFilename = filename or self.__filename
         self.__filename = filename
+        self.__diskSignature = None
         self.__notifier.setFilename(filename)
         pub.sendMessage('taskfile.filenameChanged', filename=filename)
         
@@ -333,7 +395,7 @@ class TaskFile(patterns.Observer):
             pub.sendMessage('taskfile.clean', taskFile=self)
 
     def onFileChanged(self):
-        if not self.__saving:
+        if not self.__saving and not self.__writer:
             import wx # Not really clean but we're in another thread...
             self.__changedOnDisk = True
             wx.CallAfter(pub.sendMessage, 'taskfile.changed', taskFile=self)
@@ -345,6 +407,7 @@ class TaskFile(patterns.Observer):
             self.tasks().clear(event=event)
             self.categories().clear(event=event)
             self.notes().clear(event=event)
+            self.__fragmentCache.clear()
             if regenerate:
                 self.__guid = generate()
                 self.__syncMLConfig = createDefaultSyncConfig(self.__guid)
@@ -352,6 +415,7 @@ class TaskFile(patterns.Observer):
             pub.sendMessage('taskfile.justCleared', taskFile=self)
 
     def close(self):
+        self.finishBackgroundSave()
         if os.path.exists(self.filename()):
             changes = xml.ChangesXMLReader(self.filename() + '.delta').read()
             del changes[self.__monitor.guid()]
@@ -378,8 +442,28 @@ class TaskFile(patterns.Observer):
 
     def _openForRead(self):
         return file(self.__filename, 'rU')
+
+    def _diskSignature(self):
+        ''' Return a cheap signature of the task file on disk, used to detect
+            whether another instance wrote the file since we last read or
+            wrote it. SafeWriteFile renames a new file into place, so the
+            inode changes on every write, in addition to the size and 
+            modification time. '''
+        try:
+            stat = os.stat(self.__filename)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime
+
+    def __rememberDiskSignature(self):
+        self.__diskSignature = self._diskSignature()
+
+    def __isUnchangedOnDisk(self):
+        return not self.__changedOnDisk and self.__diskSignature is not None \
+            and self.__diskSignature == self._diskSignature()
     
     def load(self, filename=None):
+        self.finishBackgroundSave()
         pub.sendMessage('taskfile.aboutToRead', taskFile=self)
         self.__loading = True
         if filename:
@@ -398,13 +482,19 @@ class TaskFile(patterns.Observer):
                 changes = dict()
                 guid = generate()
                 syncMLConfig = createDefaultSyncConfig(guid)
-            self.clear()
-            self.__monitor.reset()
-            self.__changes = changes
-            self.__changes[self.__monitor.guid()] = self.__monitor
-            self.categories().extend(categories)
-            self.tasks().extend(tasks)
-            self.notes().extend(notes)
+            # Send one notification per list instead of one per object. The 
+            # batch has to end before the changes are reset below:
+            patterns.Publisher().startBatch()
+            try:
+                self.clear()
+                self.__monitor.reset()
+                self.__changes = changes
+                self.__changes[self.__monitor.guid()] = self.__monitor
+                self.categories().extend(categories)
+                self.tasks().extend(tasks)
+                self.notes().extend(notes)
+            finally:
+                patterns.Publisher().endBatch()
             def registerOtherObjects(objects):
                 for obj in objects:
                     if isinstance(obj, base.CompositeObject):
@@ -429,6 +519,7 @@ class TaskFile(patterns.Observer):
             if os.path.exists(self.filename()):
                 # We need to reset the changes on disk because we're up to date.
                 xml.ChangesXMLWriter(file(self.filename() + '.delta', 'wb')).write(self.__changes)
+                self.__rememberDiskSignature()
         except:
             self.setFilename('')
             raise
@@ -439,6 +530,7 @@ class TaskFile(patterns.Observer):
             pub.sendMessage('taskfile.justRead', taskFile=self)
         
     def save(self):
+        self.finishBackgroundSave()
         try:
             pub.sendMessage('taskfile.aboutToSave', taskFile=self)
         except:
@@ -454,28 +546,128 @@ class TaskFile(patterns.Observer):
             if self.__needSave or not os.path.exists(self.__filename):
                 fd = self._openForWrite()
                 try:
-                    xml.XMLWriter(fd).write(self.tasks(), self.categories(), self.notes(),
-                                            self.syncMLConfig(), self.guid())
+                    self.__write(fd)
                 finally:
                     fd.close()
+                self.__rememberDiskSignature()
 
             self.markClean()
         finally:
-            self.__saving = False
-            self.__notifier.saved()
+            self.__endSave()
+
+    def saveInBackground(self):
+        ''' Save the task file without blocking the GUI while the file is 
+            written. Merging with the changes on disk and serializing the 
+            task file happen right away, because the domain objects may 
+            only be used from the GUI thread. 'taskfile.justSaved' is sent as
+            soon as the task file is serialized, so changes made while the
+            file is being written mark the task file dirty again and are 
+            shown by the viewers. Creating the backup, writing the file and 
+            renaming it into place are done by a worker thread. If the file 
+            couldn't be written, 'taskfile.saveFailed' is sent from the GUI 
+            thread when the worker is done. '''
+        self.finishBackgroundSave()
+        writer = TaskFileWriter(self._openForWrite, self.__onWrittenInBackground)
+        self.__preparedWriter = writer # So callBeforeWriting() can find it
+        try:
             try:
-                pub.sendMessage('taskfile.justSaved', taskFile=self)
+                pub.sendMessage('taskfile.aboutToSave', taskFile=self)
             except:
                 pass
+            self.__saving = True
+            try:
+                self.mergeDiskChanges()
+                if self.__needSave or not os.path.exists(self.__filename):
+                    contents = StringIO.StringIO()
+                    self.__write(contents)
+                    writer.setContents(contents.getvalue())
+                # The contents contain all changes, so we're clean unless 
+                # writing them fails:
+                self.markClean()
+            except:
+                self.__endSave()
+                raise
+        finally:
+            self.__preparedWriter = None
+        self.__writer = writer # Writer in flight, see finishBackgroundSave()
+        self.__endSerialization()
+        writer.start()
+
+    def finishBackgroundSave(self):
+        ''' Wait for the background save in progress, if any, and finish it
+            right away instead of when the GUI thread gets around to it. '''
+        writer = self.__writer
+        if writer:
+            writer.join()
+            self.__onWritten(writer)
+
+    def callBeforeWriting(self, callback, *args):
+        ''' Call the callback before the task file on disk is overwritten. 
+            This is meant for subscribers of 'taskfile.aboutToSave' that 
+            need the old file, such as the backup. When saving in the 
+            background, the callback is called from the worker thread. '''
+        if self.__preparedWriter:
+            self.__preparedWriter.callBeforeWriting(callback, *args)
+        else:
+            callback(*args)
+
+    def __write(self, fd):
+        xml.XMLWriter(fd, fragmentCache=self.__fragmentCache).write(
+            self.tasks(), self.categories(), self.notes(),
+            self.syncMLConfig(), self.guid())
+
+    def __onWrittenInBackground(self, writer):
+        import wx # Not really clean but we're in another thread...
+        wx.CallAfter(self.__onWritten, writer)
+
+    def __onWritten(self, writer):
+        if writer is not self.__writer:
+            return # Already finished by finishBackgroundSave()
+        self.__writer = None
+        try:
+            if writer.error:
+                self.markDirty()
+                pub.sendMessage('taskfile.saveFailed', taskFile=self, 
+                                reason=writer.error)
+            elif writer.wrote():
+                self.__rememberDiskSignature()
+        finally:
+            try:
+                self._onBackgroundSaveFinished()
+            finally:
+                self.__notifier.saved()
+
+    def _onBackgroundSaveFinished(self):
+        ''' Called from the GUI thread when the worker thread of a background
+            save is done, whether writing succeeded or not. '''
+        pass
+
+    def __endSave(self):
+        self.__notifier.saved()
+        self.__endSerialization()
+
+    def __endSerialization(self):
+        self.__saving = False
+        try:
+            pub.sendMessage('taskfile.justSaved', taskFile=self)
+        except:
+            pass
 
     def mergeDiskChanges(self):
+        self.finishBackgroundSave()
         self.__loading = True
         try:
-            if os.path.exists(self.__filename): # Not using self.exists() because DummyFile.exists returns True
+            if self.__isUnchangedOnDisk():
+                # Nobody else wrote the task file since we last read or wrote 
+                # it, so our objects are up to date and only the change sets 
+                # of the other devices need to be updated.
+                self.__mergeDeltaChanges()
+            elif os.path.exists(self.__filename): # Not using self.exists() because DummyFile.exists returns True
                 # Instead of writing the content of memory, merge changes
                 # with the on-disk version and save the result.
                 self.__monitor.freeze()
                 try:
+                    signature = self._diskSignature()
                     fd = self._openForRead()
                     tasks, categories, notes, syncMLConfig, allChanges, guid = self._read(fd)
                     fd.close()
@@ -483,9 +675,7 @@ class TaskFile(patterns.Observer):
                     self.__changes = allChanges
 
                     if self.__saving:
-                        for devGUID, changes in self.__changes.items():
-                            if devGUID != self.__monitor.guid():
-                                changes.merge(self.__monitor)
+                        self.__mergeMonitorIntoOtherDevices()
 
                     sync = ChangeSynchronizer(self.__monitor, allChanges)
 
@@ -496,6 +686,7 @@ class TaskFile(patterns.Observer):
                         )
 
                     self.__changes[self.__monitor.guid()] = self.__monitor
+                    self.__diskSignature = signature
                 finally:
                     self.__monitor.thaw()
             else:
@@ -512,7 +703,27 @@ class TaskFile(patterns.Observer):
         finally:
             self.__loading = False
 
+    def __mergeDeltaChanges(self):
+        # The change sets only contain the names of changed attributes, not
+        # their values, so we can only skip reading the task file itself
+        # when it is unchanged. Other devices may have come and gone in the 
+        # meantime, so the change sets are read from disk.
+        deltaFilename = self.__filename + '.delta'
+        if os.path.exists(deltaFilename):
+            self.__changes = xml.ChangesXMLReader(file(deltaFilename, 'rU')).read()
+        else:
+            self.__changes = dict()
+        if self.__saving:
+            self.__mergeMonitorIntoOtherDevices()
+        self.__changes[self.__monitor.guid()] = self.__monitor
+
+    def __mergeMonitorIntoOtherDevices(self):
+        for devGUID, changes in self.__changes.items():
+            if devGUID != self.__monitor.guid():
+                changes.merge(self.__monitor)
+
     def saveas(self, filename):
+        self.finishBackgroundSave()
         if os.path.exists(filename):
             os.remove(filename)
         if os.path.exists(filename + '.delta'):
@@ -524,17 +735,23 @@ class TaskFile(patterns.Observer):
         mergeFile = self.__class__()
         mergeFile.load(filename)
         self.__loading = True
-        categoryMap = dict()
-        self.tasks().removeItems(self.objectsToOverwrite(self.tasks(), mergeFile.tasks()))
-        self.rememberCategoryLinks(categoryMap, self.tasks())
-        self.tasks().extend(mergeFile.tasks().rootItems())
-        self.notes().removeItems(self.objectsToOverwrite(self.notes(), mergeFile.notes()))
-        self.rememberCategoryLinks(categoryMap, self.notes())
-        self.notes().extend(mergeFile.notes().rootItems())
-        self.categories().removeItems(self.objectsToOverwrite(self.categories(),
-                                                              mergeFile.categories()))
-        self.categories().extend(mergeFile.categories().rootItems())
-        self.restoreCategoryLinks(categoryMap)
+        # Send one notification per changed object instead of one per change.
+        # The batch has to end while loading so the changes are ignored:
+        patterns.Publisher().startBatch()
+        try:
+            categoryMap = dict()
+            self.tasks().removeItems(self.objectsToOverwrite(self.tasks(), mergeFile.tasks()))
+            self.rememberCategoryLinks(categoryMap, self.tasks())
+            self.tasks().extend(mergeFile.tasks().rootItems())
+            self.notes().removeItems(self.objectsToOverwrite(self.notes(), mergeFile.notes()))
+            self.rememberCategoryLinks(categoryMap, self.notes())
+            self.notes().extend(mergeFile.notes().rootItems())
+            self.categories().removeItems(self.objectsToOverwrite(self.categories(),
+                                                                  mergeFile.categories()))
+            self.categories().extend(mergeFile.categories().rootItems())
+            self.restoreCategoryLinks(categoryMap)
+        finally:
+            patterns.Publisher().endBatch()
         mergeFile.close()
         self.__loading = False
         self.markDirty(force=True)
@@ -575,6 +792,8 @@ class TaskFile(patterns.Observer):
 
     def endSync(self):
         self.__loading = False
+        # Syncing changes the status of objects without notifying us:
+        self.__fragmentCache.clear()
         self.markDirty()
 
 
@@ -601,6 +820,11 @@ class LockedTaskFile(TaskFile):
     def __init__(self, *args, **kwargs):
         super(LockedTaskFile, self).__init__(*args, **kwargs)
         self.__lock = None
+        # Saving in the background keeps the lock until the worker thread is
+        # done, while other operations may need the lock in the meantime. So
+        # count how many operations hold the lock and release it when the 
+        # last one is done:
+        self.__lockCount = 0
 
     def __isFuse(self, path):
         if operating_system.isGTK() and os.path.exists('/proc/mounts'):
@@ -642,37 +866,70 @@ class LockedTaskFile(TaskFile):
         self.__lock = self.__createLockFile(filename)
         self.__lock.break_lock()
 
+    def __holdLock(self, filename):
+        if self.__lockCount == 0:
+            self.acquire_lock(filename)
+        self.__lockCount += 1
+
+    def __releaseHeldLock(self):
+        self.__lockCount = max(0, self.__lockCount - 1)
+        if self.__lockCount == 0:
+            self.release_lock()
+
     def close(self):
-        if self.filename() and os.path.exists(self.filename()):
-            self.acquire_lock(self.filename())
+        locked = bool(self.filename() and os.path.exists(self.filename()))
+        if locked:
+            self.__holdLock(self.filename())
         try:
             super(LockedTaskFile, self).close()
         finally:
-            self.release_lock()
+            if locked:
+                self.__releaseHeldLock()
+            else:
+                self.release_lock()
 
     def load(self, filename=None, lock=True, breakLock=False): # pylint: disable=W0221
         ''' Lock the file before we load, if not already locked. '''
         filename = filename or self.filename()
+        locked = False
         try:
             if lock and filename:
                 if breakLock:
                     self.break_lock(filename)
-                self.acquire_lock(filename)
+                self.__holdLock(filename)
+                locked = True
             return super(LockedTaskFile, self).load(filename)
         finally:
-            self.release_lock()
+            if locked:
+                self.__releaseHeldLock()
+            else:
+                self.release_lock()
     
     def save(self, **kwargs):
         ''' Lock the file before we save, if not already locked. '''
-        self.acquire_lock(self.filename())
+        self.__holdLock(self.filename())
         try:
             return super(LockedTaskFile, self).save(**kwargs)
         finally:
-            self.release_lock()
+            self.__releaseHeldLock()
+
+    def saveInBackground(self):
+        ''' Lock the file before we save and keep it locked until the worker
+            thread is done writing. '''
+        self.__holdLock(self.filename())
+        try:
+            super(LockedTaskFile, self).saveInBackground()
+        except:
+            self.__releaseHeldLock()
+            raise
+
+    def _onBackgroundSaveFinished(self):
+        super(LockedTaskFile, self)._onBackgroundSaveFinished()
+        self.__releaseHeldLock()
 
     def mergeDiskChanges(self):
-        self.acquire_lock(self.filename())
+        self.__holdLock(self.filename())
         try:
             super(LockedTaskFile, self).mergeDiskChanges()
         finally:
-            self.release_lock()
+            self.__releaseHeldLock()
@@ -56,6 +56,7 @@ class TodoTxtReader(object):
         with codecs.open(filename, 'r', 'utf-8') as fp:
             self.readFile(fp, metaLines=metaLines)
 
+    @patterns.eventBatch
     @patterns.eventSource    
     def readFile(self, fp, now=date.Now, event=None, metaLines=None):
         todoTxtRE = self.compileTodoTxtRE()
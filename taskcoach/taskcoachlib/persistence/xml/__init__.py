@@ -19,5 +19,6 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # This is the xml package. This package contains classes to read and 
 # write xml (.tsk) files.
 from .reader import XMLReader, TemplateXMLReader, ChangesXMLReader
-from .writer import XMLWriter, TemplateXMLWriter, ChangesXMLWriter
+from .writer import XMLWriter, TemplateXMLWriter, ChangesXMLWriter, \
+    TaskFragmentCache
 from .templates import getDefaultTemplates
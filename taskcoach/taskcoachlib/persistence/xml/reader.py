@@ -82,23 +82,48 @@ class XMLReader(object):
 
     def read(self):
         ''' Read the task file and return the tasks, categories, notes, SyncML
-            configuration and GUID. '''
+            configuration and GUID. The file is parsed incrementally: each
+            top-level task, category and note node is turned into a domain
+            object as soon as it has been parsed and then removed from the 
+            tree, so the complete element tree is never in memory. '''
         if self.__has_broken_lines():
             self.__fix_broken_lines()
         parser = PIParser()
-        tree = ET.parse(self.__fd, parser)
-        root = tree.getroot()
-        self.__tskversion = parser.tskversion  # pylint: disable=W0201
-        if self.__tskversion > meta.data.tskversion:
-            # Version number of task file is too high
-            raise XMLReaderTooNewException
-        tasks = self.__parse_task_nodes(root)
+        tasks, categories, notes = [], [], []
+        category_mapping = {}
+        root = None
+        depth = 0
+        for event, node in ET.iterparse(self.__fd, events=('start', 'end'), 
+                                        parser=parser):
+            if event == 'start':
+                if root is None:
+                    # The processing instruction precedes the root node, so 
+                    # we know the version of the task file by now
+                    root = node
+                    self.__tskversion = parser.tskversion  # pylint: disable=W0201
+                    if self.__tskversion > meta.data.tskversion:
+                        # Version number of task file is too high
+                        raise XMLReaderTooNewException
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            if node.tag == 'task':
+                if self.__tskversion <= 13:
+                    self.__parse_category_nodes_within_task_nodes(\
+                        [node] + node.findall('.//task'), category_mapping)
+                tasks.append(self._parse_task_node(node))
+            elif node.tag == 'category' and self.__tskversion > 13:
+                categories.append(self.__parse_category_node(node))
+            elif node.tag == 'note':
+                notes.append(self.__parse_note_node(node))
+            else:
+                continue  # Keep the SyncML and GUID nodes, they're parsed below
+            root.remove(node)
         self.__resolve_prerequisites_and_dependencies(tasks)
-        notes = self.__parse_note_nodes(root)
         if self.__tskversion <= 13:
-            categories = self.__parse_category_nodes_from_task_nodes(root)
-        else:
-            categories = self.__parse_category_nodes(root)
+            categories = self.__create_categories_from_mapping(category_mapping)
         self.__resolve_categories(categories, tasks, notes)
 
         guid = self.__parse_guid_node(root.find('guid'))
@@ -117,7 +142,11 @@ class XMLReader(object):
 
     def __has_broken_lines(self):
         ''' tskversion 24 may contain newlines in element tags. '''
-        has_broken_lines = '><spds><sources><TaskCoach-\n' in self.__fd.read()
+        has_broken_lines = False
+        for line in self.__fd:
+            if line.endswith('><spds><sources><TaskCoach-\n'):
+                has_broken_lines = True
+                break
         self.__fd.seek(0)
         return has_broken_lines
     
@@ -242,11 +271,8 @@ class XMLReader(object):
         self.__categorizables.setdefault(theCategory.id(), list()).extend(categorizable_ids.split(' '))
         return self.__save_modification_datetime(theCategory)
                       
-    def __parse_category_nodes_from_task_nodes(self, root):
+    def __create_categories_from_mapping(self, category_mapping):
         ''' In tskversion <=13 category nodes were subnodes of task nodes. '''
-        task_nodes = root.findall('.//task')
-        category_mapping = \
-            self.__parse_category_nodes_within_task_nodes(task_nodes)
         subject_category_mapping = {}
         for task_id, categories in category_mapping.items():
             for subject in categories:
@@ -258,14 +284,13 @@ class XMLReader(object):
                 self.__categorizables.setdefault(cat.id(), list()).append(task_id)
         return subject_category_mapping.values()
     
-    def __parse_category_nodes_within_task_nodes(self, task_nodes):
+    @staticmethod
+    def __parse_category_nodes_within_task_nodes(task_nodes, category_mapping):
         ''' In tskversion <=13 category nodes were subnodes of task nodes. '''
-        category_mapping = {}
         for node in task_nodes:
             task_id = node.attrib['id']
             categories = [child.text for child in node.findall('category')]
             category_mapping.setdefault(task_id, []).extend(categories)
-        return category_mapping
         
     def _parse_task_node(self, task_node):
         '''Recursively parse the node and return a task instance. '''
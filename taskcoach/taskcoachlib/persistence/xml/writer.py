@@ -21,9 +21,10 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from xml.etree import ElementTree as ET
 from taskcoachlib import meta
 from taskcoachlib.domain import date, task, note, category
-from xml.etree import ElementTree as ET
+import StringIO
 import os
 import sys
+import weakref
 
 
 def flatten(elem):
@@ -36,27 +37,52 @@ def flatten(elem):
         flatten(child)
 
 
-class PIElementTree(ET.ElementTree):
-    def __init__(self, pi, *args, **kwargs):
-        self.__pi = pi
-        ET.ElementTree.__init__(self, *args, **kwargs)
-
-    def _write(self, file, node, encoding, namespaces):
-        if node == self._root:
-            # WTF? ElementTree does not write the encoding if it's ASCII or UTF-8...
-            if encoding in ['us-ascii', 'utf-8']:
-                file.write('<?xml version="1.0" encoding="%s"?>\n' % encoding)
-            file.write(self.__pi.encode(encoding) + '\n')
-        ET.ElementTree._write(self, file, node, encoding, namespaces)  # pylint: disable=E1101
-
-    def write(self, file, encoding, *args, **kwargs):
-        if encoding is None:
-            encoding = 'utf-8'
-        if sys.version_info >= (2, 7):
-            file.write('<?xml version="1.0" encoding="%s"?>\n' % encoding)
-            file.write(self.__pi.encode(encoding) + '\n')
-            kwargs['xml_declaration'] = False
-        ET.ElementTree.write(self, file, encoding, *args, **kwargs)
+class PIElementStream(object):
+    ''' Write an XML document with a processing instruction one top-level
+        node at a time, so the complete element tree never needs to be in 
+        memory. Nodes are created as children of root() and written and 
+        discarded by flush(). The output is the same as that of writing the 
+        flattened complete tree at once. '''
+    def __init__(self, fd, pi, rootTag, encoding='utf-8'):
+        self.__fd = fd
+        self.__encoding = encoding
+        self.__root = ET.Element(rootTag)
+        self.__rootStarted = False
+        fd.write('<?xml version="1.0" encoding="%s"?>\n' % encoding)
+        fd.write(pi.encode(encoding) + '\n')
+
+    def root(self):
+        return self.__root
+
+    def flush(self):
+        self.write(self.serialize())
+
+    def serialize(self):
+        ''' Return the nodes created since the last flush as string and 
+            discard them. '''
+        buffer = StringIO.StringIO()
+        kwargs = dict(xml_declaration=False) if sys.version_info >= (2, 7) else dict()
+        for node in self.__root:
+            flatten(node)
+            ET.ElementTree(node).write(buffer, self.__encoding, **kwargs)  # pylint: disable=W0142
+        del self.__root[:]
+        return buffer.getvalue()
+
+    def write(self, data):
+        ''' Write nodes serialized before. '''
+        if not data:
+            return
+        if not self.__rootStarted:
+            self.__fd.write('<%s>\n' % self.__root.tag)
+            self.__rootStarted = True
+        self.__fd.write(data)
+
+    def close(self):
+        self.flush()
+        if self.__rootStarted:
+            self.__fd.write('</%s>\n' % self.__root.tag)
+        else:
+            self.__fd.write('<%s />\n' % self.__root.tag)
 
 
 def sortedById(objects):
@@ -65,36 +91,118 @@ def sortedById(objects):
     return [obj for dummy_id, obj in s]
 
 
+class TaskFragmentCache(object):
+    ''' TaskFragmentCache keeps the serialized XML of top-level tasks between
+        saves, so that XMLWriter only needs to serialize the top-level tasks
+        with changes. The owner of the cache passes the domain objects that
+        changed to changed(), including the objects that children, efforts,
+        notes or attachments were added to or removed from and the objects 
+        whose status changed. The fragment of a top-level task is dropped 
+        when any object in its subtree, as it was when the fragment was 
+        created, changed. Changes the owner isn't told about are not 
+        noticed; the owner has to clear() the cache after such changes. '''
+
+    def __init__(self):
+        # fragments = {top-level task: (ids, fragment)}
+        self.__fragments = weakref.WeakKeyDictionary()
+        self.__changedIds = set()
+        self.__writtenTasks = set()
+
+    def changed(self, *objects):
+        self.__changedIds.update(eachObject.id() for eachObject in objects)
+
+    def clear(self):
+        self.__fragments = weakref.WeakKeyDictionary()
+        self.__changedIds = set()
+        self.__writtenTasks = set()
+
+    def fragment(self, rootTask):
+        ''' Return the cached fragment for the top-level task or None if the
+            fragment needs to be (re)created. '''
+        self.__writtenTasks.add(rootTask)
+        try:
+            ids, fragment = self.__fragments[rootTask]
+        except KeyError:
+            return None
+        if ids.isdisjoint(self.__changedIds):
+            return fragment
+        del self.__fragments[rootTask]
+        return None
+
+    def setFragment(self, rootTask, fragment):
+        self.__fragments[rootTask] = (self.__idsInSubtree(rootTask), fragment)
+
+    def finishWrite(self):
+        ''' Forget fragments of tasks that are no longer top-level tasks and
+            the changes that have been written. '''
+        for rootTask in self.__fragments.keys():
+            if rootTask not in self.__writtenTasks:
+                del self.__fragments[rootTask]
+        self.__writtenTasks = set()
+        self.__changedIds = set()
+
+    @classmethod
+    def __idsInSubtree(class_, item, ids=None):
+        if ids is None:
+            ids = set()
+        ids.add(item.id())
+        for relatedItems in ('children', 'efforts', 'notes', 'attachments'):
+            try:
+                related = getattr(item, relatedItems)()
+            except AttributeError:
+                continue
+            for relatedItem in related:
+                class_.__idsInSubtree(relatedItem, ids)
+        return ids
+
+
 class XMLWriter(object):
     maxDateTime = date.DateTime()
     
-    def __init__(self, fd, versionnr=meta.data.tskversion):
+    def __init__(self, fd, versionnr=meta.data.tskversion, fragmentCache=None):
         self.__fd = fd
         self.__versionnr = versionnr
+        self.__fragmentCache = fragmentCache
 
     def write(self, taskList, categoryContainer,
               noteContainer, syncMLConfig, guid):
-        root = ET.Element('tasks')
+        stream = PIElementStream(self.__fd, 
+            '<?taskcoach release="%s" tskversion="%d"?>\n' % (meta.data.version,
+                                                               self.__versionnr),
+            'tasks')
+        root = stream.root()
 
         for rootTask in sortedById(taskList.rootItems()):
-            self.taskNode(root, rootTask)
+            self.__writeTask(stream, rootTask)
+        if self.__fragmentCache is not None:
+            self.__fragmentCache.finishWrite()
         
-        ownedNotes = self.notesOwnedByNoteOwners(taskList, categoryContainer)
+        ownedNotes = set(self.notesOwnedByNoteOwners(taskList, categoryContainer))
         for rootCategory in sortedById(categoryContainer.rootItems()):
             self.categoryNode(root, rootCategory, taskList, noteContainer, ownedNotes)
+            stream.flush()
 
         for rootNote in sortedById(noteContainer.rootItems()):
             self.noteNode(root, rootNote)
+            stream.flush()
         
         if syncMLConfig:
             self.syncMLNode(root, syncMLConfig)
         if guid:
             ET.SubElement(root, 'guid').text = guid
-
-        flatten(root)
-        PIElementTree('<?taskcoach release="%s" tskversion="%d"?>\n' % (meta.data.version,
-                                                                         self.__versionnr),
-                                                root).write(self.__fd, 'utf-8')
+        stream.close()
+    
+    def __writeTask(self, stream, rootTask):
+        if self.__fragmentCache is None:
+            self.taskNode(stream.root(), rootTask)
+            stream.flush()
+            return
+        fragment = self.__fragmentCache.fragment(rootTask)
+        if fragment is None:
+            self.taskNode(stream.root(), rootTask)
+            fragment = stream.serialize()
+            self.__fragmentCache.setFragment(rootTask, fragment)
+        stream.write(fragment)
     
     def notesOwnedByNoteOwners(self, *collectionOfNoteOwners):
         notes = []
@@ -16,12 +16,13 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+import bisect
 import wx
 from taskcoachlib.thirdparty.wxScheduler import wxScheduler, wxSchedule, \
     EVT_SCHEDULE_ACTIVATED, EVT_SCHEDULE_RIGHT_CLICK, \
     EVT_SCHEDULE_DCLICK, EVT_PERIODWIDTH_CHANGED, wxReportScheduler, wxTimeFormat
 from taskcoachlib.thirdparty.wxScheduler.wxSchedulerConstants import wxSCHEDULER_WEEKSTART_MONDAY,\
-    wxSCHEDULER_WEEKSTART_SUNDAY
+    wxSCHEDULER_WEEKSTART_SUNDAY, wxSCHEDULER_WEEKLY, wxSCHEDULER_MONTHLY
 from taskcoachlib.domain import date
 from taskcoachlib.widgets import draganddrop
 from taskcoachlib import command, render
@@ -29,9 +30,19 @@ from . import tooltip
 
 
 class _CalendarContent(tooltip.ToolTipMixin, wxScheduler):
+    # Schedules are also created for tasks just outside the visible period so
+    # that they are ready when the user moves to the next or previous period 
+    # and so that the days of adjacent months shown in the month view and the 
+    # start of the week are covered:
+    prefetchMargin = date.TimeDelta(days=7)
+
     def __init__(self, parent, taskList, iconProvider, onSelect, onEdit,
                  onCreate, onChangeConfig, popupMenu, *args, **kwargs):
         self.getItemTooltipData = parent.getItemTooltipData
+        # The wxScheduler constructor sets the date and view type, so these
+        # need to exist before calling it:
+        self.__index = None
+        self.__shownPeriod = None
 
         self.__onDropURLCallback = kwargs.pop('onDropURL', None)
         self.__onDropFilesCallback = kwargs.pop('onDropFiles', None)
@@ -64,6 +75,8 @@ class _CalendarContent(tooltip.ToolTipMixin, wxScheduler):
         self.SetResizable(True)
 
         self.taskList = taskList
+        self.taskMap = {}  # {task id: schedule} for the tasks shown
+        self.__index = TaskIntervalIndex()
         self.RefreshAllItems(0)
 
         EVT_SCHEDULE_ACTIVATED(self, self.OnActivation)
@@ -125,8 +138,20 @@ class _CalendarContent(tooltip.ToolTipMixin, wxScheduler):
     def OnChangeConfig(self, event):  # pylint: disable=W0613
         self.changeConfigCb()
 
+    def SetDate(self, *args, **kwargs):
+        super(_CalendarContent, self).SetDate(*args, **kwargs)
+        self.__showVisiblePeriod()
+
+    def SetViewType(self, *args, **kwargs):
+        super(_CalendarContent, self).SetViewType(*args, **kwargs)
+        self.__showVisiblePeriod()
+
+    def SetPeriodCount(self, *args, **kwargs):
+        super(_CalendarContent, self).SetPeriodCount(*args, **kwargs)
+        self.__showVisiblePeriod()
+
     def Select(self, schedule=None):
-        if self.__selection:
+        if self.__selection and self.__selection[0].id() in self.taskMap:
             self.taskMap[self.__selection[0].id()].SetSelected(False)
 
         if schedule is None:
@@ -163,41 +188,89 @@ class _CalendarContent(tooltip.ToolTipMixin, wxScheduler):
 
     def RefreshAllItems(self, count):  # pylint: disable=W0613
         x, y = self.GetViewStart()
-        selectionId = None
-        if self.__selection:
-            selectionId = self.__selection[0].id()
-        self.__selection = []
-
-        self.DeleteAll()
-
-        schedules = []
-        self.taskMap = {}  # pylint: disable=W0201
-        maxDateTime = date.DateTime()
-
-        for task in self.taskList:
-            if not task.isDeleted():
-                if task.plannedStartDateTime() == maxDateTime or not task.completed():
-                    if task.plannedStartDateTime() == maxDateTime and not self.__showNoPlannedStartDate:
-                        continue
-
-                    if task.dueDateTime() == maxDateTime and not self.__showNoDueDate:
-                        continue
-
-                    if not self.__showUnplanned:
-                        if task.plannedStartDateTime() == maxDateTime and task.dueDateTime() == maxDateTime:
-                            continue
-
-                schedule = TaskSchedule(task, self.iconProvider)
-                schedules.append(schedule)
-                self.taskMap[task.id()] = schedule
+        self.__index.reindex(self.taskList)
+        self.__shownPeriod = self.__visiblePeriod()
+        self.__showTasks(self.__index.tasksBetween(*self.__shownPeriod), 
+                         update=True)
+        wx.CallAfter(self.selectCommand)
+        self.Scroll(x, y)
 
+    def __showVisiblePeriod(self):
+        if self.__index is None:
+            return  # Still initializing
+        period = self.__visiblePeriod()
+        if period != self.__shownPeriod:
+            self.__shownPeriod = period
+            hadSelection = bool(self.__selection)
+            self.__showTasks(self.__index.tasksBetween(*period))
+            if hadSelection and not self.__selection:
+                wx.CallAfter(self.selectCommand)
+
+    def __visiblePeriod(self):
+        ''' Return the start and end of the period shown, including the
+            prefetch margin. '''
+        start = TaskSchedule.tcDateTime(self.GetDate()).startOfDay()
+        periodCount = self.GetPeriodCount()
+        if self.GetViewType() == wxSCHEDULER_WEEKLY:
+            nrDays = 7 * periodCount
+        elif self.GetViewType() == wxSCHEDULER_MONTHLY:
+            start = date.DateTime(start.year, start.month, 1)
+            nrDays = 31 * periodCount
+        else:
+            nrDays = periodCount
+        return start - self.prefetchMargin, \
+            start + date.TimeDelta(days=nrDays) + self.prefetchMargin
+
+    def __showTasks(self, tasks, update=False):
+        ''' Make sure the tasks that should be shown, and only those, have a
+            schedule. Existing schedules are kept and, if update is True, 
+            updated. '''
+        selectionId = self.__selection[0].id() if self.__selection else None
+        self.__selection = []
+        tasks = [task for task in tasks if self.__shouldShow(task)]
+        taskIds = set(task.id() for task in tasks)
+        self.Freeze()
+        try:
+            for taskId in [taskId for taskId in self.taskMap \
+                           if taskId not in taskIds]:
+                self.Delete(self.taskMap.pop(taskId))
+            newSchedules = []
+            for task in tasks:
+                schedule = self.taskMap.get(task.id())
+                if schedule is None:
+                    schedule = TaskSchedule(task, self.iconProvider)
+                    self.taskMap[task.id()] = schedule
+                    newSchedules.append(schedule)
+                elif update:
+                    schedule.update()
                 if task.id() == selectionId:
                     self.__selection = [task]
                     schedule.SetSelected(True)
+            if newSchedules:
+                self.Add(newSchedules)
+        finally:
+            self.Thaw()
 
-        self.Add(schedules)
-        wx.CallAfter(self.selectCommand)
-        self.Scroll(x, y)
+    def __shouldShow(self, task):
+        if task.isDeleted():
+            return False
+        maxDateTime = date.DateTime()
+        noPlannedStart = task.plannedStartDateTime() == maxDateTime
+        if task.completed() and not noPlannedStart:
+            return True
+        noDue = task.dueDateTime() == maxDateTime
+        if noPlannedStart and not self.__showNoPlannedStartDate:
+            return False
+        if noDue and not self.__showNoDueDate:
+            return False
+        if noPlannedStart and noDue and not self.__showUnplanned:
+            return False
+        return True
+
+    def __isInShownPeriod(self, task):
+        start, end = TaskIntervalIndex.period(task)
+        shownStart, shownEnd = self.__shownPeriod
+        return start <= shownEnd and end >= shownStart
 
     def RefreshItems(self, *args):
         selectionId = None
@@ -206,23 +279,8 @@ class _CalendarContent(tooltip.ToolTipMixin, wxScheduler):
         self.__selection = []
 
         for task in args:
-            doShow = True
-
-            if task.plannedStartDateTime() == date.DateTime() and task.dueDateTime() == date.DateTime() and not self.__showUnplanned:
-                doShow = False
-
-            if task.plannedStartDateTime() == date.DateTime() and not self.__showNoPlannedStartDate:
-                doShow = False
-
-            if task.dueDateTime() == date.DateTime() and not self.__showNoDueDate:
-                doShow = False
-
-            # Special case
-
-            if task.isDeleted():
-                doShow = False
-            elif task.plannedStartDateTime() != date.DateTime() and task.completed():
-                doShow = True
+            self.__index.update(task)
+            doShow = self.__shouldShow(task) and self.__isInShownPeriod(task)
 
             if doShow:
                 if self.taskMap.has_key(task.id()):
@@ -340,6 +398,154 @@ class Calendar(wx.Panel):
         return getattr(self._content, name)
 
 
+class TaskIntervalIndex(object):
+    ''' TaskIntervalIndex keeps tasks sorted by the start of the period they
+        occupy in the calendar so that the tasks overlapping the visible 
+        period can be found by bisecting instead of by checking all tasks.
+        Tasks without planned start or end are shown on today, so their 
+        period changes every day. These, and tasks with a long period, are 
+        kept apart and checked on each query. Like the EffortIndex, the index
+        doesn't observe the tasks itself; its owner needs to call update() 
+        when the dates of a task change. '''
+
+    longPeriod = date.TimeDelta(days=31)
+
+    def __init__(self, tasks=None):
+        self.__starts = []  # Sorted start date times
+        self.__tasks = []  # The tasks, in the same order as self.__starts
+        # {task: (start, end)}, or {task: None} for the tasks kept apart:
+        self.__periods = dict()
+        self.__otherTasks = set()  # Tasks with a long or changing period
+        if tasks:
+            self.add(*tasks)
+
+    def __len__(self):
+        return len(self.__periods)
+
+    def __contains__(self, task):
+        return task in self.__periods
+
+    def __iter__(self):
+        return iter(self.__periods)
+
+    def add(self, *tasks):
+        sortedTasks = []
+        for task in tasks:
+            if task in self.__periods:
+                continue
+            period = self.__periods[task] = self.__fixedPeriod(task)
+            if period is None:
+                self.__otherTasks.add(task)
+            else:
+                sortedTasks.append(task)
+        if len(sortedTasks) == 1:
+            task = sortedTasks[0]
+            start = self.__periods[task][0]
+            position = bisect.bisect_right(self.__starts, start)
+            self.__starts.insert(position, start)
+            self.__tasks.insert(position, task)
+        elif sortedTasks:
+            self.__rebuild(self.__tasks + sortedTasks)
+
+    def remove(self, *tasks):
+        sortedTasks = []
+        for task in tasks:
+            if task not in self.__periods:
+                continue
+            if self.__periods[task] is None:
+                self.__otherTasks.discard(task)
+                del self.__periods[task]
+            else:
+                sortedTasks.append(task)
+        if len(sortedTasks) == 1:
+            task = sortedTasks[0]
+            position = self.__position(task)
+            del self.__starts[position]
+            del self.__tasks[position]
+            del self.__periods[task]
+        elif sortedTasks:
+            for task in sortedTasks:
+                del self.__periods[task]
+            self.__rebuild([task for task in self.__tasks \
+                            if task in self.__periods])
+
+    def update(self, task):
+        ''' Add the task or move it to its new position if its period
+            changed. '''
+        if task not in self.__periods:
+            self.add(task)
+        elif self.__fixedPeriod(task) != self.__periods[task]:
+            self.remove(task)
+            self.add(task)
+
+    def reindex(self, tasks):
+        ''' Make the index contain exactly the tasks, moving the tasks whose
+            period changed since they were indexed. '''
+        tasks = set(tasks)
+        changedTasks = [task for task in tasks if task in self.__periods and \
+                        self.__fixedPeriod(task) != self.__periods[task]]
+        self.remove(*([task for task in self.__periods if task not in tasks] + \
+                      changedTasks))
+        self.add(*tasks)
+
+    def tasksBetween(self, start, end):
+        ''' Return the tasks whose period overlaps with the period from 
+            start up to and including end. '''
+        # Tasks in the sorted list that start more than longPeriod before
+        # start, also end before start:
+        low = bisect.bisect_left(self.__starts, start - self.longPeriod)
+        high = bisect.bisect_right(self.__starts, end, low)
+        periods = self.__periods
+        tasks = [task for task in self.__tasks[low:high] \
+                 if periods[task][1] >= start]
+        for task in self.__otherTasks:
+            taskStart, taskEnd = self.period(task)
+            if taskStart <= end and taskEnd >= start:
+                tasks.append(task)
+        return tasks
+
+    @staticmethod
+    def period(task):
+        ''' Return the start and end of the task as shown in the calendar, 
+            see TaskSchedule.update(). '''
+        maxDateTime = date.DateTime()
+        start = task.plannedStartDateTime()
+        end = task.completionDateTime() if task.completed() else \
+            task.dueDateTime()
+        if start == maxDateTime:
+            start = date.Now().startOfDay()
+        if end == maxDateTime:
+            end = date.Now().endOfDay()
+        return start, end
+
+    @classmethod
+    def __fixedPeriod(class_, task):
+        ''' Return the period of the task if it can be kept in the sorted 
+            list, i.e. if it doesn't depend on today and isn't long. Return
+            None otherwise. '''
+        maxDateTime = date.DateTime()
+        start = task.plannedStartDateTime()
+        end = task.completionDateTime() if task.completed() else \
+            task.dueDateTime()
+        if maxDateTime in (start, end) or \
+                not start <= end <= start + class_.longPeriod:
+            return None
+        return start, end
+
+    def __position(self, task):
+        start = self.__periods[task][0]
+        position = bisect.bisect_left(self.__starts, start)
+        while self.__tasks[position] is not task:
+            position += 1
+        return position
+
+    def __rebuild(self, tasks):
+        periods = self.__periods
+        tasks.sort(key=lambda task: periods[task][0])
+        self.__tasks = tasks
+        self.__starts = [periods[task][0] for task in tasks]
+
+
 class TaskSchedule(wxSchedule):
     def __init__(self, task, iconProvider):
         super(TaskSchedule, self).__init__()
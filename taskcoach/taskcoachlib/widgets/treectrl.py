@@ -141,6 +141,9 @@ class TreeListCtrl(itemctrl.CtrlWithItemsMixin, itemctrl.CtrlWithColumnsMixin,
                  *args, **kwargs):    
         self.__adapter = parent
         self.__selection = []
+        self.__items_by_object = dict()
+        self.__item_positions = dict()
+        self.__layout = None
         self.__user_double_clicked = False
         self.__columns_with_images = []
         self.__default_font = wx.NORMAL_FONT
@@ -183,33 +186,99 @@ class TreeListCtrl(itemctrl.CtrlWithItemsMixin, itemctrl.CtrlWithColumnsMixin,
         return [self.GetItemPyData(item) for item in self.GetSelections()]
     
     def RefreshAllItems(self, count=0): # pylint: disable=W0613
+        ''' Synchronize the tree with the adapter. As long as the visible 
+            columns stay the same, items of objects that are still present 
+            are kept and only the items of objects that were added, removed or
+            moved are touched. This preserves the selection and the scroll 
+            position. Kept items are not refreshed, use RefreshItems for 
+            objects that changed. When the columns change the tree is 
+            rebuilt. '''
         self.Freeze()
         self.StopEditing()
         self.__selection = self.curselection()
-        self.DeleteAllItems()
-        self.__columns_with_images = [index for index in range(self.GetColumnCount()) if self.__adapter.hasColumnImages(index)]
+        columns_with_images = self.__get_columns_with_images()
+        layout = (self._visibleColumns(), columns_with_images)
         root_item = self.GetRootItem()
-        if not root_item:
-            root_item = self.AddRoot('Hidden root')
-        self._addObjectRecursively(root_item)
+        if root_item and layout == self.__layout:
+            self._synchronizeChildItems(root_item)
+            self.__reset_current_item()
+        else:
+            self.DeleteAllItems()
+            self.__items_by_object = dict()
+            self.__columns_with_images = columns_with_images
+            root_item = self.GetRootItem()
+            if not root_item:
+                root_item = self.AddRoot('Hidden root')
+            self._addObjectRecursively(root_item)
+            selections = self.GetSelections()
+            if selections:
+                self.GetMainWindow()._current = self.GetMainWindow()._key_current = selections[0]
+                self.ScrollTo(selections[0])
+            self.__layout = layout
+        self.Thaw()
+
+    def RefreshItemsAddedAndRemoved(self, added_objects, removed_objects):
+        ''' Delete the items of the removed objects and insert items for the
+            added objects, without touching the items of the other objects.
+            Objects added below a collapsed item only make that item 
+            expandable; their items are added when the item is expanded. '''
+        layout = (self._visibleColumns(), self.__get_columns_with_images())
+        if not self.GetRootItem() or layout != self.__layout:
+            self.RefreshAllItems()
+            return
+        self.Freeze()
+        self.StopEditing()
+        self.__selection = self.curselection()
+        parent_objects = set()
+        for domain_object in removed_objects:
+            parent_objects.add(self.__adapter.getItemParent(domain_object))
+            item = self.__items_by_object.get(domain_object)
+            if item is not None:
+                parent_objects.add(self.__get_item_object(self.GetItemParent(item)))
+                self.__delete_item(item)
+        added_objects_by_parent = dict()
+        for domain_object in added_objects:
+            parent_object = self.__adapter.getItemParent(domain_object)
+            added_objects_by_parent.setdefault(parent_object, set()).add(domain_object)
+            parent_objects.add(parent_object)
+        for parent_object in parent_objects:
+            parent_item = self.GetRootItem() if parent_object is None else \
+                self.__items_by_object.get(parent_object)
+            if parent_item is not None:
+                self._insertChildItems(parent_item, parent_object, 
+                    added_objects_by_parent.get(parent_object, set()))
+        self.__reset_current_item()
+        self.Thaw()
+        
+    def __get_columns_with_images(self):
+        return [index for index in range(self.GetColumnCount()) \
+                if self.__adapter.hasColumnImages(index)]
+
+    def __get_item_object(self, item):
+        return None if item == self.GetRootItem() else self.GetItemPyData(item)
+
+    def __reset_current_item(self):
+        main_window = self.GetMainWindow()
         selections = self.GetSelections()
         if selections:
-            self.GetMainWindow()._current = self.GetMainWindow()._key_current = selections[0]
-            self.ScrollTo(selections[0])
-        self.Thaw()
+            main_window._current = main_window._key_current = selections[0]
+        else:
+            for attribute in ('_current', '_key_current'):
+                if not self.__is_item_in_tree(getattr(main_window, attribute)):
+                    setattr(main_window, attribute, None)
+
+    def __is_item_in_tree(self, item):
+        return item is not None and \
+            self.__items_by_object.get(self.GetItemPyData(item)) is item
             
     def RefreshItems(self, *objects):
         self.__selection = self.curselection()
-        self._refreshTargetObjects(self.GetRootItem(), *objects)
-            
-    def _refreshTargetObjects(self, parent_item, *target_objects):
-        child_item, cookie = self.GetFirstChild(parent_item)
-        while child_item:
-            item_object = self.GetItemPyData(child_item) 
-            if item_object in target_objects:
-                self._refreshObjectCompletely(child_item, item_object)
-            self._refreshTargetObjects(child_item, *target_objects)
-            child_item, cookie = self.GetNextChild(parent_item, cookie)
+        for domain_object in objects:
+            # Objects that are not in the tree, e.g. because they are filtered
+            # or their parent is collapsed, don't need to be refreshed
+            item = self.__items_by_object.get(domain_object)
+            if item is not None:
+                self._refreshObjectCompletely(item, domain_object)
             
     def _refreshObjectCompletely(self, item, *args):
         self.__refresh_aspects(('ItemType', 'Columns', 'Font', 'Colors',
@@ -218,20 +287,107 @@ class TreeListCtrl(itemctrl.CtrlWithItemsMixin, itemctrl.CtrlWithColumnsMixin,
         
     def _addObjectRecursively(self, parent_item, parent_object=None):
         for child_object in self.__adapter.children(parent_object):
+            self._addObject(parent_item, child_object)
+            
+    def _addObject(self, parent_item, child_object, index=None):
+        if index is None:
             child_item = self.AppendItem(parent_item, '', 
                                          self.getItemCTType(child_object), 
                                          data=child_object)
-            self._refreshObjectMinimally(child_item, child_object)
-            expanded = self.__adapter.getItemExpanded(child_object)
-            if expanded:
-                self._addObjectRecursively(child_item, child_object)
-                # Call Expand on the item instead of on the tree
-                # (self.Expand(childItem)) to prevent lots of events
-                # (EVT_TREE_ITEM_EXPANDING/EXPANDED) being sent
-                child_item.Expand()
+        else:
+            child_item = self.InsertItem(parent_item, index, '', 
+                                         self.getItemCTType(child_object), 
+                                         data=child_object)
+        self.__items_by_object[child_object] = child_item
+        self._refreshObjectMinimally(child_item, child_object)
+        expanded = self.__adapter.getItemExpanded(child_object)
+        if expanded:
+            self._addObjectRecursively(child_item, child_object)
+            # Call Expand on the item instead of on the tree
+            # (self.Expand(childItem)) to prevent lots of events
+            # (EVT_TREE_ITEM_EXPANDING/EXPANDED) being sent
+            child_item.Expand()
+        else:
+            self.SetItemHasChildren(child_item,
+                                    self.__adapter.children(child_object))
+
+    def _insertChildItems(self, parent_item, parent_object, added_objects):
+        ''' Insert items for the added child objects at their position 
+            amongst the existing child items. '''
+        child_objects = self.__adapter.children(parent_object)
+        if parent_item != self.GetRootItem() and not parent_item.IsExpanded() \
+                and not self.GetChildrenCount(parent_item, recursively=False):
+            self.SetItemHasChildren(parent_item, child_objects)
+            return
+        existing_objects = set(self.GetItemPyData(child_item) for child_item \
+                               in self.GetItemChildren(parent_item))
+        index = 0
+        for child_object in child_objects:
+            if child_object in existing_objects:
+                index += 1
+            elif child_object in added_objects:
+                self._addObject(parent_item, child_object, index)
+                index += 1
+        if parent_item != self.GetRootItem():
+            self.SetItemHasChildren(parent_item, child_objects)
+
+    def _synchronizeChildItems(self, parent_item, parent_object=None):
+        child_objects = self.__adapter.children(parent_object)
+        positions = dict((child_object, index) for index, child_object \
+                         in enumerate(child_objects))
+        child_items = dict()
+        for child_item in self.GetItemChildren(parent_item):
+            child_object = self.GetItemPyData(child_item)
+            if child_object in positions:
+                child_items[child_object] = child_item
             else:
-                self.SetItemHasChildren(child_item,
-                                        self.__adapter.children(child_object))
+                self.__delete_item(child_item)
+        for child_object in child_objects:
+            child_item = child_items.get(child_object)
+            if child_item is None:
+                self._addObject(parent_item, child_object)
+            else:
+                # Items of changed objects are refreshed by RefreshItems, 
+                # so existing items only need their child items synchronized:
+                self.__items_by_object[child_object] = child_item
+                self._synchronizeExpansion(child_item, child_object)
+        if [self.GetItemPyData(child_item) for child_item in \
+            self.GetItemChildren(parent_item)] != child_objects:
+            self.__item_positions = positions
+            self.SortChildren(parent_item)
+            
+    def _synchronizeExpansion(self, item, domain_object):
+        if self.__adapter.getItemExpanded(domain_object):
+            if self.GetChildrenCount(item, recursively=False):
+                self._synchronizeChildItems(item, domain_object)
+            else:
+                self._addObjectRecursively(item, domain_object)
+            if not item.IsExpanded():
+                item.Expand()
+        else:
+            # Keep the child items of collapsed items, they are synchronized
+            # when the item is expanded again, see onItemExpanding
+            if item.IsExpanded():
+                item.Collapse()
+            child_objects = self.__adapter.children(domain_object)
+            if not child_objects:
+                for child_item in self.GetItemChildren(item):
+                    self.__delete_item(child_item)
+            self.SetItemHasChildren(item, child_objects)
+                
+    def __delete_item(self, item):
+        for each_item in [item] + self.GetItemChildren(item, recursively=True):
+            domain_object = self.GetItemPyData(each_item)
+            # The object may have moved to another parent item already:
+            if self.__items_by_object.get(domain_object) is each_item:
+                del self.__items_by_object[domain_object]
+        self.Delete(item)
+        
+    def OnCompareItems(self, item1, item2):
+        ''' Keep the order of the child items the same as the order of the 
+            child objects, see _synchronizeChildItems. '''
+        return cmp(self.__item_positions[self.GetItemPyData(item1)],
+                   self.__item_positions[self.GetItemPyData(item2)])
 
     def _refreshObjectMinimally(self, *args, **kwargs):
         self.__refresh_aspects(('Columns', 'Colors', 'Font', 'Selection'), 
@@ -314,8 +470,13 @@ class TreeListCtrl(itemctrl.CtrlWithItemsMixin, itemctrl.CtrlWithColumnsMixin,
     def onItemExpanding(self, event):
         event.Skip()
         item = event.GetItem()
-        if self.GetChildrenCount(item, recursively=False) == 0:
-            domain_object = self.GetItemPyData(item)
+        domain_object = self.GetItemPyData(item)
+        if self.GetChildrenCount(item, recursively=False):
+            self.Freeze()
+            self.__selection = self.curselection()
+            self._synchronizeChildItems(item, domain_object)
+            self.Thaw()
+        else:
             self._addObjectRecursively(item, domain_object)
                 
     def onDoubleClick(self, event):
@@ -82,6 +82,8 @@ class TestCase(unittest.TestCase, object):
         from taskcoachlib.domain import date
         date.Scheduler().shutdown()
         date.Scheduler.deleteInstance()
+        from taskcoachlib.domain import task
+        task.StatusScheduler.deleteInstance()
         if hasattr(self, 'events'):
             del self.events
         from taskcoachlib.thirdparty.pubsub import pub
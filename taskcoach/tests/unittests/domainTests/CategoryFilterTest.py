@@ -371,7 +371,45 @@ class OneCategoryAndParentAndChildTaskFixture(Fixture):
         self.link(self.category, self.childTask)
         self.category.setFiltered()
         self.assertEqual(2 if self.treeMode else 1, len(self.filter))
-        
+
+    def testThatFilterContainsNewGrandChildWhenParentIsCategorizedAndFiltered(self):
+        self.link(self.category, self.parentTask)
+        self.category.setFiltered()
+        grandChild = task.Task('grandchild')
+        self.childTask.addChild(grandChild)
+        grandChild.setParent(self.childTask)
+        self.tasks.append(grandChild)
+        self.failUnless(grandChild in self.filter)
+
+    def testThatFilterDoesNotContainChildMovedAwayFromCategorizedParent(self):
+        self.link(self.category, self.parentTask)
+        self.category.setFiltered()
+        self.tasks.remove(self.childTask)
+        self.parentTask.removeChild(self.childTask)
+        self.childTask.setParent(None)
+        self.tasks.append(self.childTask)
+        self.assertEqual([self.parentTask], list(self.filter))
+
+    def testThatFilterIsEmptyAfterParentIsRemovedFromFilteredCategory(self):
+        self.link(self.category, self.parentTask)
+        self.category.setFiltered()
+        self.category.removeCategorizable(self.parentTask)
+        self.parentTask.removeCategory(self.category)
+        self.assertFilterHidesEverything()
+
+    def testThatFilterContainsChildAfterChildIsRemovedFromCategorizedParentsCategory(self):
+        self.link(self.category, self.parentTask)
+        self.link(self.category, self.childTask)
+        self.category.setFiltered()
+        self.category.removeCategorizable(self.childTask)
+        self.childTask.removeCategory(self.category)
+        self.assertFilterHidesNothing()
+
+    def testThatFilterContainsChildAfterChildIsAddedToFilteredCategory(self):
+        self.category.setFiltered()
+        self.link(self.category, self.childTask)
+        self.assertChildTaskIsFiltered()
+
 
 class OneCategoryAndParentAndChildTaskInListModeTest(OneCategoryAndParentAndChildTaskFixture, test.TestCase):
     treeMode = False   
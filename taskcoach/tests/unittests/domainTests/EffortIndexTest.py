@@ -0,0 +1,86 @@
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+from taskcoachlib import config
+from taskcoachlib.domain import task, effort, date
+import test
+
+
+class EffortIndexTest(test.TestCase):
+    def setUp(self):
+        task.Task.settings = config.Settings(load=False)
+        self.task = task.Task(subject='task')
+        self.effort1 = effort.Effort(self.task, 
+            date.DateTime(2004, 1, 1, 11, 0, 0), 
+            date.DateTime(2004, 1, 1, 12, 0, 0))
+        self.effort2 = effort.Effort(self.task, 
+            date.DateTime(2004, 1, 2, 11, 0, 0), 
+            date.DateTime(2004, 1, 2, 12, 0, 0))
+        self.effort3 = effort.Effort(self.task, 
+            date.DateTime(2004, 1, 3, 11, 0, 0), 
+            date.DateTime(2004, 1, 3, 12, 0, 0))
+        self.index = effort.EffortIndex([self.effort3, self.effort1])
+        
+    def effortsOn(self, day):
+        return self.index.effortsStartingBetween(\
+            date.DateTime(2004, 1, day, 0, 0, 0), 
+            date.DateTime(2004, 1, day, 23, 59, 59))
+        
+    def testInitialContents(self):
+        self.assertEqual(2, len(self.index))
+        self.failUnless(self.effort1 in self.index)
+        self.failIf(self.effort2 in self.index)
+        
+    def testEffortsStartingBetween(self):
+        self.assertEqual([self.effort1], self.effortsOn(1))
+        self.assertEqual([], self.effortsOn(2))
+        
+    def testEffortsStartingBetweenIncludesStop(self):
+        self.assertEqual([self.effort1, self.effort3], 
+            self.index.effortsStartingBetween(self.effort1.getStart(), 
+                                              self.effort3.getStart()))
+        
+    def testAddEffort(self):
+        self.index.add(self.effort2)
+        self.assertEqual([self.effort1, self.effort2, self.effort3],
+            self.index.effortsStartingBetween(self.effort1.getStart(), 
+                                              self.effort3.getStart()))
+        
+    def testAddEffortTwice(self):
+        self.index.add(self.effort1)
+        self.assertEqual(2, len(self.index))
+        
+    def testRemoveEffort(self):
+        self.index.remove(self.effort1)
+        self.assertEqual([], self.effortsOn(1))
+        
+    def testRemoveMultipleEfforts(self):
+        self.index.remove(self.effort1, self.effort2, self.effort3)
+        self.assertEqual(0, len(self.index))
+        
+    def testRemoveEffortWithSameStart(self):
+        sameStart = effort.Effort(self.task, self.effort1.getStart())
+        self.index.add(sameStart)
+        self.index.remove(self.effort1)
+        self.assertEqual([sameStart], self.effortsOn(1))
+        
+    def testUpdateStart(self):
+        self.effort1.setStart(date.DateTime(2004, 1, 2, 10, 0, 0))
+        self.index.updateStart(self.effort1)
+        self.assertEqual([], self.effortsOn(1))
+        self.assertEqual([self.effort1], self.effortsOn(2))
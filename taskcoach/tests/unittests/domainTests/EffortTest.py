@@ -53,6 +53,9 @@ class EffortTest(test.TestCase, asserts.Mixin):
     def testDuration(self):
         self.assertEqual(date.TimeDelta(days=1), self.effort.duration())
         
+    def testEffortHasNoInstanceDictionary(self):
+        self.failIf(hasattr(self.effort, '__dict__'))
+        
     def testForegroundColor(self):
         self.task.setForegroundColor(wx.RED)
         self.assertEqual(wx.RED, self.effort.foregroundColor())
@@ -97,6 +97,77 @@ class StackedFilterTest(test.TestCase):
         self.failUnless(filterRef() is None)
 
 
+class CountingFilter(base.Filter):
+    def __init__(self, *args, **kwargs):
+        self.filteredItems = []
+        super(CountingFilter, self).__init__(*args, **kwargs)
+        
+    def filterItems(self, items):
+        items = list(items)
+        self.filteredItems.extend(items)
+        return [item for item in items if 'X' in item.subject()]
+
+
+class IncrementalFilterTest(test.TestCase):
+    def setUp(self):
+        task.Task.settings = config.Settings(load=False)
+        self.parent = task.Task(subject='parent')
+        self.child = task.Task(subject='child X')
+        self.parent.addChild(self.child)
+        self.other = task.Task(subject='other')
+        self.list = task.TaskList([self.parent, self.child, self.other])
+        self.filter = CountingFilter(self.list, treeMode=True)
+        self.filter.filteredItems = []
+        
+    def testInitialContents(self):
+        self.assertEqual(set([self.parent, self.child]), set(self.filter))
+        
+    def testAddItemOnlyFiltersAddedItemAndAncestors(self):
+        grandchild = task.Task(subject='grandchild')
+        self.child.addChild(grandchild)
+        self.list.append(grandchild)
+        self.assertEqual(set([self.parent, self.child, grandchild]), 
+                         set(self.filter.filteredItems))
+        
+    def testAddMatchingItemAddsAncestorsInTreeMode(self):
+        newChild = task.Task(subject='new child X')
+        self.other.addChild(newChild)
+        self.list.append(newChild)
+        self.assertEqual(set([self.parent, self.child, self.other, newChild]),
+                         set(self.filter))
+
+    def testRemoveLastMatchingChildRemovesAncestorInTreeMode(self):
+        self.list.remove(self.child)
+        self.failIf(self.filter)
+        
+    def testRemoveLastMatchingChildRemovesAncestorFromStackedFilter(self):
+        stackedFilter = CountingFilter(DummyFilter(self.list, treeMode=True), 
+                                       treeMode=True)
+        self.list.remove(self.child)
+        self.failIf(stackedFilter)
+
+    def testRemoveMatchingChildKeepsAncestorWithOtherMatchingChild(self):
+        otherChild = task.Task(subject='other child X')
+        self.parent.addChild(otherChild)
+        self.list.append(otherChild)
+        self.list.remove(self.child)
+        self.assertEqual(set([self.parent, otherChild]), set(self.filter))
+        
+    def testRemoveItemDoesNotFilterOtherItems(self):
+        self.list.remove(self.other)
+        self.failIf(self.other in self.filter.filteredItems)
+        self.failIf(self.child in self.filter.filteredItems)
+
+    def testAddItemInListMode(self):
+        self.filter.setTreeMode(False)
+        self.filter.filteredItems = []
+        newChild = task.Task(subject='new child X')
+        self.other.addChild(newChild)
+        self.list.append(newChild)
+        self.assertEqual([newChild], self.filter.filteredItems)
+        self.assertEqual(set([self.child, newChild]), set(self.filter))
+
+
 class SearchFilterTest(test.TestCase):
     def setUp(self):
         task.Task.settings = config.Settings(load=False)
@@ -166,6 +237,12 @@ class SearchFilterTest(test.TestCase):
         self.setSearchString('DEF')
         self.list.remove(self.child)
         self.failIf(self.filter)
+
+    def testRemoveOnlyMatchingChildRemovesParentInTreeMode(self):
+        self.filter.setTreeMode(True)
+        self.setSearchString('DEF')
+        self.list.remove(self.child)
+        self.failIf(self.filter)
         
     def testIncludeSubItems(self):
         self.setSearchString('ABC', includeSubItems=True)
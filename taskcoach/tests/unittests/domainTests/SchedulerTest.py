@@ -74,3 +74,47 @@ class SchedulerTest(test.TestCase):
             self.assertEqual(self.callCount, 2)
         finally:
             self.scheduler.unschedule(self.callback)
+
+
+class Callee(object):
+    def callback(self):
+        pass
+
+
+class SchedulerIndexTest(test.TestCase):
+    def setUp(self):
+        super(SchedulerIndexTest, self).setUp()
+        self.scheduler = date.Scheduler()
+        self.callees = [Callee() for _ in range(3)]
+        self.futureDate = date.Now() + date.TimeDelta(hours=1)
+
+    def tearDown(self):
+        for callee in self.callees:
+            self.scheduler.unschedule(callee.callback)
+        super(SchedulerIndexTest, self).tearDown()
+
+    def testIsScheduledOnlyForScheduledObject(self):
+        self.scheduler.schedule(self.callees[0].callback, self.futureDate)
+        self.failUnless(self.scheduler.is_scheduled(self.callees[0].callback))
+        self.failIf(self.scheduler.is_scheduled(self.callees[1].callback))
+
+    def testUnscheduleOnlyUnschedulesJobOfThatObject(self):
+        for callee in self.callees:
+            self.scheduler.schedule(callee.callback, self.futureDate)
+        self.scheduler.unschedule(self.callees[1].callback)
+        self.assertEqual([True, False, True], 
+                         [self.scheduler.is_scheduled(callee.callback) \
+                          for callee in self.callees])
+
+    def testJobsAreOrderedByDateTime(self):
+        jobs = [self.scheduler.schedule(callee.callback, 
+                    self.futureDate - date.TimeDelta(minutes=index)) \
+                for index, callee in enumerate(self.callees)]
+        jobs.reverse()
+        self.assertEqual(jobs, [job for job in self.scheduler.get_jobs() if job in jobs])
+
+    def testUnscheduleJobWithId(self):
+        job = self.scheduler.schedule(self.callees[0].callback, self.futureDate)
+        job.setId(1)
+        self.scheduler.unschedule(job)
+        self.failIf(job in self.scheduler.get_jobs())
@@ -67,6 +67,24 @@ class TaskSorterTest(test.TestCase):
         self.a.setSubject('z')
         self.assertEqual([self.b, self.c, self.d, self.a], list(self.sorter))
 
+    def testChangeToEqualSortKeyKeepsRelativeOrder(self):
+        self.d.setSubject('b')
+        self.assertEqual([self.a, self.b, self.d, self.c], list(self.sorter))
+
+    def testSortByTwoKeysInDifferentOrder(self):
+        self.a.setPriority(1)
+        self.c.setPriority(1)
+        self.sorter.sortBy('priority')
+        self.sorter.sortAscending(False)
+        self.assertEqual([self.a, self.c, self.b, self.d], list(self.sorter))
+
+    def testChangeWhenSortingByTwoKeysInDifferentOrder(self):
+        self.sorter.sortBy('priority')
+        self.sorter.sortAscending(False)
+        self.d.setPriority(1)
+        self.b.setPriority(1)
+        self.assertEqual([self.b, self.d, self.a, self.c], list(self.sorter))
+
 
 class TaskSorterSettingsTest(test.TestCase):        
     def setUp(self):
@@ -196,6 +214,22 @@ class TaskSorterSettingsTest(test.TestCase):
         self.sorter.sortAscending(False)
         self.assertEqual([self.task1, self.task2], list(self.sorter))
 
+    def testSortByTimeLeftAfterTimeHasPassed(self):
+        self.sorter.sortByTaskStatusFirst(False)
+        self.sorter.sortAscending(True)
+        self.sorter.sortBy('timeLeft')
+        now = date.Now()
+        oldNow = date.Now
+        try:
+            date.Now = lambda: now
+            self.task1.setDueDateTime(now + date.TimeDelta(hours=2))
+            self.task2.setDueDateTime(now + date.TimeDelta(hours=3))
+            date.Now = lambda: now + date.ONE_HOUR
+            self.task2.setDueDateTime(now + date.TimeDelta(hours=2, minutes=30))
+            self.assertEqual([self.task1, self.task2], list(self.sorter))
+        finally:
+            date.Now = oldNow
+
     def testSortByBudgetAscending(self):
         self.sorter.sortAscending(True)
         self.sorter.sortBy('budget')
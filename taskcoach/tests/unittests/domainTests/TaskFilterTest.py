@@ -63,6 +63,11 @@ class ViewFilterTestsMixin(object):
         self.filter.append(self.task)
         self.filter.hideTaskStatus(task.status.completed)
         self.assertEqual(0, self.filter.nrOfTasksPerStatus()[task.status.completed])
+
+    def testNrOfTasksPerStatusAfterStatusChange(self):
+        self.filter.append(self.task)
+        self.task.setCompletionDateTime()
+        self.assertEqual(1, self.filter.nrOfTasksPerStatus()[task.status.completed])
                 
     def testFilterCompletedTask_RootTasks(self):
         self.task.setCompletionDateTime()
@@ -111,7 +116,7 @@ class ViewFilterTestsMixin(object):
         oldNow = date.Now
         now = plannedStart + date.ONE_SECOND
         date.Now = lambda: now
-        self.task.onTimeToStart()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertFilterShows(self.task)
         date.Now = oldNow
 
@@ -56,6 +56,35 @@ class TaskListTest(test.TestCase):
         self.assertEqual(0, self.nrStatus(task.status.duesoon))
         self.taskList.append(task.Task(dueDateTime=date.Now() + date.ONE_HOUR))
         self.assertEqual(1, self.nrStatus(task.status.duesoon))
+
+    def testNrCompletedAfterReopening(self):
+        self.taskList.append(self.task1)
+        self.task1.setCompletionDateTime()
+        self.task1.setCompletionDateTime(date.DateTime())
+        self.assertEqual(0, self.nrStatus(task.status.completed))
+
+    def testNrOverdueAfterRemovingTask(self):
+        self.taskList.append(self.task1)
+        self.task1.setDueDateTime(date.DateTime(1990, 1, 1))
+        self.taskList.remove(self.task1)
+        self.assertEqual(0, self.nrStatus(task.status.overdue))
+
+    def testNrOfTasksPerStatusIgnoresDeletedTasks(self):
+        self.taskList.extend([self.task1, self.task2])
+        self.task1.markDeleted()
+        self.assertEqual(1, sum(self.taskList.nrOfTasksPerStatus().values()))
+
+    def testNrOfTasksPerStatusCountsUndeletedTasks(self):
+        self.taskList.extend([self.task1, self.task2])
+        self.task1.markDeleted()
+        self.task1.cleanDirty()
+        self.assertEqual(2, sum(self.taskList.nrOfTasksPerStatus().values()))
+
+    def testNrOfTasksPerStatusIncludesChildren(self):
+        self.task1.addChild(self.task3)
+        self.task3.setParent(self.task1)
+        self.taskList.append(self.task1)
+        self.assertEqual(2, sum(self.taskList.nrOfTasksPerStatus().values()))
         
     def testNrBeingTracked(self):
         self.assertEqual(0, self.taskList.nrBeingTracked())
@@ -63,6 +92,34 @@ class TaskListTest(test.TestCase):
         activeTask.addEffort(effort.Effort(activeTask))
         self.taskList.append(activeTask)
         self.assertEqual(1, self.taskList.nrBeingTracked())
+
+    def testNrBeingTrackedAfterStartTracking(self):
+        self.taskList.append(self.task1)
+        self.task1.addEffort(effort.Effort(self.task1))
+        self.assertEqual([self.task1], self.taskList.tasksBeingTracked())
+
+    def testNrBeingTrackedAfterStopTracking(self):
+        self.taskList.append(self.task1)
+        self.task1.addEffort(effort.Effort(self.task1))
+        self.task1.stopTracking()
+        self.assertEqual(0, self.taskList.nrBeingTracked())
+
+    def testNrBeingTrackedAfterRemovingTrackedTask(self):
+        self.task1.addEffort(effort.Effort(self.task1))
+        self.taskList.append(self.task1)
+        self.taskList.remove(self.task1)
+        self.assertEqual(0, self.taskList.nrBeingTracked())
+
+    def testParentOfTrackedChildIsNotBeingTracked(self):
+        self.task1.addChild(self.task2)
+        self.task2.setParent(self.task1)
+        self.task2.addEffort(effort.Effort(self.task2))
+        self.taskList.append(self.task1)
+        self.assertEqual([self.task2], self.taskList.tasksBeingTracked())
+
+    def testTrackingTaskNotInListIsIgnored(self):
+        self.task1.addEffort(effort.Effort(self.task1))
+        self.assertEqual(0, self.taskList.nrBeingTracked())
         
     def testOriginalLength(self):
         self.assertEqual(0, self.taskList.originalLength())
@@ -218,6 +218,48 @@ class DefaultTaskStateTest(TaskTestCase, CommonTaskTestsMixin,
     def testDefaultColor(self):
         self.assertEqual(None, self.task.foregroundColor())
 
+    def testChangingStatusColorDoesNotChangePalette(self):
+        color = task.Task.fgColorForStatus(self.task.status())
+        expectedColor = wx.Colour(color.Red(), color.Green(), color.Blue())
+        color.Set(1, 2, 3)
+        self.assertEqual(expectedColor, 
+                         task.Task.fgColorForStatus(self.task.status()))
+
+    def testChangingStatusFontDoesNotChangePalette(self):
+        self.settings.settext('font', '%stasks' % self.task.status(), 
+                              wx.SWISS_FONT.GetNativeFontInfoDesc())
+        font = task.Task.fontForStatus(self.task.status())
+        pointSize = font.GetPointSize()
+        font.SetPointSize(pointSize + 5)
+        self.assertEqual(pointSize, 
+            task.Task.fontForStatus(self.task.status()).GetPointSize())
+
+    def testChangingStatusColorSettingChangesColor(self):
+        self.settings.settuple('fgcolor', '%stasks' % self.task.status(), 
+                               (1, 2, 3))
+        self.assertEqual(wx.Colour(1, 2, 3), 
+                         self.task.foregroundColor(recursive=True))
+
+    def testChangingStatusFontSettingChangesFont(self):
+        nativeInfoString = wx.SWISS_FONT.GetNativeFontInfoDesc()
+        self.settings.settext('font', '%stasks' % self.task.status(), 
+                              nativeInfoString)
+        self.assertEqual(wx.FontFromNativeInfoString(nativeInfoString), 
+                         self.task.font(recursive=True))
+
+    def testChangingStatusIconSettingChangesIcon(self):
+        self.settings.settext('icon', '%stasks' % self.task.status(), 
+                              'cross_red_icon')
+        self.assertEqual('cross_red_icon', self.task.icon(recursive=True))
+
+    def testNewSettingsReplaceStatusColors(self):
+        task.Task.fgColorForStatus(self.task.status())
+        task.Task.settings = config.Settings(load=False)
+        task.Task.settings.set('fgcolor', '%stasks' % self.task.status(), 
+                               '(1, 2, 3)')
+        self.assertEqual(wx.Colour(1, 2, 3), 
+                         task.Task.fgColorForStatus(self.task.status()))
+
     def testDefaultOwnIcon(self):
         self.assertEqual('', self.task.icon(recursive=False))
 
@@ -280,7 +322,7 @@ class DefaultTaskStateTest(TaskTestCase, CommonTaskTestsMixin,
         now = self.tomorrow + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onTimeToStart()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEqual(task.late.getBitmap(self.settings), self.task.icon(recursive=True))
         date.Now = oldNow
         
@@ -341,7 +383,7 @@ class DefaultTaskStateTest(TaskTestCase, CommonTaskTestsMixin,
         now = self.tomorrow + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onOverDue()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEqual(task.overdue.getBitmap(self.settings), self.task.icon(recursive=True))
         date.Now = oldNow
         
@@ -351,7 +393,7 @@ class DefaultTaskStateTest(TaskTestCase, CommonTaskTestsMixin,
         now = self.tomorrow + date.ONE_SECOND - date.ONE_HOUR
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onDueSoon()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEqual(task.duesoon.getBitmap(self.settings), self.task.icon(recursive=True))
         date.Now = oldNow
 
@@ -361,7 +403,7 @@ class DefaultTaskStateTest(TaskTestCase, CommonTaskTestsMixin,
         now = self.tomorrow + date.ONE_SECOND - date.ONE_HOUR
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onDueSoon()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEqual(task.duesoon.getBitmap(self.settings), self.task.icon(recursive=True))
         date.Now = oldNow
 
@@ -1058,7 +1100,7 @@ class TaskDueTodayTest(TaskTestCase, CommonTaskTestsMixin):
         now = self.task.dueDateTime() + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onOverDue()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEqual(task.overdue.getBitmap(self.settings), self.task.icon(recursive=True))
         date.Now = oldNow
         
@@ -1067,7 +1109,7 @@ class TaskDueTodayTest(TaskTestCase, CommonTaskTestsMixin):
         now = self.task.dueDateTime() + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onOverDue()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEvent(self.task.appearanceChangedEventType(), self.task)
         date.Now = oldNow
 
@@ -1109,6 +1151,11 @@ class TaskDueTomorrowTest(TaskTestCase, CommonTaskTestsMixin):
         self.settings.setint('behavior', 'duesoonhours', 48)
         self.assertEvent(self.task.appearanceChangedEventType(), self.task)
 
+    def testChangingDueSoonHoursChangesAllTasks(self):
+        otherTask = task.Task(dueDateTime=self.task.dueDateTime())
+        self.settings.setint('behavior', 'duesoonhours', 48)
+        self.failUnless(self.task.dueSoon() and otherTask.dueSoon())
+
 
 class OverdueTaskTest(TaskTestCase, CommonTaskTestsMixin):
     def taskCreationKeywordArguments(self):
@@ -1305,7 +1352,7 @@ class TaskWithPlannedStartDateInTheFutureTest(TaskTestCase, CommonTaskTestsMixin
         now = self.task.plannedStartDateTime() + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onTimeToStart()
+        task.StatusScheduler().onStatusChangeDue()
         self.assertEvent(self.task.appearanceChangedEventType(), self.task)
         date.Now = oldNow
 
@@ -2457,6 +2504,37 @@ class TaskWithGrandChildAndEffortTest(TaskTestCase, CommonTaskTestsMixin):
                           self.task1_1_1effort1],
             self.task1.efforts(recursive=True))
 
+    def testEffortsRecursiveAfterRemovingGrandChildEffort(self):
+        self.task1.efforts(recursive=True)
+        self.task1_1_1.removeEffort(self.task1_1_1effort1)
+        self.assertEqual([self.task1effort1, self.task1_1effort1],
+            self.task1.efforts(recursive=True))
+
+    def testTimeSpentRecursivelyAfterAddingGrandChildEffort(self):
+        self.task1.timeSpent(recursive=True)
+        self.addEffort(date.TimeDelta(hours=1), self.task1_1_1)
+        self.assertEqual(date.TimeDelta(hours=73), 
+                         self.task1.timeSpent(recursive=True))
+
+    def testTimeSpentRecursivelyAfterChangingGrandChildEffort(self):
+        self.task1.timeSpent(recursive=True)
+        self.task1_1_1effort1.setStop(date.DateTime(2005, 3, 3))
+        self.assertEqual(date.TimeDelta(hours=96), 
+                         self.task1.timeSpent(recursive=True))
+
+    def testTimeSpentRecursivelyIncludesTrackedGrandChildEffort(self):
+        self.task1.timeSpent(recursive=True)
+        self.task1_1_1effort1.setStop(date.DateTime.max)
+        self.failUnless(self.task1.timeSpent(recursive=True) > \
+                        date.TimeDelta(hours=48))
+        self.failUnless(self.task1.isBeingTracked(recursive=True))
+
+    def testTimeSpentRecursivelyAfterRemovingChild(self):
+        self.task1.timeSpent(recursive=True)
+        self.task1.removeChild(self.task1_1)
+        self.assertEqual(date.TimeDelta(hours=24), 
+                         self.task1.timeSpent(recursive=True))
+
     
 class TaskWithBudgetTest(TaskTestCase, CommonTaskTestsMixin):
     def taskCreationKeywordArguments(self):
@@ -2772,6 +2850,16 @@ class RecursivePriorityFixture(TaskTestCase, CommonTaskTestsMixin):
     def testPriority_RecursiveWhenChildHasHighestPriorityAndIsCompleted(self):
         self.task1_1.setCompletionDateTime()
         self.assertEqual(1, self.task1.priority(recursive=True))
+
+    def testPriority_RecursiveWhenChildPriorityChangesAfterBeingComputed(self):
+        self.task1.priority(recursive=True)
+        self.task1_1.setPriority(3)
+        self.assertEqual(3, self.task1.priority(recursive=True))
+
+    def testPriority_RecursiveWhenGrandChildIsAdded(self):
+        self.task1.priority(recursive=True)
+        self.task1_1.addChild(task.Task(priority=5))
+        self.assertEqual(5, self.task1.priority(recursive=True))
         
     def testPriorityNotificationWhenMarkingChildCompleted(self):
         events = []
@@ -3179,14 +3267,69 @@ class TaskScheduledTest(TaskTestCase):
         return [{'dueDateTime': date.Now() + date.TWO_HOURS,
                  'plannedStartDateTime': date.Now() + date.ONE_HOUR}]
 
-    def testOverDueIsScheduled(self):
-        self.failUnless(date.Scheduler().is_scheduled(self.task.onOverDue))
+    def scheduledDateTime(self, aTask=None):
+        return task.StatusScheduler().scheduledDateTime(aTask or self.task)
 
     def testStartedIsScheduled(self):
-        self.failUnless(date.Scheduler().is_scheduled(self.task.onTimeToStart))
+        plannedStartDateTime = date.Now() + date.TimeDelta(minutes=30)
+        self.task.setPlannedStartDateTime(plannedStartDateTime)
+        self.assertEqual(plannedStartDateTime + date.ONE_SECOND,
+                         self.scheduledDateTime())
+
+    def testDueSoonIsScheduledAfterStarted(self):
+        self.task.setPlannedStartDateTime(date.Now() + date.TimeDelta(hours=3))
+        self.assertEqual(self.task.dueDateTime() - date.ONE_HOUR + \
+                         date.ONE_SECOND, self.scheduledDateTime())
+
+    def testOverDueIsScheduledAfterDueSoon(self):
+        self.task.setPlannedStartDateTime(date.DateTime())
+        self.settings.setint('behavior', 'duesoonhours', 0)
+        self.assertEqual(self.task.dueDateTime() + date.ONE_SECOND,
+                         self.scheduledDateTime())
+
+    def testSchedulerJobIsScheduledForFirstStatusChange(self):
+        scheduler = task.StatusScheduler()
+        self.failUnless(date.Scheduler().is_scheduled(scheduler.onStatusChangeDue))
+
+    def testCompletedTaskIsNotScheduled(self):
+        self.task.setCompletionDateTime()
+        self.failIf(task.StatusScheduler().isScheduled(self.task))
+
+    def testReopenedTaskIsScheduledAgain(self):
+        self.task.setCompletionDateTime()
+        self.task.setCompletionDateTime(date.DateTime())
+        self.failUnless(task.StatusScheduler().isScheduled(self.task))
 
-    def testDueSoonIsScheduled(self):
-        self.failUnless(date.Scheduler().is_scheduled(self.task.onDueSoon))
+    def testStatusIsRecomputedWhenDue(self):
+        now = date.Now()
+        self.task.setPlannedStartDateTime(date.DateTime())
+        self.task.setDueDateTime(now + date.ONE_SECOND)
+        self.assertEqual(task.status.duesoon, self.task.status())
+        oldNow = date.Now
+        try:
+            date.Now = lambda: now + date.TimeDelta(seconds=3)
+            task.StatusScheduler().onStatusChangeDue()
+            self.assertEqual(task.status.overdue, self.task.status())
+            self.failIf(task.StatusScheduler().isScheduled(self.task))
+        finally:
+            date.Now = oldNow
+
+    def testStatusChangesOfTasksAreSentAsOneEvent(self):
+        now = date.Now()
+        tasks = [task.Task(dueDateTime=now + date.ONE_SECOND) for _ in range(3)]
+        for eachTask in tasks:
+            eachTask.recomputeAppearance()
+        events = []
+        patterns.Publisher().registerObserver(events.append, 
+            eventType=task.Task.appearanceChangedEventType())
+        oldNow = date.Now
+        try:
+            date.Now = lambda: now + date.TimeDelta(seconds=3)
+            task.StatusScheduler().onStatusChangeDue()
+        finally:
+            date.Now = oldNow
+        self.assertEqual(1, len(events))
+        self.assertEqual(set(tasks), set(events[0].sources()))
 
 
 class TaskNotScheduledTest(TaskTestCase):
@@ -3197,14 +3340,12 @@ class TaskNotScheduledTest(TaskTestCase):
         return [{'subject': 'Task'}, 
                 {'dueDateTime': date.Now() - date.ONE_HOUR}]
 
-    def testOverDueIsNotScheduled(self):
-        self.failIf(date.Scheduler().is_scheduled(self.task.onOverDue))
+    def testTaskWithoutDatesIsNotScheduled(self):
+        self.failIf(task.StatusScheduler().isScheduled(self.task))
 
     def testOverdueIsNotScheduledBecauseTooLate(self):
-        self.failIf(date.Scheduler().is_scheduled(self.tasks[1].onOverDue))
-
-    def testStartedIsNotScheduled(self):
-        self.failIf(date.Scheduler().is_scheduled(self.task.onTimeToStart))
+        self.failIf(task.StatusScheduler().isScheduled(self.tasks[1]))
 
-    def testDueSoonIsNotScheduled(self):
-        self.failIf(date.Scheduler().is_scheduled(self.task.onDueSoon))
+    def testNoSchedulerJobWhenNoTaskIsScheduled(self):
+        scheduler = task.StatusScheduler()
+        self.failIf(date.Scheduler().is_scheduled(scheduler.onStatusChangeDue))
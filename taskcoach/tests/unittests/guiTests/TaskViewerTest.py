@@ -20,6 +20,7 @@ from taskcoachlib import gui, config, persistence, command, patterns, render, \
     operating_system
 from taskcoachlib.domain import task, date, effort, category, attachment
 from taskcoachlib.i18n import _
+from taskcoachlib.thirdparty.pubsub import pub
 import locale
 import os
 import test
@@ -448,6 +449,56 @@ class CommonTestsMixin(object):
         self.assertEqual(render.timeLeft(timeLeft, False), 
                          self.getItemText(0, 3))
         
+    def testChangeWhileSavingIsShownAfterSaving(self):
+        self.taskList.append(self.task)
+        pub.sendMessage('taskfile.aboutToSave', taskFile=self.taskFile)
+        self.task.setSubject('New subject')
+        pub.sendMessage('taskfile.justSaved', taskFile=self.taskFile)
+        self.assertEqual('New subject', self.getItemText(0, 0))
+
+    def testMinuteRefresherDoesNotRunWithoutTasksWithDueDate(self):
+        self.showColumn('timeLeft')
+        self.taskList.append(self.task)
+        self.failIf(self.viewer.minuteRefresher.isClockStarted())
+        
+    def testMinuteRefresherRunsForTaskWithDueDate(self):
+        self.showColumn('timeLeft')
+        self.taskList.append(self.task)
+        self.task.setDueDateTime(date.Now() + date.ONE_HOUR)
+        self.assertEqual([self.task], 
+                         self.viewer.minuteRefresher.currentlyTimeDependentItems())
+        self.failUnless(self.viewer.minuteRefresher.isClockStarted())
+        
+    def testMinuteRefresherIgnoresCompletedTasks(self):
+        self.showColumn('timeLeft')
+        self.task.setDueDateTime(date.Now() + date.ONE_HOUR)
+        self.taskList.append(self.task)
+        self.task.setCompletionDateTime()
+        self.failIf(self.viewer.minuteRefresher.currentlyTimeDependentItems())
+        self.failIf(self.viewer.minuteRefresher.isClockStarted())
+        
+    def testMinuteRefresherDoesNotRunWithoutTimeLeftColumn(self):
+        self.task.setDueDateTime(date.Now() + date.ONE_HOUR)
+        self.taskList.append(self.task)
+        self.failIf(self.viewer.minuteRefresher.isClockStarted())
+        
+    def testMinuteRefresherRunsForParentOfChildWithDueDate(self):
+        self.showColumn('timeLeft')
+        self.task.addChild(self.child)
+        self.taskList.append(self.task)
+        self.child.setDueDateTime(date.Now() + date.ONE_HOUR)
+        self.assertEqual(set([self.task, self.child]), 
+            set(self.viewer.minuteRefresher.currentlyTimeDependentItems()))
+        
+    def testMinuteRefresherStopsForParentWhenChildDueDateIsRemoved(self):
+        self.showColumn('timeLeft')
+        self.task.addChild(self.child)
+        self.taskList.append(self.task)
+        self.child.setDueDateTime(date.Now() + date.ONE_HOUR)
+        self.child.setDueDateTime(date.DateTime())
+        self.failIf(self.viewer.minuteRefresher.currentlyTimeDependentItems())
+        self.failIf(self.viewer.minuteRefresher.isClockStarted())
+        
     def testReverseSortOrderWithGrandchildren(self):
         self.task.addChild(self.child)
         grandchild = task.Task(subject='grandchild', plannedStartDateTime=date.Now() - date.ONE_SECOND)
@@ -683,7 +734,7 @@ class CommonTestsMixin(object):
         now = dueDateTime + date.ONE_SECOND
         oldNow = date.Now
         date.Now = lambda: now
-        self.task.onOverDue()        
+        task.StatusScheduler().onStatusChangeDue()
         self.assertIcon(task.overdue.getBitmap(self.settings))
         date.Now = oldNow
         
@@ -1113,6 +1164,34 @@ class TaskCalendarViewerTest(test.wxTestCase):
         dateTime = date.DateTime(2010, 10, 1, 0, 0, 0)
         self.openDialogAndAssertDateTimes(dateTime, dateTime, dateTime.endOfDay())
 
+    def createTask(self, plannedStartDateTime):
+        newTask = task.Task(plannedStartDateTime=plannedStartDateTime,
+                            dueDateTime=plannedStartDateTime + date.ONE_HOUR)
+        self.taskFile.tasks().append(newTask)
+        return newTask
+
+    def testTaskInVisiblePeriodIsShown(self):
+        self.createTask(date.Now())
+        self.assertEqual(1, self.viewer.widget.GetItemCount())
+
+    def testTaskOutsideVisiblePeriodIsNotShown(self):
+        self.createTask(date.Now() + date.TimeDelta(days=1000))
+        self.assertEqual(0, self.viewer.widget.GetItemCount())
+
+    def testTaskIsShownAfterMovingToItsPeriod(self):
+        newTask = self.createTask(date.Now() + date.TimeDelta(days=1000))
+        start = newTask.plannedStartDateTime()
+        self.viewer.widget.SetDate(wx.DateTimeFromDMY(start.day, 
+                                                      start.month - 1, 
+                                                      start.year))
+        self.assertEqual(1, self.viewer.widget.GetItemCount())
+
+    def testTaskIsShownAfterMovingItIntoVisiblePeriod(self):
+        newTask = self.createTask(date.Now() + date.TimeDelta(days=1000))
+        newTask.setDueDateTime(date.Now() + date.ONE_HOUR)
+        newTask.setPlannedStartDateTime(date.Now())
+        self.assertEqual(1, self.viewer.widget.GetItemCount())
+
         
 class TaskSquareMapViewerTest(test.wxTestCase):
     def testCreate(self):
@@ -0,0 +1,266 @@
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import test, struct
+from taskcoachlib import config
+from taskcoachlib.domain import category, task
+from taskcoachlib.iphone import protocol
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+
+
+class FakeUI(object):
+    def __init__(self):
+        self.progress = []
+        self.finished = False
+
+    def SetProgress(self, count, total):
+        self.progress.append((count, total))
+
+    def Finished(self):
+        self.finished = True
+
+    def AddLogLine(self, line):
+        pass
+
+
+class FakeTaskFile(object):
+    def __init__(self):
+        self.__tasks = task.TaskList()
+        self.__categories = category.CategoryList()
+
+    def tasks(self):
+        return self.__tasks
+
+    def categories(self):
+        return self.__categories
+
+
+class FakeWindow(object):
+    def __init__(self):
+        self.taskFile = FakeTaskFile()
+        self.restored = []
+
+    def restoreTasks(self, categories, tasks):
+        self.restored.append((categories, tasks))
+
+
+class FakeHandler(protocol.IPhoneHandler):
+    def close_when_done(self):
+        pass
+
+
+class RecordingState(protocol.BaseState):  # pylint: disable=W0223
+    def init(self, format, count):  # pylint: disable=W0622
+        self.received = []
+        self.isFinished = False
+        super(RecordingState, self).init(format, count)
+
+    def handleNewObject(self, obj):
+        self.received.append(obj)
+
+    def finished(self):
+        self.isFinished = True
+
+
+class IPhoneProtocolTestCase(test.TestCase):
+    def setUp(self):
+        super(IPhoneProtocolTestCase, self).setUp()
+        self.settings = config.Settings(load=False)
+        self.handler = FakeHandler()
+        self.handler.transport = FakeTransport()
+        self.handler.settings = self.settings
+        self.handler.window = FakeWindow()
+        self.handler.state = self.state = protocol.BaseState(self.handler)
+        self.state.ui = FakeUI()
+
+    def respond(self, code=1):
+        self.handler.dataReceived(struct.pack('!i', code))
+
+    def nrObjectsSent(self):
+        return len(self.handler.transport.writes)
+
+
+class IPhoneHandlerTest(IPhoneProtocolTestCase):
+    def buffer(self):
+        return self.handler._IPhoneHandler__buffer  # pylint: disable=W0212
+
+    def testIntegersInOneChunk(self):
+        self.state.setState(RecordingState, 'i', 3)
+        self.handler.dataReceived(''.join(struct.pack('!i', value) \
+                                          for value in (1, 2, 3)))
+        self.assertEqual([1, 2, 3], self.state.received)
+        self.failUnless(self.state.isFinished)
+
+    def testIntegersSplitAcrossChunks(self):
+        self.state.setState(RecordingState, 'i', 3)
+        data = ''.join(struct.pack('!i', value) for value in (1, 2, 3))
+        for chunk in data[:3], data[3:5], data[5:11], data[11:]:
+            self.handler.dataReceived(chunk)
+        self.assertEqual([1, 2, 3], self.state.received)
+        self.failUnless(self.state.isFinished)
+
+    def testStringsSplitAcrossChunks(self):
+        self.state.setState(RecordingState, 's', 2)
+        data = ''.join(protocol.StringItem().pack(value) \
+                       for value in (u'First', u'Second'))
+        for index in range(len(data)):
+            self.handler.dataReceived(data[index])
+        self.assertEqual([u'First', u'Second'], self.state.received)
+
+    def testNothingIsHandledBeforeObjectIsComplete(self):
+        self.state.setState(RecordingState, 'i', 1)
+        self.handler.dataReceived(struct.pack('!i', 1)[:3])
+        self.failIf(self.state.received)
+
+    def testHandledDataIsKeptWhileLessThanHalfOfBuffer(self):
+        self.state.setState(RecordingState, 's', 1)
+        self.handler.dataReceived(struct.pack('!i', 20) + 'x' * 10)
+        self.assertEqual(14, len(self.buffer()))
+
+    def testHandledDataIsRemovedWhenMoreThanHalfOfBuffer(self):
+        self.state.setState(RecordingState, 'i', 2)
+        self.handler.dataReceived(struct.pack('!i', 1) + struct.pack('!i', 2)[:1])
+        self.assertEqual(1, len(self.buffer()))
+
+    def testAllDataIsRemovedWhenHandled(self):
+        self.state.setState(RecordingState, 's', 1)
+        self.handler.dataReceived(struct.pack('!i', 20) + 'x' * 10)
+        self.handler.dataReceived('x' * 10)
+        self.assertEqual([u'x' * 20], self.state.received)
+        self.assertEqual(0, len(self.buffer()))
+
+
+class BaseStateRollbackTest(IPhoneProtocolTestCase):
+    def setUp(self):
+        super(BaseStateRollbackTest, self).setUp()
+        task.Task.settings = self.settings
+        self.taskFile = self.handler.window.taskFile
+        self.originalTask = task.Task(subject='Original')
+        self.taskFile.tasks().append(self.originalTask)
+
+    def testNoRollbackWithoutChanges(self):
+        self.state.handleClose()
+        self.failIf(self.handler.window.restored)
+
+    def testUIIsFinishedOnClose(self):
+        self.state.handleClose()
+        self.failUnless(self.state.ui.finished)
+
+    def testRollbackRestoresSnapshotAfterChange(self):
+        self.state.windowForChanges()
+        self.taskFile.tasks().append(task.Task(subject='From device'))
+        self.state.handleClose()
+        categories, tasks = self.handler.window.restored[0]
+        self.assertEqual([self.originalTask], list(tasks))
+        self.failIf(categories)
+
+    def testSnapshotIsTakenOnlyOnce(self):
+        self.state.windowForChanges()
+        self.taskFile.tasks().append(task.Task(subject='From device'))
+        self.state.windowForChanges()
+        self.state.handleClose()
+        self.assertEqual([self.originalTask], 
+                         list(self.handler.window.restored[0][1]))
+
+
+class FullFromDesktopObjectStateTestsMixin(object):
+    def startSync(self, nrCategories):
+        self.state.version = self.version
+        self.state.categories = [category.Category(subject='Category %d' % index) \
+                                 for index in range(nrCategories)]
+        self.state.tasks = []
+        self.state.efforts = []
+        self.state.total = nrCategories
+        self.state.count = 0
+        self.state.setState(protocol.FullFromDesktopCategoryState)
+
+    def testWindowOfObjectsIsSentBeforeFirstResponse(self):
+        self.startSync(10)
+        self.assertEqual(self.state.windowSize(), self.nrObjectsSent())
+
+    def testOneObjectIsSentAfterEachResponse(self):
+        self.startSync(10)
+        for nrResponses in range(1, 10 - self.state.windowSize() + 1):
+            self.respond()
+            self.assertEqual(self.state.windowSize() + nrResponses, 
+                             self.nrObjectsSent())
+
+    def testNoObjectsAreSentAfterTheLastOne(self):
+        self.startSync(10)
+        for dummy in range(10):
+            self.respond()
+        self.assertEqual(10, self.nrObjectsSent())
+
+    def testProgressIsUpdatedForEachResponse(self):
+        self.startSync(3)
+        for dummy in range(3):
+            self.respond()
+        self.assertEqual([(1, 3), (2, 3), (3, 3)], self.state.ui.progress)
+
+    def testNotFinishedBeforeLastResponse(self):
+        self.startSync(10)
+        for dummy in range(9):
+            self.respond()
+        self.failIf(self.state.ui.finished)
+
+    def testFinishedWhenAllResponsesReceived(self):
+        self.startSync(10)
+        for dummy in range(10):
+            self.respond()
+        self.failUnless(self.state.ui.finished)
+
+    def testFinishedWithoutObjects(self):
+        self.startSync(0)
+        self.failUnless(self.state.ui.finished)
+
+    def testNoObjectsSentWithoutObjects(self):
+        self.startSync(0)
+        self.assertEqual(0, self.nrObjectsSent())
+
+
+class FullFromDesktopObjectStateVersion5Test(IPhoneProtocolTestCase,
+                                             FullFromDesktopObjectStateTestsMixin):
+    version = 5
+
+    def testWindowSizeIsOne(self):
+        self.startSync(10)
+        self.assertEqual(1, self.nrObjectsSent())
+
+
+class FullFromDesktopObjectStateVersion6Test(IPhoneProtocolTestCase,
+                                             FullFromDesktopObjectStateTestsMixin):
+    version = 6
+
+    def setUp(self):
+        super(FullFromDesktopObjectStateVersion6Test, self).setUp()
+        self.settings.set('iphone', 'syncwindow', '4')
+
+    def testWindowSizeIsSetting(self):
+        self.startSync(10)
+        self.assertEqual(4, self.nrObjectsSent())
+
+    def testAllObjectsAreSentWhenWindowIsLargerThanNumberOfObjects(self):
+        self.startSync(3)
+        self.assertEqual(3, self.nrObjectsSent())
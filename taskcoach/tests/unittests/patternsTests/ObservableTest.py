@@ -18,6 +18,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import test
 from taskcoachlib import patterns
+from taskcoachlib.thirdparty.pubsub import pub
 
 
 class EventTest(test.TestCase):
@@ -436,10 +437,14 @@ class PublisherTest(test.TestCase):
         self.publisher = patterns.Publisher()
         self.events = []
         self.events2 = []
+        self.messages = []
         
     def onEvent(self, event):
         self.events.append(event)
 
+    def onMessage(self, newValue, sender):
+        self.messages.append((newValue, sender))
+
     def onEvent2(self, event):
         self.events2.append(event)
                         
@@ -618,3 +623,142 @@ class PublisherTest(test.TestCase):
                                       eventSource='observable1')
         patterns.Event('eventType1', 'observable2').send()
         self.failUnless(self.events)
+
+    def testBatchDefersEvents(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType')
+        self.publisher.startBatch()
+        patterns.Event('eventType', self).send()
+        self.failIf(self.events)
+        self.publisher.endBatch()
+        self.assertEqual([patterns.Event('eventType', self)], self.events)
+
+    def testBatchMergesConsecutiveEventsOfTheSameType(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType')
+        self.publisher.startBatch()
+        patterns.Event('eventType', self, 1).send()
+        patterns.Event('eventType', self, 2).send()
+        self.publisher.endBatch()
+        self.assertEqual([patterns.Event('eventType', self, 1, 2)], self.events)
+
+    def testBatchKeepsOrderOfEventsOfDifferentTypes(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType1')
+        self.publisher.registerObserver(self.onEvent, eventType='eventType2')
+        self.publisher.startBatch()
+        patterns.Event('eventType1', self, 1).send()
+        patterns.Event('eventType2', self, 1).send()
+        patterns.Event('eventType1', self, 2).send()
+        self.publisher.endBatch()
+        self.assertEqual([patterns.Event('eventType1', self, 1),
+                          patterns.Event('eventType2', self, 1),
+                          patterns.Event('eventType1', self, 2)], self.events)
+
+    def testNestedBatchDefersEventsUntilOutermostBatchEnds(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType')
+        self.publisher.startBatch()
+        self.publisher.startBatch()
+        patterns.Event('eventType', self).send()
+        self.publisher.endBatch()
+        self.failIf(self.events)
+        self.publisher.endBatch()
+        self.failUnless(self.events)
+
+    def testBatchMergesMessagesWithTheSameTopicAndSender(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        self.publisher.startBatch()
+        patterns.sendMessage('pubsub.test', newValue=1, sender=self)
+        patterns.sendMessage('pubsub.test', newValue=2, sender=self)
+        self.failIf(self.messages)
+        self.publisher.endBatch()
+        self.assertEqual([(2, self)], self.messages)
+
+    def testBatchDoesNotMergeMessagesOfDifferentSenders(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        self.publisher.startBatch()
+        patterns.sendMessage('pubsub.test', newValue=1, sender=self)
+        patterns.sendMessage('pubsub.test', newValue=2, sender='other sender')
+        self.publisher.endBatch()
+        self.assertEqual([(1, self), (2, 'other sender')], self.messages)
+
+    def testBatchDoesNotMergeMessagesWithTupleValues(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        self.publisher.startBatch()
+        patterns.sendMessage('pubsub.test', newValue=(1, 0), sender=self)
+        patterns.sendMessage('pubsub.test', newValue=(2, 1), sender=self)
+        self.publisher.endBatch()
+        self.assertEqual([((1, 0), self), ((2, 1), self)], self.messages)
+
+    def testMessagesAreSentDirectlyAfterBatch(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        self.publisher.startBatch()
+        self.publisher.endBatch()
+        patterns.sendMessage('pubsub.test', newValue=1, sender=self)
+        self.assertEqual([(1, self)], self.messages)
+
+    def testBatchKeepsPositionOfFirstMergedMessage(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        pub.subscribe(self.onMessage, 'pubsub.other')
+        self.publisher.startBatch()
+        patterns.sendMessage('pubsub.test', newValue=1, sender=self)
+        patterns.sendMessage('pubsub.other', newValue='other', sender=self)
+        patterns.sendMessage('pubsub.test', newValue=2, sender=self)
+        self.publisher.endBatch()
+        self.assertEqual([(2, self), ('other', self)], self.messages)
+
+    def testBatchDoesNotDeferMessagesSentWithPubDirectly(self):
+        pub.subscribe(self.onMessage, 'pubsub.test')
+        self.publisher.startBatch()
+        pub.sendMessage('pubsub.test', newValue=1, sender=self)
+        self.assertEqual([(1, self)], self.messages)
+        self.publisher.endBatch()
+
+    def testBatchDoesNotReplacePubSendMessage(self):
+        sendMessage = pub.sendMessage
+        self.publisher.startBatch()
+        self.assertEqual(sendMessage, pub.sendMessage)
+        patterns.Publisher.deleteInstance()
+        self.assertEqual(sendMessage, pub.sendMessage)
+
+    def testEventBatchDecorator(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType')
+        @patterns.eventBatch
+        def sendTwoEvents():
+            patterns.Event('eventType', self, 1).send()
+            patterns.Event('eventType', self, 2).send()
+            self.failIf(self.events)
+        sendTwoEvents()
+        self.assertEqual(1, len(self.events))
+
+    def testRemoveObserverDoesNotRemoveOtherObservers(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType', 
+                                        eventSource='observable1')
+        self.publisher.registerObserver(self.onEvent2, eventType='eventType', 
+                                        eventSource='observable1')
+        self.publisher.removeObserver(self.onEvent)
+        patterns.Event('eventType', 'observable1').send()
+        self.assertEqual([patterns.Event('eventType', 'observable1')], 
+                         self.events2)
+
+    def testRemoveObserverForAllItsRegistrations(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType1', 
+                                        eventSource='observable1')
+        self.publisher.registerObserver(self.onEvent, eventType='eventType2')
+        self.publisher.removeObserver(self.onEvent, eventSource='observable1')
+        self.publisher.removeObserver(self.onEvent, eventType='eventType2')
+        self.assertEqual([], self.publisher.observers())
+
+    def testNotifyObserverRegisteredForTypeAndForSource(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType')
+        self.publisher.registerObserver(self.onEvent, eventType='eventType', 
+                                        eventSource='observable1')
+        patterns.Event('eventType', 'observable1').send()
+        self.assertEqual([patterns.Event('eventType', 'observable1')], 
+                         self.events)
+
+    def testNotifyObserverForSpecificSourceOfEventWithMultipleSources(self):
+        self.publisher.registerObserver(self.onEvent, eventType='eventType', 
+                                        eventSource='observable1')
+        event = patterns.Event('eventType', 'observable1')
+        event.addSource('observable2')
+        event.send()
+        self.assertEqual([patterns.Event('eventType', 'observable1')], 
+                         self.events)
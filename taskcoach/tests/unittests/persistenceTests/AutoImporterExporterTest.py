@@ -35,6 +35,7 @@ class AutoExporterTestCase(test.TestCase):
     def tearDown(self):
         super(AutoExporterTestCase, self).tearDown()
         del self.exporter
+        self.taskFile.finishBackgroundSave()
         for filename in self.tskFilename, self.tskFilename + '.delta', self.txtFilename, self.txtFilename + '-meta':
             try:
                 os.remove(filename)
@@ -21,6 +21,7 @@ from taskcoachlib.domain import task, category
 from unittests import dummy
 import test
 from taskcoachlib.changes import ChangeMonitor
+from taskcoachlib.thirdparty.pubsub import pub
 
 
 class DummyFile(object):
@@ -60,6 +61,10 @@ class DummyTaskFile(persistence.TaskFile):
             self.saveCalled += 1
         super(DummyTaskFile, self).save(*args, **kwargs)
 
+    def saveInBackground(self, *args, **kwargs):
+        self.saveCalled += 1
+        super(DummyTaskFile, self).saveInBackground(*args, **kwargs)
+
     def load(self, filename=None, throw=False, *args, **kwargs):  # pylint: disable=W0221
         self._throw = throw  # pylint: disable=W0201
         return super(DummyTaskFile, self).load(filename, *args, **kwargs)
@@ -105,6 +110,15 @@ class AutoSaverTestCase(test.TestCase):
         self.autoSaver.on_idle(dummy.Event())
         self.assertEqual(1, self.taskFile.saveCalled)
         
+    def testFailedBackgroundSaveIsNotRetried(self):
+        self.settings.set('file', 'autosave', 'True')
+        self.taskFile.setFilename('whatever.tsk')
+        self.taskFile.tasks().append(task.Task())
+        pub.sendMessage('taskfile.saveFailed', taskFile=self.taskFile, 
+                        reason=IOError())
+        self.autoSaver.on_idle(dummy.Event())
+        self.failIf(self.taskFile.saveCalled)
+
     def testSaveAsDoesNotTriggerAutoSave(self):
         self.settings.set('file', 'autosave', 'True')
         self.taskFile.setFilename('whatever.tsk')
@@ -16,9 +16,10 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
-import os, wx
+import os, wx, threading
 import test
 from taskcoachlib import persistence, config
+from taskcoachlib.thirdparty.pubsub import pub
 from taskcoachlib.domain import base, task, effort, date, category, note, attachment
 
 
@@ -776,6 +777,198 @@ class TaskFileSaveAndLoadTest(TaskFileTestCase):
         self.remove('new.tsk', 'new.tsk.delta')
 
 
+class ReadCountingTaskFile(persistence.TaskFile):
+    def __init__(self, *args, **kwargs):
+        self.readCount = 0
+        super(ReadCountingTaskFile, self).__init__(*args, **kwargs)
+
+    def _read(self, fd):
+        self.readCount += 1
+        return super(ReadCountingTaskFile, self)._read(fd)
+
+
+class TaskFileSaveWithoutReadingTest(TaskFileTestCase):
+    def createTaskFiles(self):
+        # pylint: disable=W0201
+        self.taskFile = ReadCountingTaskFile()
+        self.emptyTaskFile = ReadCountingTaskFile()
+
+    def setUp(self):
+        super(TaskFileSaveWithoutReadingTest, self).setUp()
+        self.taskFile.setFilename(self.filename)
+        self.taskFile.save()
+        self.taskFile.readCount = 0
+
+    def testSaveUnchangedFileDoesNotReadIt(self):
+        self.taskFile.tasks().append(task.Task(subject='New task'))
+        self.taskFile.save()
+        self.assertEqual(0, self.taskFile.readCount)
+
+    def testSaveUnchangedFileAfterLoadDoesNotReadIt(self):
+        self.emptyTaskFile.load(self.filename)
+        self.emptyTaskFile.readCount = 0
+        self.emptyTaskFile.tasks().append(task.Task(subject='New task'))
+        self.emptyTaskFile.save()
+        self.assertEqual(0, self.emptyTaskFile.readCount)
+
+    def testSaveReadsFileWrittenByOtherInstance(self):
+        self.emptyTaskFile.load(self.filename)
+        self.emptyTaskFile.tasks().append(task.Task(subject='New task'))
+        self.emptyTaskFile.save()
+        self.taskFile.save()
+        self.assertEqual(1, self.taskFile.readCount)
+        self.assertEqual(2, len(self.taskFile.tasks()))
+
+    def testSaveUnchangedFileWritesChangesForOtherInstances(self):
+        self.emptyTaskFile.load(self.filename)
+        self.task.setSubject('New subject')
+        self.taskFile.save()
+        self.emptyTaskFile.save()
+        self.assertEqual('New subject',
+                         self.emptyTaskFile.tasks().getObjectById(self.task.id()).subject())
+
+
+class TaskFileSaveChangedTasksTest(TaskFileTestCase):
+    ''' Unchanged top-level tasks aren't serialized again when saving, so
+        make sure changes anywhere in a top-level task are saved. '''
+    def setUp(self):
+        super(TaskFileSaveChangedTasksTest, self).setUp()
+        self.child = task.Task(subject='Old child', parent=self.task)
+        self.task.addChild(self.child)
+        self.taskFile.setFilename(self.filename)
+        self.taskFile.save()
+
+    def savedContents(self):
+        self.taskFile.save()
+        return file(self.filename).read()
+
+    def testChangedChildIsSaved(self):
+        self.child.setSubject('New child')
+        self.failUnless('New child' in self.savedContents())
+
+    def testAddedChildIsSaved(self):
+        self.task.addChild(task.Task(subject='Added child', parent=self.task))
+        self.failUnless('Added child' in self.savedContents())
+
+    def testRemovedChildIsNotSaved(self):
+        self.task.removeChild(self.child)
+        self.failIf('Old child' in self.savedContents())
+
+    def testAddedEffortIsSaved(self):
+        self.child.addEffort(effort.Effort(self.child))
+        self.assertEqual(2, self.savedContents().count('<effort '))
+
+    def testAddedNoteIsSaved(self):
+        self.child.addNote(note.Note(subject='Child note'))
+        self.failUnless('Child note' in self.savedContents())
+
+    def testDeletedChildIsSavedAsDeleted(self):
+        self.child.markDeleted()
+        self.failUnless('status="%d"' % task.Task.STATUS_DELETED in \
+                        self.savedContents())
+
+    def testStatusChangeByCategoryIsSaved(self):
+        self.child.addCategory(self.category)
+        self.category.addCategorizable(self.child)
+        self.taskFile.save()
+        self.child.cleanDirty()
+        self.category.setSubject('New category')
+        self.failUnless('status="%d"' % task.Task.STATUS_CHANGED in \
+                        self.savedContents())
+
+
+class UnwritableTaskFile(persistence.TaskFile):
+    def _openForWrite(self, suffix=''):
+        if suffix:
+            return super(UnwritableTaskFile, self)._openForWrite(suffix)
+        raise IOError('Disk full')
+
+
+class TaskFileSaveInBackgroundTest(TaskFileTestCase):
+    def setUp(self):
+        super(TaskFileSaveInBackgroundTest, self).setUp()
+        self.taskFile.setFilename(self.filename)
+        self.events = []
+        pub.subscribe(self.onJustSaved, 'taskfile.justSaved')
+        pub.subscribe(self.onSaveFailed, 'taskfile.saveFailed')
+
+    def onJustSaved(self, taskFile):
+        self.events.append(('justSaved', taskFile))
+
+    def onSaveFailed(self, taskFile, reason):
+        self.events.append(('saveFailed', taskFile))
+
+    def testSaveInBackground(self):
+        self.taskFile.saveInBackground()
+        self.taskFile.finishBackgroundSave()
+        self.emptyTaskFile.load(self.filename)
+        self.assertEqual(1, len(self.emptyTaskFile.tasks()))
+
+    def testTaskFileIsCleanWhileWriting(self):
+        self.taskFile.saveInBackground()
+        self.failIf(self.taskFile.needSave())
+        self.taskFile.finishBackgroundSave()
+
+    def testJustSavedIsSentBeforeWriting(self):
+        self.taskFile.saveInBackground()
+        self.assertEqual([('justSaved', self.taskFile)], self.events)
+        self.taskFile.finishBackgroundSave()
+        self.assertEqual([('justSaved', self.taskFile)], self.events)
+
+    def testChangeWhileWritingMarksTaskFileDirty(self):
+        self.taskFile.saveInBackground()
+        self.task.setSubject('Changed while writing')
+        self.taskFile.finishBackgroundSave()
+        self.failUnless(self.taskFile.needSave())
+
+    def testAddedTaskWhileWritingMarksTaskFileDirty(self):
+        self.taskFile.saveInBackground()
+        self.taskFile.tasks().append(task.Task(subject='New task'))
+        self.taskFile.finishBackgroundSave()
+        self.failUnless(self.taskFile.needSave())
+
+    def testFinishingTwiceSendsJustSavedOnce(self):
+        self.taskFile.saveInBackground()
+        self.taskFile.finishBackgroundSave()
+        self.taskFile.finishBackgroundSave()
+        self.assertEqual(1, len(self.events))
+
+    def testSaveWaitsForBackgroundSave(self):
+        self.taskFile.saveInBackground()
+        self.taskFile.tasks().append(task.Task(subject='New task'))
+        self.taskFile.save()
+        self.emptyTaskFile.load(self.filename)
+        self.assertEqual(2, len(self.emptyTaskFile.tasks()))
+
+    def testCallBeforeWritingWhenNotSavingCallsRightAway(self):
+        called = []
+        self.taskFile.callBeforeWriting(called.append, 'called')
+        self.assertEqual(['called'], called)
+
+    def testCallBeforeWritingWhileSavingInBackgroundCallsFromWorker(self):
+        threads = []
+        def onAboutToSave(taskFile):
+            taskFile.callBeforeWriting(lambda: threads.append(threading.currentThread()))
+        pub.subscribe(onAboutToSave, 'taskfile.aboutToSave')
+        self.taskFile.saveInBackground()
+        self.taskFile.finishBackgroundSave()
+        self.assertEqual(1, len(threads))
+        self.failIf(threads[0] is threading.currentThread())
+
+    def testFailedBackgroundSaveMarksTaskFileDirty(self):
+        unwritableTaskFile = UnwritableTaskFile()
+        try:
+            unwritableTaskFile.setFilename(self.filename)
+            unwritableTaskFile.tasks().append(task.Task())
+            unwritableTaskFile.saveInBackground()
+            unwritableTaskFile.finishBackgroundSave()
+            self.failUnless(unwritableTaskFile.needSave())
+            self.assertEqual([('justSaved', unwritableTaskFile),
+                              ('saveFailed', unwritableTaskFile)], self.events)
+        finally:
+            unwritableTaskFile.stop()
+
+
 class TaskFileMergeTest(TaskFileTestCase):
     def setUp(self):
         super(TaskFileMergeTest, self).setUp()
@@ -956,6 +1149,25 @@ class LockedTaskFileLockTest(TaskFileTestCase):
         self.emptyTaskFile.load(self.filename)
         self.assertEqual(1, len(self.emptyTaskFile.tasks()))
 
+    def testFileIsLockedWhileWritingInBackground(self):
+        lockedWhileWriting = []
+        def onAboutToSave(taskFile):
+            taskFile.callBeforeWriting(lambda: lockedWhileWriting.append(
+                bool(taskFile.is_locked())))
+        pub.subscribe(onAboutToSave, 'taskfile.aboutToSave')
+        self.taskFile.setFilename(self.filename)
+        self.taskFile.saveInBackground()
+        self.failUnless(self.taskFile.is_locked())
+        self.taskFile.finishBackgroundSave()
+        self.assertEqual([True], lockedWhileWriting)
+        self.failIf(self.taskFile.is_locked())
+
+    def testFileIsNotLockedAfterSavingWhileSavingInBackground(self):
+        self.taskFile.setFilename(self.filename)
+        self.taskFile.saveInBackground()
+        self.taskFile.save()
+        self.failIf(self.taskFile.is_locked())
+
 
 class TaskFileMonitorTestBase(TaskFileTestCase):
     def setUp(self):
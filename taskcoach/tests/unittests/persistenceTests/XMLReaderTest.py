@@ -25,7 +25,7 @@ import os
 import tempfile
 import base64
 import test
-from taskcoachlib import persistence, config, operating_system
+from taskcoachlib import persistence, config, operating_system, meta
 from taskcoachlib.domain import date, task
 
 
@@ -1794,3 +1794,33 @@ class XMLReaderVersion37Test(XMLReaderTestCase):
           <category categorizables="noteid" subject="Category" />
         </tasks>''')
         self.assert_('noteid' in [obj.id() for obj in categories[0].categorizables()])
+
+
+class XMLReaderStreamingTest(XMLReaderTestCase):
+    tskversion = 37
+
+    def testTopLevelNodesInAnyOrder(self):
+        tasks, categories, notes = self.writeAndReadTasksAndCategoriesAndNotes('''
+        <tasks>
+          <note id="n1" subject="Note" />
+          <category id="c1" subject="Category" categorizables="t1 n1" />
+          <task id="t1" subject="Task" />
+          <guid>guid</guid>
+        </tasks>''')
+        self.assertEqual(['Task'], [eachTask.subject() for eachTask in tasks])
+        self.assertEqual(set([tasks[0], notes[0]]),
+                         set(categories[0].categorizables()))
+
+    def testPrerequisiteDefinedInLaterTopLevelTask(self):
+        tasks = self.writeAndReadTasks('''
+        <tasks>
+          <task id="t1" prerequisites="t2" />
+          <task id="t2" />
+        </tasks>''')
+        self.assertEqual(set([tasks[1]]), tasks[0].prerequisites())
+        self.assertEqual(set([tasks[0]]), tasks[1].dependencies())
+
+    def testTooNewVersionIsDetectedBeforeParsingTasks(self):
+        self.tskversion = meta.data.tskversion + 1  # pylint: disable=W0201
+        self.assertRaises(persistence.xml.reader.XMLReaderTooNewException,
+                          self.writeAndReadTasks, '<tasks><task id="t1" /></tasks>')
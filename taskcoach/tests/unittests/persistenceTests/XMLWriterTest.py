@@ -19,6 +19,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
 import wx, StringIO # We cannot use CStringIO since unicode strings are used below.
+import gc, weakref
 import test
 from taskcoachlib import persistence, config, meta
 from taskcoachlib.domain import base, task, effort, date, category, note, attachment
@@ -62,6 +63,17 @@ class XMLWriterTest(test.TestCase):
     def testGUID(self):
         self.expectInXML('<guid>\nGUID\n</guid>')
 
+    def testRootNode(self):
+        xml = self.__writeAndRead()
+        self.failUnless(xml.startswith('<?xml version="1.0" encoding="utf-8"?>\n'))
+        self.failUnless('?>\n\n<tasks>\n<task ' in xml)
+        self.failUnless(xml.endswith('</guid>\n</tasks>\n'))
+
+    def testEmptyRootNode(self):
+        self.writer.write(task.TaskList(), category.CategoryList(),
+                          note.NoteContainer(), None, None)
+        self.failUnless(self.fd.getvalue().endswith('?>\n\n<tasks />\n'))
+
     def testTaskSubject(self):
         self.task.setSubject('Subject')
         self.expectInXML('subject="Subject"')
@@ -730,3 +742,87 @@ class XMLWriterTest(test.TestCase):
         task_with_unknown_modification_datetime = \
             task.Task(modificationDateTime=date.DateTime.min)
         self.expectNotInXML('modificationDateTime="0001-01-01 00:00:00"')
+
+
+class XMLWriterWithFragmentCacheTest(test.TestCase):
+    def setUp(self):
+        task.Task.settings = config.Settings(load=False)
+        self.cache = persistence.TaskFragmentCache()
+        self.task = task.Task(subject='Old subject')
+        self.taskList = task.TaskList([self.task])
+        
+    def write(self, fragmentCache=None):
+        fd = StringIO.StringIO()
+        persistence.XMLWriter(fd, fragmentCache=fragmentCache).write(self.taskList, 
+            category.CategoryList(), note.NoteContainer(), None, None)
+        return fd.getvalue()
+    
+    def testOutputIsTheSameAsWithoutCache(self):
+        self.task.addChild(task.Task(subject='Child'))
+        self.assertEqual(self.write(), self.write(self.cache))
+        self.assertEqual(self.write(), self.write(self.cache))
+        
+    def testUnchangedTaskIsNotSerializedAgain(self):
+        self.write(self.cache)
+        self.task.setSubject('New subject')
+        self.failUnless('Old subject' in self.write(self.cache))
+        
+    def testChangedTaskIsSerializedAgain(self):
+        self.write(self.cache)
+        self.task.setSubject('New subject')
+        self.cache.changed(self.task)
+        self.failUnless('New subject' in self.write(self.cache))
+        
+    def testChangedChildIsSerializedAgain(self):
+        child = task.Task(subject='Old child subject')
+        self.task.addChild(child)
+        self.write(self.cache)
+        child.setSubject('New child subject')
+        self.cache.changed(child)
+        self.failUnless('New child subject' in self.write(self.cache))
+        
+    def testAddedChildIsSerialized(self):
+        self.write(self.cache)
+        self.task.addChild(task.Task(subject='Child'))
+        self.cache.changed(self.task)
+        self.failUnless('Child' in self.write(self.cache))
+        
+    def testAddedEffortIsSerialized(self):
+        self.write(self.cache)
+        self.task.addEffort(effort.Effort(self.task))
+        self.cache.changed(self.task)
+        self.failUnless('<effort' in self.write(self.cache))
+        
+    def testStatusChangeIsSerialized(self):
+        self.write(self.cache)
+        self.task.markDeleted()
+        self.cache.changed(self.task)
+        self.failUnless('status="%d"' % self.task.STATUS_DELETED in \
+                        self.write(self.cache))
+        
+    def testChangedRemovedChildIsSerializedAgain(self):
+        child = task.Task(subject='Child')
+        self.task.addChild(child)
+        self.write(self.cache)
+        self.task.removeChild(child)
+        self.cache.changed(child)
+        self.failIf('Child' in self.write(self.cache))
+
+    def testClearedCacheSerializesAgain(self):
+        self.write(self.cache)
+        self.task.setSubject('New subject')
+        self.cache.clear()
+        self.failUnless('New subject' in self.write(self.cache))
+
+    def testCacheDoesNotKeepTasksAlive(self):
+        self.write(self.cache)
+        self.taskList.remove(self.task)
+        taskReference = weakref.ref(self.task)
+        del self.task
+        gc.collect()
+        self.failIf(taskReference())
+
+    def testRemovedTaskIsNotWritten(self):
+        self.write(self.cache)
+        self.taskList.remove(self.task)
+        self.failIf('Old subject' in self.write(self.cache))
@@ -0,0 +1,114 @@
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import test
+from taskcoachlib import config
+from taskcoachlib.domain import task, date
+from taskcoachlib.widgets.calendarwidget import TaskIntervalIndex
+
+
+class TaskIntervalIndexTest(test.TestCase):
+    def setUp(self):
+        task.Task.settings = config.Settings(load=False)
+        self.index = TaskIntervalIndex()
+        self.start = date.DateTime(2016, 1, 1)
+
+    def createTask(self, startDays, endDays):
+        return task.Task(plannedStartDateTime=self.start + \
+                             date.TimeDelta(days=startDays),
+                         dueDateTime=self.start + date.TimeDelta(days=endDays))
+
+    def tasksBetween(self, startDays, endDays):
+        return set(self.index.tasksBetween( \
+            self.start + date.TimeDelta(days=startDays),
+            self.start + date.TimeDelta(days=endDays)))
+
+    def testEmptyIndex(self):
+        self.assertEqual(0, len(self.index))
+        self.failIf(self.tasksBetween(0, 1))
+
+    def testTaskInPeriod(self):
+        theTask = self.createTask(1, 2)
+        self.index.add(theTask)
+        self.assertEqual(set([theTask]), self.tasksBetween(0, 3))
+
+    def testTaskBeforePeriod(self):
+        self.index.add(self.createTask(1, 2))
+        self.failIf(self.tasksBetween(3, 4))
+
+    def testTaskAfterPeriod(self):
+        self.index.add(self.createTask(5, 6))
+        self.failIf(self.tasksBetween(3, 4))
+
+    def testTaskOverlappingStartOfPeriod(self):
+        theTask = self.createTask(1, 4)
+        self.index.add(theTask)
+        self.assertEqual(set([theTask]), self.tasksBetween(3, 5))
+
+    def testTaskSpanningPeriod(self):
+        theTask = self.createTask(1, 10)
+        self.index.add(theTask)
+        self.assertEqual(set([theTask]), self.tasksBetween(3, 5))
+
+    def testLongTaskSpanningPeriod(self):
+        theTask = self.createTask(-100, 100)
+        self.index.add(theTask)
+        self.assertEqual(set([theTask]), self.tasksBetween(3, 5))
+
+    def testTaskWithoutDatesIsShownToday(self):
+        theTask = task.Task()
+        self.index.add(theTask)
+        today = date.Now()
+        self.assertEqual([theTask], 
+                         self.index.tasksBetween(today, today + date.ONE_HOUR))
+
+    def testAddSeveralTasks(self):
+        tasks = [self.createTask(days, days + 1) for days in range(10)]
+        self.index.add(*tasks)
+        self.assertEqual(set(tasks[2:5]), self.tasksBetween(3, 4))
+
+    def testRemoveTask(self):
+        theTask = self.createTask(1, 2)
+        self.index.add(theTask)
+        self.index.remove(theTask)
+        self.failIf(theTask in self.index)
+        self.failIf(self.tasksBetween(0, 3))
+
+    def testUpdateTaskAfterDateChange(self):
+        theTask = self.createTask(1, 2)
+        self.index.add(theTask)
+        theTask.setPlannedStartDateTime(self.start + date.TimeDelta(days=5))
+        theTask.setDueDateTime(self.start + date.TimeDelta(days=6))
+        self.index.update(theTask)
+        self.failIf(self.tasksBetween(0, 3))
+        self.assertEqual(set([theTask]), self.tasksBetween(4, 7))
+
+    def testCompletedTaskEndsAtCompletion(self):
+        theTask = self.createTask(1, 2)
+        theTask.setCompletionDateTime(self.start + date.TimeDelta(days=5))
+        self.index.add(theTask)
+        self.assertEqual(set([theTask]), self.tasksBetween(4, 6))
+
+    def testReindexAddsRemovesAndMovesTasks(self):
+        task1, task2, task3 = [self.createTask(1, 2) for _ in range(3)]
+        self.index.add(task1, task2)
+        task2.setDueDateTime(self.start + date.TimeDelta(days=20))
+        task2.setPlannedStartDateTime(self.start + date.TimeDelta(days=10))
+        self.index.reindex([task2, task3])
+        self.assertEqual(set([task3]), self.tasksBetween(0, 3))
+        self.assertEqual(set([task2]), self.tasksBetween(11, 12))
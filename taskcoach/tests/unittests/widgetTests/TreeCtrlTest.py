@@ -33,7 +33,9 @@ class TreeCtrlTestCase(test.wxTestCase):
         super(TreeCtrlTestCase, self).setUp()
         self.children = dict()
         self.collapsedItems = []
+        self.parents = dict()
         self.frame.children = lambda item: self.children.get(item, [])
+        self.frame.getItemParent = lambda item: self.parents.get(item)
         self.frame.getItemText = lambda item, column: item.subject()
         self.frame.hasColumnImages = lambda column: False
         self.frame.getItemImages = lambda item, column: {wx.TreeItemIcon_Normal: -1}
@@ -53,6 +55,9 @@ class DummyDomainObject(object):
     def subject(self):
         return self.__subject
     
+    def setSubject(self, subject):
+        self.__subject = subject
+        
     # pylint: disable=W0613
     
     def foregroundColor(self, recursive=False):
@@ -214,7 +219,179 @@ class CommonTestsMixin(object):
         self.treeCtrl.RefreshItems(self.item0)
         item = self.getFirstTreeItem()
         self.assertEqual('item 0', self.treeCtrl.GetItemText(item))        
-    
+
+    def testRefreshChildItem(self):
+        self.children[None] = [self.item0, self.item1]
+        self.children[self.item0] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(3)
+        self.item0_0.setSubject('new subject')
+        self.treeCtrl.RefreshItems(self.item0_0)
+        child = self.treeCtrl.GetFirstChild(self.getFirstTreeItem())[0]
+        self.assertEqual('new subject', self.treeCtrl.GetItemText(child))
+
+    def testRefreshAllItemsLeavesExistingItemsAlone(self):
+        self.children[None] = [self.item0]
+        self.treeCtrl.RefreshAllItems(1)
+        self.item0.setSubject('new subject')
+        self.treeCtrl.RefreshAllItems(1)
+        self.assertEqual('item 0', 
+                         self.treeCtrl.GetItemText(self.getFirstTreeItem()))
+
+    def testRefreshItemThatIsNotInTheTree(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.collapsedItems.append(self.item0)
+        self.treeCtrl.RefreshAllItems(2)
+        self.treeCtrl.RefreshItems(self.item0_0, self.item1)
+        self.assertEqual(1, self.treeCtrl.GetItemCount())
+
+    def testRefreshRemovedItem(self):
+        self.children[None] = [self.item0, self.item1]
+        self.treeCtrl.RefreshAllItems(2)
+        self.children[None] = [self.item1]
+        self.treeCtrl.RefreshAllItems(1)
+        self.item0.setSubject('new subject')
+        self.treeCtrl.RefreshItems(self.item0)
+        self.assertEqual(['item 1'], [self.treeCtrl.GetItemText(item) for item \
+                                      in self.treeCtrl.GetItemChildren()])
+
+    def testAddItemKeepsExistingItems(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(2)
+        itemsBefore = self.treeCtrl.GetItemChildren(recursively=True)
+        self.children[None] = [self.item0, self.item1]
+        self.treeCtrl.RefreshAllItems(3)
+        itemsAfter = self.treeCtrl.GetItemChildren(recursively=True)
+        self.assertEqual(itemsBefore, itemsAfter[:2])
+        self.assertEqual('item 1', self.treeCtrl.GetItemText(itemsAfter[2]))
+
+    def testRemoveItemKeepsOtherItems(self):
+        self.children[None] = [self.item0, self.item1]
+        self.treeCtrl.RefreshAllItems(2)
+        item1 = self.treeCtrl.GetItemChildren()[1]
+        self.children[None] = [self.item1]
+        self.treeCtrl.RefreshAllItems(1)
+        self.assertEqual([item1], self.treeCtrl.GetItemChildren())
+
+    def testReorderItemsKeepsItems(self):
+        self.children[None] = [self.item0, self.item1]
+        self.treeCtrl.RefreshAllItems(2)
+        items = self.treeCtrl.GetItemChildren()
+        self.children[None] = [self.item1, self.item0]
+        self.treeCtrl.RefreshAllItems(2)
+        self.assertEqual(items[::-1], self.treeCtrl.GetItemChildren())
+
+    def testMoveChildToOtherParent(self):
+        self.children[None] = [self.item0, self.item1]
+        self.children[self.item0] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(3)
+        self.children[self.item0] = []
+        self.children[self.item1] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(3)
+        self.item0_0.setSubject('new subject')
+        self.treeCtrl.RefreshItems(self.item0_0)
+        self.assertEqual(['item 0', 'item 1', 'new subject'],
+                         [self.treeCtrl.GetItemText(item) for item in \
+                          self.treeCtrl.GetItemChildren(recursively=True)])
+
+    def testCollapseItemKeepsChildItems(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(2)
+        self.collapsedItems.append(self.item0)
+        self.treeCtrl.RefreshAllItems(2)
+        self.assertEqual(2, self.treeCtrl.GetItemCount())
+        self.failUnless(self.treeCtrl.isAnyItemExpandable())
+
+    def testCollapseItemRemovesChildItemsWhenChildrenAreGone(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.treeCtrl.RefreshAllItems(2)
+        self.collapsedItems.append(self.item0)
+        self.children[self.item0] = []
+        self.treeCtrl.RefreshAllItems(1)
+        self.assertEqual(1, self.treeCtrl.GetItemCount())
+        self.failIf(self.treeCtrl.isAnyItemExpandable())
+
+    def testExpandItemAddsChildItems(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.collapsedItems.append(self.item0)
+        self.treeCtrl.RefreshAllItems(2)
+        self.collapsedItems.remove(self.item0)
+        self.treeCtrl.RefreshAllItems(2)
+        self.assertEqual(2, self.treeCtrl.GetItemCount())
+        self.failIf(self.treeCtrl.isAnyItemExpandable())
+
+    def testInsertAddedItem(self):
+        self.children[None] = [self.item0]
+        self.treeCtrl.RefreshAllItems(1)
+        item0 = self.getFirstTreeItem()
+        self.children[None] = [self.item1, self.item0]
+        self.treeCtrl.RefreshItemsAddedAndRemoved([self.item1], [])
+        self.assertEqual(['item 1', 'item 0'], 
+                         [self.treeCtrl.GetItemText(item) for item in \
+                          self.treeCtrl.GetItemChildren()])
+        self.assertEqual(item0, self.treeCtrl.GetItemChildren()[1])
+
+    def testInsertAddedChildItem(self):
+        self.children[None] = [self.item0, self.item1]
+        self.children[self.item0] = [self.item0_1]
+        self.parents[self.item0_1] = self.item0
+        self.treeCtrl.RefreshAllItems(3)
+        self.children[self.item0] = [self.item0_0, self.item0_1]
+        self.parents[self.item0_0] = self.item0
+        self.treeCtrl.RefreshItemsAddedAndRemoved([self.item0_0], [])
+        self.assertEqual(['item 0', 'item 0.0', 'item 0.1', 'item 1'],
+                         [self.treeCtrl.GetItemText(item) for item in \
+                          self.treeCtrl.GetItemChildren(recursively=True)])
+
+    def testInsertAddedParentAndChildItems(self):
+        self.children[None] = [self.item1]
+        self.treeCtrl.RefreshAllItems(1)
+        self.children[None] = [self.item0, self.item1]
+        self.children[self.item0] = [self.item0_0]
+        self.parents[self.item0_0] = self.item0
+        self.treeCtrl.RefreshItemsAddedAndRemoved([self.item0_0, self.item0], 
+                                                  [])
+        self.assertEqual(['item 0', 'item 0.0', 'item 1'],
+                         [self.treeCtrl.GetItemText(item) for item in \
+                          self.treeCtrl.GetItemChildren(recursively=True)])
+
+    def testAddedChildOfCollapsedItemMakesItemExpandable(self):
+        self.children[None] = [self.item0]
+        self.collapsedItems.append(self.item0)
+        self.treeCtrl.RefreshAllItems(1)
+        self.children[self.item0] = [self.item0_0]
+        self.parents[self.item0_0] = self.item0
+        self.treeCtrl.RefreshItemsAddedAndRemoved([self.item0_0], [])
+        self.assertEqual(1, self.treeCtrl.GetItemCount())
+        self.failUnless(self.treeCtrl.isAnyItemExpandable())
+
+    def testDeleteRemovedItemOnly(self):
+        self.children[None] = [self.item0, self.item1]
+        self.treeCtrl.RefreshAllItems(2)
+        item1 = self.treeCtrl.GetItemChildren()[1]
+        self.children[None] = [self.item1]
+        self.treeCtrl.RefreshItemsAddedAndRemoved([], [self.item0])
+        self.assertEqual([item1], self.treeCtrl.GetItemChildren())
+
+    def testDeleteRemovedChildItem(self):
+        self.children[None] = [self.item0]
+        self.children[self.item0] = [self.item0_0]
+        self.parents[self.item0_0] = self.item0
+        self.treeCtrl.RefreshAllItems(2)
+        self.children[self.item0] = []
+        self.treeCtrl.RefreshItemsAddedAndRemoved([], [self.item0_0])
+        self.assertEqual(1, self.treeCtrl.GetItemCount())
+        self.failIf(self.treeCtrl.isAnyItemExpandable())
+
+    def testRefreshAddedItemBeforeFirstRefresh(self):
+        self.children[None] = [self.item0]
+        self.treeCtrl.RefreshItemsAddedAndRemoved([self.item0], [])
+        self.assertEqual(1, len(self.treeCtrl.GetItemChildren()))
+
     def testIsAnyItemCollapsable_NoItems(self):
         self.failIf(self.treeCtrl.isAnyItemCollapsable())
       
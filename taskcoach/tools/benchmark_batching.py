@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Script to measure the time and number of notifications needed to load and
+# merge a task file and to import a todo.txt file.
+# Usage: benchmark_batching.py [number of tasks] [--nobatch]
+# With --nobatch, notifications are not batched, so observers are notified
+# of each change separately, as they were before batching was introduced.
+
+import os, sys, time, tempfile, shutil, wx
+app = wx.App(False)
+sys.path.insert(0, '..')
+from taskcoachlib import persistence, config, patterns
+from taskcoachlib.domain import task, category, date
+
+
+class NotificationCounter(object):
+    def __init__(self, taskFile):
+        self.count = 0
+        for container in taskFile.tasks(), taskFile.categories():
+            for eventType in container.addItemEventType(), \
+                             container.removeItemEventType():
+                patterns.Publisher().registerObserver(self.onEvent,
+                    eventType=eventType, eventSource=container)
+
+    def onEvent(self, event):  # pylint: disable=W0613
+        self.count += 1
+
+
+def generate(directory, nrTasks):
+    taskFile = persistence.TaskFile()
+    taskFile.setFilename(os.path.join(directory, 'benchmark.tsk'))
+    for index in range(nrTasks):
+        taskFile.tasks().append(task.Task(subject='Task %d' % index,
+            plannedStartDateTime=date.DateTime(2016, 1, 1)))
+    taskFile.save()
+    taskFile.close()
+    todoTxt = file(os.path.join(directory, 'benchmark.txt'), 'w')
+    for index in range(nrTasks):
+        todoTxt.write('(A) 2016-01-01 Task %d +Project%d @Context%d\n' % \
+                      (index, index % 10, index % 5))
+    todoTxt.close()
+
+def measure(title, function):
+    start = time.time()
+    function()
+    print '%s: %.2f seconds' % (title, time.time() - start)
+
+def benchmark(directory):
+    taskFile = persistence.TaskFile()
+    counter = NotificationCounter(taskFile)
+    filename = os.path.join(directory, 'benchmark.tsk')
+    measure('Load', lambda: taskFile.load(filename))
+    print 'Notifications while loading: %d' % counter.count
+    counter.count = 0
+    measure('Merge', lambda: taskFile.merge(filename))
+    print 'Notifications while merging: %d' % counter.count
+    counter.count = 0
+    reader = persistence.TodoTxtReader(taskFile.tasks(), taskFile.categories())
+    measure('Import todo.txt', 
+            lambda: reader.read(os.path.join(directory, 'benchmark.txt')))
+    print 'Notifications while importing: %d' % counter.count
+    taskFile.close()
+    taskFile.stop()
+
+
+if __name__ == '__main__':
+    arguments = [arg for arg in sys.argv[1:] if arg != '--nobatch']
+    if '--nobatch' in sys.argv:
+        patterns.Publisher.startBatch = lambda self: None
+        patterns.Publisher.endBatch = lambda self: None
+    nrTasks = int(arguments[0]) if arguments else 10000
+    task.Task.settings = config.Settings(load=False)
+    directory = tempfile.mkdtemp()
+    try:
+        generate(directory, nrTasks)
+        benchmark(directory)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Script to measure the memory used per effort.
+# Usage: benchmark_effortmemory.py [number of efforts]
+# Run the script against different revisions of the domain classes to
+# compare them. Since peak memory use can only go up, each measurement
+# should be done in a fresh process.
+
+import sys, resource, wx
+app = wx.App(False)
+sys.path.insert(0, '..')
+from taskcoachlib import config
+from taskcoachlib.domain import task, effort, date
+
+
+def peakMemoryInBytes():
+    # ru_maxrss is in kilobytes on Linux but in bytes on Mac OS X
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def benchmark(nrEfforts):
+    task.Task.settings = config.Settings(load=False)
+    theTask = task.Task(subject='Task')
+    start = date.DateTime(2016, 1, 1)
+    memoryBefore = peakMemoryInBytes()
+    efforts = [effort.Effort(theTask, start + date.TimeDelta(minutes=index),
+                             start + date.TimeDelta(minutes=index + 30)) \
+               for index in xrange(nrEfforts)]
+    memoryIncrease = peakMemoryInBytes() - memoryBefore
+    print '%d efforts created' % len(efforts)
+    print 'Peak memory increase: %d KB' % (memoryIncrease / 1024)
+    print 'Memory per effort: %d bytes' % (memoryIncrease / len(efforts))
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300000)
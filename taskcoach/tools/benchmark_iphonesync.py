@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Script to measure the throughput of a full sync from the desktop to an
+# iPhone or iPod Touch, in stop-and-wait mode (protocol version 5) and in
+# pipelined mode (protocol version 6). Both ends run in this process and 
+# talk over a loopback TCP connection. The device is simulated: it parses 
+# the objects and responds to each of them after a delay that mimics the 
+# latency of a WiFi network.
+# Usage: benchmark_iphonesync.py [number of tasks] [latency in ms] [window]
+
+import sys, time, socket, struct, wx
+app = wx.App(False)
+sys.path.insert(0, '..')
+from twisted.internet import reactor
+from twisted.internet.protocol import Protocol, ServerFactory, ClientFactory
+from taskcoachlib import config, persistence
+from taskcoachlib.domain import task, category, effort, date
+from taskcoachlib.iphone import protocol
+
+
+class ProgressUI(object):
+    def __init__(self, onFinished):
+        self.__onFinished = onFinished
+
+    def SetProgress(self, count, total):
+        pass
+
+    def AddLogLine(self, line):
+        pass
+
+    def Finished(self):
+        self.__onFinished()
+
+
+class Window(object):
+    def __init__(self, taskFile):
+        self.taskFile = taskFile
+
+    def restoreTasks(self, categories, tasks):
+        pass
+
+
+class DesktopHandler(protocol.IPhoneHandler):
+    ''' Skip the handshake and start a full sync from the desktop right 
+        away. '''
+
+    def connectionMade(self):
+        self.transport.socket.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
+        self.state = protocol.BaseState(self)
+        self.state.version = self.factory.version
+        self.state.ui = ProgressUI(self.factory.onFinished)
+        self.state.setState(protocol.FullFromDesktopState)
+
+
+class DesktopFactory(ServerFactory):
+    protocol = DesktopHandler
+
+    def __init__(self, window, settings, version, onFinished):
+        self.window = window
+        self.settings = settings
+        self.version = version
+        self.onFinished = onFinished
+
+    def buildProtocol(self, addr):
+        handler = ServerFactory.buildProtocol(self, addr)
+        handler.window = self.window
+        handler.settings = self.settings
+        return handler
+
+
+class Device(Protocol):
+    ''' Parse the objects sent by the desktop and respond to each of them
+        after the latency has passed. '''
+
+    formats = ['ssz', 'sssffffziiiii[s]', 'ssztt'] # Categories, tasks, efforts
+
+    def connectionMade(self):
+        self.transport.socket.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
+        self.__buffer = ''
+        self.__items = iter([protocol.ItemParser().parse('iii')])
+        self.__item = self.__items.next()
+        self.__counts = None
+
+    def dataReceived(self, data):
+        self.__buffer += data
+        while self.__item is not None:
+            expected = self.__item.expect()
+            if expected is None:
+                self.objectReceived(self.__item.value)
+            elif len(self.__buffer) >= expected:
+                self.__item.feed(self.__buffer[:expected])
+                self.__buffer = self.__buffer[expected:]
+            else:
+                break
+
+    def objectReceived(self, value):
+        if self.__counts is None:
+            self.__counts = value
+            self.__items = (protocol.ItemParser().parse(format) \
+                            for format, count in zip(self.formats, value) \
+                            for dummy in xrange(count))
+        else:
+            reactor.callLater(self.factory.latency, self.transport.write,
+                              struct.pack('!i', 1))
+        self.__item = next(self.__items, None)
+
+
+class DeviceFactory(ClientFactory):
+    protocol = Device
+
+    def __init__(self, latency):
+        self.latency = latency
+
+
+def createTaskFile(nrTasks):
+    taskFile = persistence.TaskFile()
+    categories = [category.Category('Category %d' % index) for index in range(10)]
+    taskFile.categories().extend(categories)
+    start = date.DateTime(2016, 1, 1)
+    for index in range(nrTasks):
+        newTask = task.Task(subject='Task %d' % index,
+                            description='Description of task %d' % index,
+                            categories=set([categories[index % 10]]))
+        newTask.addEffort(effort.Effort(newTask, start, start + date.ONE_HOUR))
+        taskFile.tasks().append(newTask)
+    return taskFile
+
+
+def benchmark(nrTasks, latency, window):
+    settings = task.Task.settings = config.Settings(load=False)
+    settings.set('iphone', 'syncwindow', str(window))
+    taskFile = createTaskFile(nrTasks)
+    nrObjects = len(taskFile.categories()) + len(taskFile.tasks()) + \
+                len(taskFile.efforts())
+    versions = [5, 6]
+
+    def sync():
+        version = versions.pop(0)
+        start = time.time()
+        def onFinished():
+            duration = time.time() - start
+            print 'Protocol version %d: %d objects in %.2f seconds ' \
+                  '(%d objects/second)' % (version, nrObjects, duration, 
+                                           nrObjects / duration)
+            listening.stopListening()
+            if versions:
+                reactor.callLater(1, sync) # Let close_when_done() finish
+            else:
+                reactor.callLater(1, reactor.stop)
+        listening = reactor.listenTCP(0, DesktopFactory(Window(taskFile), 
+            settings, version, onFinished), interface='127.0.0.1')
+        reactor.connectTCP('127.0.0.1', listening.getHost().port, 
+                           DeviceFactory(latency))
+
+    print 'Latency %d ms, window %d' % (latency * 1000, window)
+    reactor.callWhenRunning(sync)
+    reactor.run()
+    taskFile.stop()
+
+
+if __name__ == '__main__':
+    nrTasks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    window = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    benchmark(nrTasks, latency, window)
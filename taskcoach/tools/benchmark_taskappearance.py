@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Script to measure how long looking up the appearance of all tasks takes,
+# as a task viewer does for each task it draws.
+# Usage: benchmark_taskappearance.py [number of tasks] [number of redraws]
+# Run the script against different revisions of the domain classes to 
+# compare them.
+
+import sys, time, wx
+app = wx.App(False)
+sys.path.insert(0, '..')
+from taskcoachlib import config
+from taskcoachlib.domain import task, date
+
+
+def createTasks(nrTasks):
+    now = date.Now()
+    tasks = []
+    for index in xrange(nrTasks):
+        # Vary the status of the tasks:
+        kwargs = [dict(), dict(dueDateTime=now - date.ONE_DAY),
+                  dict(dueDateTime=now + date.ONE_HOUR),
+                  dict(completionDateTime=now - date.ONE_DAY),
+                  dict(actualStartDateTime=now - date.ONE_DAY)][index % 5]
+        tasks.append(task.Task(subject='Task %d' % index, **kwargs))
+    return tasks
+
+def redraw(tasks):
+    for eachTask in tasks:
+        eachTask.foregroundColor(recursive=True)
+        eachTask.backgroundColor(recursive=True)
+        eachTask.font(recursive=True)
+        eachTask.icon(recursive=True)
+        eachTask.selectedIcon(recursive=True)
+
+def benchmark(nrTasks, nrRedraws):
+    task.Task.settings = config.Settings(load=False)
+    tasks = createTasks(nrTasks)
+    redraw(tasks) # Compute the cached recursive appearance
+    start = time.time()
+    for dummy in xrange(nrRedraws):
+        redraw(tasks)
+    duration = (time.time() - start) / nrRedraws
+    print '%d tasks, %d redraws' % (nrTasks, nrRedraws)
+    print 'Time per redraw: %.3f seconds' % duration
+    start = time.time()
+    task.Task.settings.settuple('fgcolor', 'activetasks', (1, 2, 3))
+    print 'Time to change a status color: %.3f seconds' % (time.time() - start)
+
+
+if __name__ == '__main__':
+    nrTasks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    nrRedraws = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    benchmark(nrTasks, nrRedraws)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+'''
+Task Coach - Your friendly task manager
+Copyright (C) 2004-2016 Task Coach developers <developers@taskcoach.org>
+
+Task Coach is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Task Coach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Script to measure the load time and peak memory use of the XML reader.
+# Usage: benchmark_xmlreader.py [number of tasks] [task file]
+# The task file is generated if it does not exist. Run the script against
+# different revisions of the reader to compare them. Since peak memory use
+# can only go up, each measurement should be done in a fresh process.
+
+import os, sys, time, resource, wx
+app = wx.App(False)
+sys.path.insert(0, '..')
+from taskcoachlib import persistence, config
+from taskcoachlib.domain import task, category, note, effort, date
+from taskcoachlib.syncml.config import createDefaultSyncConfig
+
+
+def peakMemoryInKiloBytes():
+    # ru_maxrss is in kilobytes on Linux but in bytes on Mac OS X
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == 'darwin' else peak
+
+def generate(filename, nrTasks):
+    task.Task.settings = config.Settings(load=False)
+    tasks = []
+    for index in range(nrTasks):
+        start = date.DateTime(2016, 1, 1) + date.TimeDelta(minutes=index)
+        newTask = task.Task(subject='Task %d' % index,
+                            description='Description of task %d' % index,
+                            efforts=[effort.Effort(None, start,
+                                start + date.TimeDelta(minutes=30))])
+        tasks.append(newTask)
+    fd = file(filename, 'w')
+    persistence.XMLWriter(fd).write(task.TaskList(tasks),
+                                    category.CategoryList(),
+                                    note.NoteContainer(),
+                                    createDefaultSyncConfig('benchmark'),
+                                    'benchmark')
+    fd.close()
+
+def benchmark(filename):
+    task.Task.settings = config.Settings(load=False)
+    memoryBefore = peakMemoryInKiloBytes()
+    start = time.time()
+    fd = file(filename, 'rU')
+    tasks = persistence.XMLReader(fd).read()[0]
+    fd.close()
+    end = time.time()
+    print '%d tasks read from %s (%d KB)' % (len(tasks), filename,
+                                             os.path.getsize(filename) / 1024)
+    print 'Load time: %.2f seconds' % (end - start)
+    print 'Peak memory increase: %d KB' % (peakMemoryInKiloBytes() - memoryBefore)
+
+
+if __name__ == '__main__':
+    nrTasks = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    filename = sys.argv[2] if len(sys.argv) > 2 else 'benchmark_%d.tsk' % nrTasks
+    if not os.path.exists(filename):
+        generate(filename, nrTasks)
+        print 'Generated %s, run again in a fresh process to measure' % filename
+    else:
+        benchmark(filename)